@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+'''
+Self-contained benchmark of the most used views
+
+A throwaway test database is created, filled with the test fixtures and then
+with data from the dummy generator (with a fixed random seed, so that the
+numbers of different runs can be compared). The views are requested in-process
+with the django test client, no running server is needed.
+
+The latencies and number of queries are written to a JSON file. If a baseline
+file from a previous run is passed, the script exits with an error if a view
+got slower (or needs more queries) than the allowed threshold.
+'''
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import runpy
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATOR_DIR = os.path.join(BENCH_DIR, '..', 'dummy_generator')
+
+# The generated data depends on the date, keep it fixed so that the results
+# of different days can be compared
+GENERATOR_END_DATE = '2017-05-01'
+
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+
+import django
+django.setup()
+
+# Must happen after calling django.setup()
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment
+)
+
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.gym.models import Gym
+from wger.manager.models import (
+    Schedule,
+    Workout
+)
+from wger.nutrition.models import NutritionPlan
+
+
+parser = argparse.ArgumentParser(description='Benchmark of the most used views')
+parser.add_argument('--iterations',
+                    type=int,
+                    default=20,
+                    help='Number of timed requests per view, default: 20')
+parser.add_argument('--seed',
+                    type=int,
+                    default=42,
+                    help='Random seed for the generated data, default: 42')
+parser.add_argument('--users',
+                    type=int,
+                    default=50,
+                    help='Number of generated users, default: 50')
+parser.add_argument('--workouts',
+                    type=int,
+                    default=5,
+                    help='Number of generated workouts per user, default: 5')
+parser.add_argument('--logs',
+                    type=int,
+                    default=10,
+                    help='Number of generated weeks of training logs per user, default: 10')
+parser.add_argument('--weight',
+                    type=int,
+                    default=200,
+                    help='Number of generated weight entries per user, default: 200')
+parser.add_argument('--nutrition',
+                    type=int,
+                    default=3,
+                    help='Number of generated nutrition plans per user, default: 3')
+parser.add_argument('--cold',
+                    action='store_true',
+                    help='Clear the cache before every request')
+parser.add_argument('--only',
+                    action='append',
+                    help='Only run the view with this name, can be given more than once')
+parser.add_argument('--output',
+                    default='benchmark-results.json',
+                    help='File to write the results to, default: benchmark-results.json')
+parser.add_argument('--baseline',
+                    help='Results of a previous run to compare against')
+parser.add_argument('--threshold',
+                    type=float,
+                    default=0.25,
+                    help='Allowed relative slowdown compared to the baseline, default: 0.25')
+
+
+def percentile(values, percent):
+    '''
+    Returns the given percentile (nearest rank) of a list of values
+    '''
+    values = sorted(values)
+    index = int(round(percent / 100.0 * (len(values) - 1)))
+    return values[index]
+
+
+def run_generator(seed, *arguments):
+    '''
+    Runs the dummy generator in this process, with a fixed seed and end date
+
+    Only one process is used, so that the primary keys are the same as well.
+    '''
+    old_argv = sys.argv
+    old_cwd = os.getcwd()
+    old_stdout = sys.stdout
+
+    options = ['--seed', seed, '--end-date', GENERATOR_END_DATE, '--processes', 1]
+    sys.argv = ['generator.py'] + [str(i) for i in options + list(arguments)]
+    os.chdir(GENERATOR_DIR)
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        runpy.run_path('generator.py', run_name='__main__')
+    finally:
+        sys.stdout.close()
+        sys.stdout = old_stdout
+        sys.argv = old_argv
+        os.chdir(old_cwd)
+
+
+def seed_database(args):
+    '''
+    Loads the test fixtures and generates the dummy data
+    '''
+    print('** Loading fixtures')
+    call_command('loaddata', *WorkoutManagerTestCase.fixtures, verbosity=0)
+
+    print('** Generating data')
+    run_generator(args.seed, 'users', args.users)
+    run_generator(args.seed, 'workouts', args.workouts)
+    run_generator(args.seed, 'logs', args.logs)
+    run_generator(args.seed, 'sessions', 'random')
+    run_generator(args.seed, 'weight', args.weight)
+    run_generator(args.seed, 'nutrition', args.nutrition)
+
+
+def get_views():
+    '''
+    Returns a list of (name, URL) with the views to benchmark
+
+    All views are requested as the 'admin' user of the test fixtures, which is
+    also a manager of the first gym.
+    '''
+    user = User.objects.get(username='admin')
+    workout = Workout.objects.filter(user=user).order_by('-pk').first()
+    day = workout.day_set.order_by('pk').first()
+    schedule = Schedule.objects.filter(user=user).order_by('pk').first()
+    plan = NutritionPlan.objects.filter(user=user).order_by('-pk').first()
+    gym = Gym.objects.order_by('pk').first()
+
+    views = [
+        ('dashboard', reverse('core:dashboard')),
+        ('workout-view', reverse('manager:workout:view', kwargs={'pk': workout.pk})),
+        ('workout-calendar', reverse('manager:workout:calendar')),
+        ('workout-timer', reverse('manager:workout:timer', kwargs={'day_pk': day.pk})),
+        ('workout-pdf-log', reverse('manager:workout:pdf-log', kwargs={'id': workout.pk})),
+        ('workout-pdf-table', reverse('manager:workout:pdf-table', kwargs={'id': workout.pk})),
+        ('gym-member-list', reverse('gym:gym:user-list', kwargs={'pk': gym.pk})),
+        ('nutrition-plan-view', reverse('nutrition:plan:view', kwargs={'id': plan.pk})),
+        ('nutrition-plan-pdf', reverse('nutrition:plan:export-pdf', kwargs={'id': plan.pk})),
+        ('exercise-search', reverse('exercise-search') + '?term=cur'),
+        ('ingredient-search', reverse('ingredient-search') + '?term=te'),
+    ]
+    if schedule:
+        views.append(('schedule-pdf-log',
+                      reverse('manager:schedule:pdf-log', kwargs={'pk': schedule.pk})))
+    return views
+
+
+def benchmark_view(client, url, iterations, cold):
+    '''
+    Requests a view several times and returns its statistics
+
+    The queries are counted for the first request with an empty cache and for
+    a second one with a warm cache. The timed requests follow.
+    '''
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries_cold:
+        response = client.get(url)
+    if response.status_code != 200:
+        raise Exception('{0} returned status code {1}'.format(url, response.status_code))
+
+    with CaptureQueriesContext(connection) as queries_warm:
+        client.get(url)
+
+    timings = []
+    for i in range(iterations):
+        if cold:
+            cache.clear()
+        start = timeit.default_timer()
+        client.get(url)
+        timings.append((timeit.default_timer() - start) * 1000)
+
+    return {'url': url,
+            'queries_cold': len(queries_cold),
+            'queries_warm': len(queries_warm),
+            'size': len(response.content),
+            'min': min(timings),
+            'mean': sum(timings) / len(timings),
+            'p50': percentile(timings, 50),
+            'p90': percentile(timings, 90),
+            'p99': percentile(timings, 99),
+            'max': max(timings)}
+
+
+def compare(results, baseline, threshold):
+    '''
+    Compares the results with a baseline
+
+    :return: a list with the description of the regressions
+    '''
+    regressions = []
+    for name, result in sorted(results.items()):
+        old = baseline.get(name)
+        if not old:
+            continue
+
+        for key in ('p50', 'p90'):
+            if result[key] > old[key] * (1 + threshold):
+                regressions.append('{0}: {1} {2:.1f}ms -> {3:.1f}ms'.format(
+                    name, key, old[key], result[key]))
+        for key in ('queries_cold', 'queries_warm'):
+            if result[key] > old[key]:
+                regressions.append('{0}: {1} {2} -> {3}'.format(
+                    name, key, old[key], result[key]))
+    return regressions
+
+
+def main():
+    args = parser.parse_args()
+
+    # Render everything in the request, so that the background jobs don't
+    # interfere with the timings.
+    settings.WGER_SETTINGS['BACKGROUND_JOBS'] = False
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        seed_database(args)
+
+        client = Client()
+        client.login(username='admin', password='adminadmin')
+
+        print('** Running benchmarks ({0} iterations)'.format(args.iterations))
+        results = {}
+        for name, url in get_views():
+            if args.only and name not in args.only:
+                continue
+            results[name] = benchmark_view(client, url, args.iterations, args.cold)
+            print('   - {0:<22} p50 {1:8.1f}ms  p90 {2:8.1f}ms  '
+                  'queries {3:4} / {4:4}'.format(name,
+                                                 results[name]['p50'],
+                                                 results[name]['p90'],
+                                                 results[name]['queries_cold'],
+                                                 results[name]['queries_warm']))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    output = {'meta': {'date': datetime.datetime.now().isoformat(),
+                       'python': platform.python_version(),
+                       'django': django.get_version(),
+                       'database': connection.vendor,
+                       'arguments': vars(args)},
+              'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=4, sort_keys=True)
+    print('** Results written to {0}'.format(args.output))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('** Regressions (threshold {0:.0%}):'.format(args.threshold))
+            for regression in regressions:
+                print('   - {0}'.format(regression))
+            sys.exit(1)
+        print('** No regressions compared to {0}'.format(args.baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+'''
+Compares the cached canonical form of the workouts
+
+The "full" form is the canonical representation with all the model instances,
+as it was saved in the cache until now. The "compact" form only contains IDs
+and primitive types and is compressed if it is big enough, the instances are
+loaded when they are used.
+
+For every workout the size of the value saved in the cache, the time needed
+to write it (pickle) and to read it again (unpickle, and for the compact form
+rebuild the canonical representation) are measured. Since the compact form
+needs to load the instances from the database when they are used, the time
+for reading it and accessing all objects is also reported.
+'''
+
+import argparse
+import os
+import pickle
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+
+import django
+django.setup()
+
+# Must happen after calling django.setup()
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment
+)
+
+from benchmark import run_generator
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.manager.models import Workout
+from wger.utils.cache import (
+    pack_cache_value,
+    unpack_cache_value
+)
+
+
+parser = argparse.ArgumentParser(description='Compares the cached canonical form of the workouts')
+parser.add_argument('--iterations',
+                    type=int,
+                    default=50,
+                    help='Number of timed runs per workout, default: 50')
+parser.add_argument('--seed',
+                    type=int,
+                    default=42,
+                    help='Random seed for the generated data, default: 42')
+parser.add_argument('--users',
+                    type=int,
+                    default=10,
+                    help='Number of generated users, default: 10')
+parser.add_argument('--workouts',
+                    type=int,
+                    default=5,
+                    help='Number of generated workouts per user, default: 5')
+
+
+def timed(func, iterations):
+    '''
+    Returns the mean time of a function in milliseconds
+    '''
+    return timeit.timeit(func, number=iterations) * 1000 / iterations
+
+
+def touch_objects(canonical):
+    '''
+    Accesses all the model instances of a canonical form
+    '''
+    for day in canonical['day_list']:
+        day['obj'].description
+        for weekday in day['days_of_week']['day_list']:
+            weekday.day_of_week
+        for set_dict in day['set_list']:
+            set_dict['obj'].sets
+            for exercise in set_dict['exercise_list']:
+                exercise['obj'].name
+                for setting in exercise['setting_obj_list']:
+                    setting.reps
+                for unit in exercise['repetition_units'] + exercise['weight_units']:
+                    unit.name
+
+
+def benchmark_workout(workout, iterations):
+    '''
+    Measures the full and compact forms of a workout
+    '''
+    full = workout.build_canonical_form()
+    full_data = pickle.dumps(full, pickle.HIGHEST_PROTOCOL)
+
+    def write_compact():
+        return pickle.dumps(pack_cache_value(Workout.compact_canonical_form(full)),
+                            pickle.HIGHEST_PROTOCOL)
+    compact_data = write_compact()
+
+    def read_compact():
+        return workout.expand_canonical_form(unpack_cache_value(pickle.loads(compact_data)))
+
+    return {'full_size': len(full_data),
+            'compact_size': len(compact_data),
+            'full_write': timed(lambda: pickle.dumps(full, pickle.HIGHEST_PROTOCOL), iterations),
+            'compact_write': timed(write_compact, iterations),
+            'full_read': timed(lambda: touch_objects(pickle.loads(full_data)), iterations),
+            'compact_read': timed(read_compact, iterations),
+            'compact_read_objects': timed(lambda: touch_objects(read_compact()), iterations)}
+
+
+def main():
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        print('** Loading fixtures and generating data')
+        call_command('loaddata', *WorkoutManagerTestCase.fixtures, verbosity=0)
+        run_generator(args.seed, 'users', args.users)
+        run_generator(args.seed, 'workouts', args.workouts)
+
+        results = []
+        for workout in Workout.objects.all():
+            results.append(benchmark_workout(workout, args.iterations))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    print('** Mean over {0} workouts ({1} iterations each)'.format(len(results), args.iterations))
+    for label, full, compact in (('Size (bytes)', 'full_size', 'compact_size'),
+                                 ('Write (ms)', 'full_write', 'compact_write'),
+                                 ('Read (ms)', 'full_read', 'compact_read'),
+                                 ('Read + objects (ms)', 'full_read', 'compact_read_objects')):
+        full_mean = sum(i[full] for i in results) / float(len(results))
+        compact_mean = sum(i[compact] for i in results) / float(len(results))
+        print('   - {0:<20} full {1:10.3f}  compact {2:10.3f}  ({3:+.0%})'.format(
+            label, full_mean, compact_mean, compact_mean / full_mean - 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -17,13 +17,16 @@
 import os
 import sys
 import csv
-import uuid
+import time
+import bisect
 import random
 import django
 import datetime
 import argparse
+import multiprocessing
 
-from django.db import IntegrityError
+from django.db import connection, connections, transaction
+from django.db.models import Max, Min
 from django.utils.text import slugify
 
 sys.path.insert(0, os.path.join('..', '..'))
@@ -31,8 +34,13 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
 django.setup()
 
 # Must happen after calling django.setup()
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from wger.core.models import DaysOfWeek
+from wger.core.models import (
+    Language,
+    UserCache,
+    UserProfile
+)
 from wger.exercises.models import Exercise
 from wger.gym.models import (
     GymUserConfig,
@@ -48,21 +56,42 @@ from wger.manager.models import (
     WorkoutLog,
     WorkoutSession
 )
-from wger.weight.models import WeightEntry
-
-from wger.core.models import Language
-
-# Nutrition import //_c
 from wger.nutrition.models import (
     Ingredient,
-    IngredientWeightUnit,
-    WeightUnit,
     NutritionPlan,
     Meal,
     MealItem
 )
+from wger.utils.clone import bulk_create_children
+from wger.weight.models import WeightEntry
 
 parser = argparse.ArgumentParser(description='Data generator. Please consult the documentation')
+parser.add_argument('--seed',
+                    action='store',
+                    type=int,
+                    help='Seed for the random numbers. Two runs with the same seed, options and '
+                         '--end-date on the same data generate the same entries. Default: '
+                         'random')
+parser.add_argument('--end-date',
+                    action='store',
+                    default=datetime.date.today().isoformat(),
+                    help='Date of the most recent generated entries (YYYY-MM-DD). Default: today')
+parser.add_argument('--batch-size',
+                    action='store',
+                    type=int,
+                    default=1000,
+                    help='Number of rows inserted with one query. Default: 1000')
+parser.add_argument('--chunk-size',
+                    action='store',
+                    type=int,
+                    default=100,
+                    help='Number of users processed in one transaction. Default: 100')
+parser.add_argument('--processes',
+                    action='store',
+                    type=int,
+                    default=multiprocessing.cpu_count(),
+                    help='Number of processes generating the entries (not on SQLite). '
+                         'Default: number of CPUs')
 subparsers = parser.add_subparsers(help='The kind of entries you want to generate')
 
 # User options
@@ -75,7 +104,7 @@ user_parser.add_argument('--add-to-gym',
                          action='store',
                          default='auto',
                          help='Gym to assign the users to. Allowed values: auto, none, <gym_id>. '
-                              'Default: auto')
+                              'With auto, a few gyms get most of the users. Default: auto')
 user_parser.add_argument('--country',
                          action='store',
                          default='germany',
@@ -102,7 +131,8 @@ gym_parser.add_argument('number_gyms',
 logs_parser = subparsers.add_parser('logs', help='Create logs')
 logs_parser.add_argument('number_logs',
                          action='store',
-                         help='Number of logs to create per user and workout',
+                         help='Number of weeks of training to log per user. Each user trains '
+                              'on a different share of the workout days',
                          type=int)
 
 # Session options
@@ -131,19 +161,195 @@ weight_parser.add_argument('--base-weight',
 # Nutrition options
 nutrition_parser = subparsers.add_parser('nutrition', help='Creates a meal plan')
 nutrition_parser.add_argument('number_nutrition_plans',
-                         action='store',
-                         help='Number of meal plans to create',
-                         type=int)
+                              action='store',
+                              help='Number of meal plans to create',
+                              type=int)
 nutrition_parser.add_argument('--add-to-user',
-                           action='store',
-                           help='Add to the specified user-ID, not all existing users')
+                              action='store',
+                              help='Add to the specified user-ID, not all existing users')
 
 args = parser.parse_args()
-# print(args)
+end_date = datetime.datetime.strptime(args.end_date, '%Y-%m-%d').date()
+
+
+#
+# Helper functions
+#
+def get_random(kind, key):
+    '''
+    Returns the random number generator for one user (or chunk) and kind
+
+    Every user gets its own generator, so the generated entries don't depend
+    on the number of processes or on the order the users are processed in.
+    '''
+    if args.seed is None:
+        return random.Random()
+    return random.Random('{0}-{1}-{2}'.format(args.seed, kind, key))
+
+
+def weighted_choice(rng, values, weights):
+    '''
+    Returns one of the values, with a probability proportional to its weight
+    '''
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return values[bisect.bisect(cumulative, rng.random() * total)]
+
+
+def insert(model, objects, owner_attname='user_id'):
+    '''
+    Inserts new objects in batches and makes sure they have their primary key
+
+    Databases that can't return the IDs of bulk inserted rows need one more
+    query, the new rows of the owners (users) are loaded in ascending order.
+    The users of a chunk are only processed by one process.
+    '''
+    if not objects:
+        return
+    if connection.features.can_return_ids_from_bulk_insert:
+        model.objects.bulk_create(objects, batch_size=args.batch_size)
+        return
+
+    last_pk = model.objects.aggregate(pk=Max('pk'))['pk'] or 0
+    model.objects.bulk_create(objects, batch_size=args.batch_size)
+    owners = set(getattr(obj, owner_attname) for obj in objects)
+    pks = model.objects.filter(pk__gt=last_pk, **{owner_attname + '__in': owners})\
+        .order_by('pk')\
+        .values_list('pk', flat=True)
+    for obj, pk in zip(objects, pks):
+        obj.pk = pk
+
+
+def m2m_row(model, field_name, source_pk, target_pk, **values):
+    '''
+    Returns an unsaved row of the intermediate table of a many-to-many field
+    '''
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = through._meta.get_field(field.m2m_field_name()).attname
+    target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+    values.update({source: source_pk, target: target_pk})
+    return through(**values)
+
+
+def get_user_pks():
+    '''
+    Returns the IDs of the users to generate entries for
+    '''
+    if getattr(args, 'add_to_user', None):
+        return [int(args.add_to_user)]
+    return list(User.objects.order_by('pk').values_list('pk', flat=True))
+
+
+def run(kind, function, tasks):
+    '''
+    Runs the function for every task, in several processes, and prints the
+    number of created entries and the throughput
+
+    :param kind: name of the generated entries, for the random generators
+    :param function: a function that gets a task (e.g. a list of user IDs) and
+                     returns a dictionary with the number of created entries
+                     for each model
+    :param tasks: the list of tasks, e.g. the users split in chunks
+    '''
+    processes = args.processes
+    if connection.vendor == 'sqlite':
+        processes = 1
+
+    start = time.time()
+    if processes > 1 and len(tasks) > 1:
+        # The child processes can't share the database connections
+        connections.close_all()
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(function, tasks)
+    else:
+        pool = None
+        results = (function(task) for task in tasks)
+
+    totals = {}
+    for count, result in enumerate(results, 1):
+        for name, number in result.items():
+            totals[name] = totals.get(name, 0) + number
+        if count % 10 == 0 or count == len(tasks):
+            print('   - {0} of {1} chunks done'.format(count, len(tasks)))
+
+    if pool:
+        pool.close()
+        pool.join()
+
+    seconds = max(time.time() - start, 0.001)
+    print('** Created in {0:.1f}s:'.format(seconds))
+    for name in sorted(totals):
+        print('   {0:>10} {1:<20} {2:>10.0f}/s'.format(totals[name], name, totals[name] / seconds))
+
+
+def split(values):
+    '''
+    Splits the users (or any other list) in chunks
+    '''
+    return [values[i:i + args.chunk_size] for i in range(0, len(values), args.chunk_size)]
+
 
 #
 # User generator
 #
+def generate_users(task):
+    '''
+    Creates a chunk of users, with profile, cache and gym
+    '''
+    chunk, number = task
+    rng = get_random('users', chunk)
+
+    with transaction.atomic():
+        users = {}
+        for i in range(number):
+            name, gender = rng.choice(first_names)
+            surname = rng.choice(last_names)
+            username = slugify('{0}, {1} {2:08x}'.format(name, surname[0], rng.getrandbits(32)))
+            users[username] = (name, surname, gender)
+
+        # Even with the random part, usernames are not guaranteed to be
+        # unique, in this case just ignore them
+        existing = set(User.objects.filter(username__in=users.keys())
+                                   .values_list('username', flat=True))
+        new_users = []
+        for username in sorted(set(users) - existing):
+            name, surname, gender = users[username]
+            new_users.append(User(username=username,
+                                  email='{0}@example.com'.format(username),
+                                  password=make_password(username),
+                                  first_name=name,
+                                  last_name=surname))
+        User.objects.bulk_create(new_users, batch_size=args.batch_size)
+        pks = dict(User.objects.filter(username__in=[i.username for i in new_users])
+                               .values_list('username', 'pk'))
+
+        # bulk_create doesn't send the signals that create these
+        profiles = []
+        caches = []
+        configs = []
+        for user in new_users:
+            pk = pks[user.username]
+            gender = users[user.username][2]
+            profile = UserProfile(user_id=pk,
+                                  gender='1' if gender == 'm' else '2',
+                                  age=rng.randint(18, 45))
+            caches.append(UserCache(user_id=pk))
+            if gym_list:
+                profile.gym_id = weighted_choice(rng, gym_list, gym_weights)
+                configs.append(GymUserConfig(gym_id=profile.gym_id, user_id=pk))
+            profiles.append(profile)
+
+        UserProfile.objects.bulk_create(profiles, batch_size=args.batch_size)
+        UserCache.objects.bulk_create(caches, batch_size=args.batch_size)
+        GymUserConfig.objects.bulk_create(configs, batch_size=args.batch_size)
+
+    return {'users': len(new_users), 'gym configs': len(configs)}
+
+
 if hasattr(args, 'number_users'):
     print("** Generating {0} users".format(args.number_users))
 
@@ -153,7 +359,11 @@ if hasattr(args, 'number_users'):
         if args.add_to_gym == 'none':
             gym_list = []
         else:
-            gym_list = [i['id'] for i in Gym.objects.all().values()]
+            gym_list = list(Gym.objects.order_by('pk').values_list('pk', flat=True))
+
+    # Gym sizes follow a power law, a few gyms have most of the members
+    gym_weights = [1.0 / (rank ** 1.2) for rank in range(1, len(gym_list) + 1)]
+    get_random('gyms', 'sizes').shuffle(gym_weights)
 
     first_names = []
     last_names = []
@@ -161,52 +371,16 @@ if hasattr(args, 'number_users'):
     with open(os.path.join('csv', 'first_names_{0}.csv'.format(args.country))) as name_file:
         name_reader = csv.reader(name_file)
         for row in name_reader:
-            first_names.append(row)
+            first_names.append((row[0], row[1]))
 
     with open(os.path.join('csv', 'last_names_{0}.csv'.format(args.country))) as name_file:
         name_reader = csv.reader(name_file)
         for row in name_reader:
             last_names.append(row[0])
 
-    for i in range(1, args.number_users):
-        uid = uuid.uuid4()
-        name_data = random.choice(first_names)
-        name = name_data[0]
-        gender = name_data[1]
-        surname = random.choice(last_names)
-
-        username = slugify('{0}, {1} {2}'.format(name,
-                                                 surname[0],
-                                                 str(uid).split('-')[1]))
-        email = '{0}@example.com'.format(username)
-        password = username
-
-        try:
-            user = User.objects.create_user(username,
-                                            email,
-                                            password)
-            user.first_name = name
-            user.last_name = surname
-            user.save()
-
-        # Even with the uuid part, usernames are not guaranteed to be unique,
-        # in this case, just ignore and continue
-        except IntegrityError as e:
-            continue
-
-        if gym_list:
-            gym_id = random.choice(gym_list)
-            user.userprofile.gym_id = gym_id
-            user.userprofile.gender = '1' if gender == 'm' else 2
-            user.userprofile.age = random.randint(18, 45)
-            user.userprofile.save()
-
-            config = GymUserConfig()
-            config.gym_id = gym_id
-            config.user = user
-            config.save()
-
-        print('   - {0}, {1}'.format(name, surname))
+    tasks = [(chunk, min(args.chunk_size, args.number_users - start))
+             for chunk, start in enumerate(range(0, args.number_users, args.chunk_size))]
+    run('users', generate_users, tasks)
 
 #
 # Gym generator
@@ -214,6 +388,7 @@ if hasattr(args, 'number_users'):
 if hasattr(args, 'number_gyms'):
     print("** Generating {0} gyms".format(args.number_gyms))
 
+    rng = get_random('gyms', 'names')
     gym_list = []
 
     names_part1 = []
@@ -227,11 +402,11 @@ if hasattr(args, 'number_gyms'):
             if row[1]:
                 names_part2.append(row[1])
 
-    for i in range(1, args.number_gyms):
+    for i in range(args.number_gyms):
         found = False
         while not found:
-            part1 = random.choice(names_part1)
-            part2 = random.choice(names_part2)
+            part1 = rng.choice(names_part1)
+            part2 = rng.choice(names_part2)
 
             # We don't want names like "Iron Iron"
             if part1 != part2:
@@ -245,234 +420,336 @@ if hasattr(args, 'number_gyms'):
         print('   - {0}'.format(gym.name))
 
     # Bulk-create all the gyms
-    Gym.objects.bulk_create(gym_list)
+    Gym.objects.bulk_create(gym_list, batch_size=args.batch_size)
 
 
 #
 # Workout generator
 #
-if hasattr(args, 'number_workouts'):
-    print("** Generating {0} workouts per user".format(args.number_workouts))
-
-    if args.add_to_user:
-        userlist = [User.objects.get(pk=args.add_to_user)]
-    else:
-        userlist = [i for i in User.objects.all()]
-
-    for user in userlist:
-        print('   - generating for {0}'.format(user.username))
+def generate_workouts(user_pks):
+    '''
+    Creates the workouts and schedules for a chunk of users
+    '''
+    with transaction.atomic():
+        workouts = []
+        structure = []
+        for user_pk in user_pks:
+            rng = get_random('workouts', user_pk)
+            for i in range(args.number_workouts):
+                workouts.append(Workout(user_id=user_pk,
+                                        comment='Dummy workout - {0:04x}'.format(
+                                            rng.getrandbits(16))))
+
+                # Most people train two to four days a week
+                nr_of_days = weighted_choice(rng, [1, 2, 3, 4, 5], [5, 25, 35, 25, 10])
+                workout_days = []
+                for weekday in sorted(rng.sample(range(1, 8), nr_of_days)):
+                    exercises = rng.sample(exercise_list,
+                                           min(rng.randint(3, 10), len(exercise_list)))
+                    workout_days.append((weekday, [(exercise,
+                                                    rng.randint(2, 4),
+                                                    rng.choice([1, 3, 5, 8, 10, 12, 15]))
+                                                   for exercise in exercises]))
+                structure.append(workout_days)
+        insert(Workout, workouts)
+
+        days = []
+        for workout, workout_days in zip(workouts, structure):
+            for weekday, exercises in workout_days:
+                days.append(Day(training_id=workout.pk,
+                                description='Dummy day - {0}'.format(weekday)))
+        bulk_create_children(Day, days, 'training_id')
+
+        day_rows = []
+        sets = []
+        set_data = []
+        position = 0
+        for workout_days in structure:
+            for weekday, exercises in workout_days:
+                day = days[position]
+                position += 1
+                day_rows.append(m2m_row(Day, 'day', day.pk, weekday))
+                for order, (exercise, nr_of_sets, reps) in enumerate(exercises, 1):
+                    sets.append(Set(exerciseday_id=day.pk, sets=nr_of_sets, order=order))
+                    set_data.append((exercise, reps, order))
+        Day.day.through.objects.bulk_create(day_rows, batch_size=args.batch_size)
+        bulk_create_children(Set, sets, 'exerciseday_id')
+
+        exercise_rows = []
+        settings = []
+        for day_set, (exercise, reps, order) in zip(sets, set_data):
+            exercise_rows.append(m2m_row(Set, 'exercises', day_set.pk, exercise, sort_value=1))
+            settings.append(Setting(set_id=day_set.pk, exercise_id=exercise, reps=reps,
+                                    order=order))
+        Set.exercises.through.objects.bulk_create(exercise_rows, batch_size=args.batch_size)
+        Setting.objects.bulk_create(settings, batch_size=args.batch_size)
 
-        # Workouts
-        for i in range(1, args.number_workouts):
-
-            uid = str(uuid.uuid4()).split('-')
-            start_date = datetime.date.today() - datetime.timedelta(days=random.randint(0, 100))
-            workout = Workout(user=user,
-                              comment='Dummy workout - {0}'.format(uid[1]),
-                              creation_date=start_date)
-            workout.save()
-
-            # Select a random number of workout days
-            nr_of_days = random.randint(1, 5)
-            day_list = [i for i in range(1, 8)]
-            random.shuffle(day_list)
-
-            # Load all exercises to a list
-            exercise_list = [i for i in Exercise.objects.filter(language_id=2)]
-
-            for day in day_list[0:nr_of_days]:
-                uid = str(uuid.uuid4()).split('-')
-                weekday = DaysOfWeek.objects.get(pk=day)
-
-                day = Day(training=workout, description='Dummy day - {0}'.format(uid[0]))
-                day.save()
-                day.day.add(weekday)
-
-                # Select a random number of exercises
-                nr_of_exercises = random.randint(3, 10)
-                random.shuffle(exercise_list)
-                day_exercises = exercise_list[0: nr_of_exercises]
-                order = 1
-                for exercise in day_exercises:
-                    reps = random.choice([1, 3, 5, 8, 10, 12, 15])
-                    sets = random.randint(2, 4)
+        # Schedules
+        schedules = []
+        schedule_workouts = []
+        for user_pk in user_pks:
+            rng = get_random('schedules', user_pk)
+            user_workouts = [i.pk for i in workouts if i.user_id == user_pk]
+            if not user_workouts:
+                continue
+            for i in range(rng.randint(1, 5)):
+                start_date = end_date - datetime.timedelta(days=rng.randint(0, 30))
+                schedules.append(Schedule(user_id=user_pk,
+                                          name='Dummy schedule - {0:04x}'.format(
+                                              rng.getrandbits(16)),
+                                          start_date=start_date,
+                                          is_active=True,
+                                          is_loop=True))
+                schedule_workouts.append(rng.sample(user_workouts,
+                                                    rng.randint(1, len(user_workouts))))
+        insert(Schedule, schedules)
+
+        steps = []
+        for schedule, step_workouts in zip(schedules, schedule_workouts):
+            rng = get_random('steps', schedule.pk)
+            for order, workout_pk in enumerate(step_workouts, 1):
+                steps.append(ScheduleStep(schedule_id=schedule.pk,
+                                          workout_id=workout_pk,
+                                          duration=rng.randint(1, 4),
+                                          order=order))
+        ScheduleStep.objects.bulk_create(steps, batch_size=args.batch_size)
+
+    return {'workouts': len(workouts),
+            'days': len(days),
+            'sets': len(sets),
+            'schedules': len(schedules),
+            'schedule steps': len(steps)}
 
-                    day_set = Set(exerciseday=day, sets=sets, order=order)
-                    day_set.save()
-                    day_set.exercises.add(exercise)
 
-                    setting = Setting(set=day_set, exercise=exercise, reps=reps, order=order)
-                    setting.save()
+if hasattr(args, 'number_workouts'):
+    print("** Generating {0} workouts per user".format(args.number_workouts))
 
-                    order += 1
+    # Load all exercises to a list
+    exercise_list = list(Exercise.objects.filter(language_id=2)
+                                         .order_by('pk')
+                                         .values_list('pk', flat=True))
+    run('workouts', generate_workouts, split(get_user_pks()))
 
-        # Schedules
-        nr_of_schedules = random.randint(1, 5)
-        user_workouts = [i for i in Workout.objects.filter(user=user)]
-        for i in range(0, nr_of_schedules):
-            uid = str(uuid.uuid4()).split('-')
-            start_date = datetime.date.today() - datetime.timedelta(days=random.randint(0, 30))
-
-            random.shuffle(user_workouts)
-
-            schedule = Schedule()
-            schedule.user = user
-            schedule.name = 'Dummy schedule - {0}'.format(uid[1])
-            schedule.start_date = start_date
-            schedule.is_active = True
-            schedule.is_loop = True
-            schedule.save()
-
-            nr_of_steps = random.randint(1, len(user_workouts))
-            order = 1
-            for j in range(1, nr_of_steps):
-                step = ScheduleStep()
-                step.schedule = schedule
-                step.workout = workout
-                step.duration = random.randint(1, 4)
-                step.order = order
-                step.save()
-
-                order += 1
 
 #
 # Log generator
 #
+def generate_logs(user_pks):
+    '''
+    Creates the workout logs for a chunk of users
+
+    The weeks are split over the workouts of a user, oldest first. Every user
+    trains on a different share of the workout days and gets a bit stronger
+    every week.
+    '''
+    workouts = {}
+    for workout in Workout.objects.filter(user_id__in=user_pks).order_by('pk'):
+        workouts.setdefault(workout.user_id, []).append(workout.pk)
+
+    weekdays = {}
+    for row in Day.day.through.objects.filter(day__training__user_id__in=user_pks)\
+            .values('day__training', 'daysofweek'):
+        weekdays.setdefault(row['day__training'], set()).add(row['daysofweek'])
+
+    settings = {}
+    for setting in Setting.objects.filter(set__exerciseday__training__user_id__in=user_pks)\
+            .values('set__exerciseday__training', 'exercise', 'reps', 'set__sets')\
+            .order_by('pk'):
+        settings.setdefault(setting['set__exerciseday__training'], []).append(setting)
+
+    count = 0
+    logs = []
+    with transaction.atomic():
+        for user_pk in user_pks:
+            rng = get_random('logs', user_pk)
+            user_workouts = workouts.get(user_pk)
+            if not user_workouts:
+                continue
+
+            # Many users log rarely, few of them almost every time
+            adherence = rng.betavariate(1.2, 2)
+            strength = {}
+            for week in range(args.number_logs):
+                workout = user_workouts[week * len(user_workouts) // args.number_logs]
+                monday = end_date - datetime.timedelta(weeks=args.number_logs - week,
+                                                       days=end_date.weekday())
+                for weekday in sorted(weekdays.get(workout, ())):
+                    if rng.random() > adherence:
+                        continue
+                    date = monday + datetime.timedelta(days=weekday - 1)
+                    if date > end_date:
+                        continue
+                    for setting in settings.get(workout, ()):
+                        base = strength.setdefault(setting['exercise'], rng.randint(20, 80))
+                        weight = base + week * 0.25
+                        for i in range(setting['set__sets']):
+                            logs.append(WorkoutLog(user_id=user_pk,
+                                                   exercise_id=setting['exercise'],
+                                                   workout_id=workout,
+                                                   reps=setting['reps'],
+                                                   weight=round(weight + rng.choice([-2.5, 0,
+                                                                                     0, 2.5]),
+                                                                1),
+                                                   date=date))
+            if len(logs) >= args.batch_size:
+                WorkoutLog.objects.bulk_create(logs, batch_size=args.batch_size)
+                count += len(logs)
+                logs = []
+
+        WorkoutLog.objects.bulk_create(logs, batch_size=args.batch_size)
+        count += len(logs)
+
+    return {'workout logs': count}
+
+
 if hasattr(args, 'number_logs'):
-    print("** Generating {0} logs".format(args.number_logs))
-
-    for user in User.objects.all():
-        weight_log = []
-        print('   - generating for {0}'.format(user.username))
-
-        for workout in Workout.objects.filter(user=user):
-            for day in workout.day_set.all():
-                for set in day.set_set.all():
-                    for setting in set.setting_set.all():
-                        for reps in (8, 10, 12):
-                            for i in range(1, args.number_logs):
-                                date = datetime.date.today() - datetime.timedelta(weeks=i)
-                                log = WorkoutLog(user=user,
-                                                 exercise=setting.exercise,
-                                                 workout=workout,
-                                                 reps=reps,
-                                                 weight=50 - reps + random.randint(1, 10),
-                                                 date=date)
-                                weight_log.append(log)
-
-        # Bulk-create the logs
-        WorkoutLog.objects.bulk_create(weight_log)
+    print("** Generating {0} weeks of logs".format(args.number_logs))
+    run('logs', generate_logs, split(get_user_pks()))
 
 
 #
 # Session generator
 #
-if hasattr(args, 'impression_sessions'):
-    print("** Generating workout sessions")
-
-    for user in User.objects.all():
-        session_list = []
-        print('   - generating for {0}'.format(user.username))
-
-        for date in WorkoutLog.objects.filter(user=user).dates('date', 'day'):
+def generate_sessions(user_pks):
+    '''
+    Creates a session for every day with logs and without session
+    '''
+    existing = set(WorkoutSession.objects.filter(user_id__in=user_pks)
+                                         .values_list('user_id', 'date'))
+    sessions = []
+    for row in WorkoutLog.objects.filter(user_id__in=user_pks)\
+            .values('user_id', 'date')\
+            .annotate(workout_id=Min('workout_id'))\
+            .order_by('user_id', 'date'):
+
+        # Only process for dates for which there isn't already a session
+        if (row['user_id'], row['date']) in existing:
+            continue
 
-            # Only process for dates for which there isn't already a session
-            if not WorkoutSession.objects.filter(user=user, date=date).exists():
+        rng = get_random('sessions', '{0}-{1}'.format(row['user_id'], row['date']))
+        start = datetime.time(hour=rng.randint(8, 20), minute=rng.randint(0, 59))
+        end = datetime.datetime.combine(end_date, start) \
+            + datetime.timedelta(minutes=rng.randint(40, 120))
+        end = datetime.time(hour=end.hour, minute=end.minute)
+
+        session = WorkoutSession()
+        session.date = row['date']
+        session.user_id = row['user_id']
+        session.time_start = start
+        session.time_end = end
+        session.workout_id = row['workout_id']
+
+        if args.impression_sessions == 'good':
+            session.impression = WorkoutSession.IMPRESSION_GOOD
+        elif args.impression_sessions == 'neutral':
+            session.impression = WorkoutSession.IMPRESSION_NEUTRAL
+        elif args.impression_sessions == 'bad':
+            session.impression = WorkoutSession.IMPRESSION_BAD
+        else:
+            session.impression = rng.choice([WorkoutSession.IMPRESSION_GOOD,
+                                             WorkoutSession.IMPRESSION_NEUTRAL,
+                                             WorkoutSession.IMPRESSION_BAD])
 
-                workout = WorkoutLog.objects.filter(user=user, date=date).first().workout
-                start = datetime.time(hour=random.randint(8, 20), minute=random.randint(0, 59))
-                end = datetime.datetime.combine(datetime.date.today(), start)  \
-                    + datetime.timedelta(minutes=random.randint(40, 120))
-                end = datetime.time(hour=end.hour, minute=end.minute)
+        sessions.append(session)
 
-                session = WorkoutSession()
-                session.date = date
-                session.user = user
-                session.time_start = start
-                session.time_end = end
-                session.workout = workout
+    # Bulk-create the sessions
+    WorkoutSession.objects.bulk_create(sessions, batch_size=args.batch_size)
+    return {'sessions': len(sessions)}
 
-                if args.impression_sessions == 'good':
-                    session.impression = WorkoutSession.IMPRESSION_GOOD
-                elif args.impression_sessions == 'neutral':
-                    session.impression = WorkoutSession.IMPRESSION_NEUTRAL
-                elif args.impression_sessions == 'bad':
-                    session.impression = WorkoutSession.IMPRESSION_BAD
-                else:
-                    session.impression = random.choice([WorkoutSession.IMPRESSION_GOOD,
-                                                        WorkoutSession.IMPRESSION_NEUTRAL,
-                                                        WorkoutSession.IMPRESSION_BAD])
 
-                session_list.append(session)
+if hasattr(args, 'impression_sessions'):
+    print("** Generating workout sessions")
+    run('sessions', generate_sessions, split(get_user_pks()))
 
-        # Bulk-create the sessions
-        WorkoutSession.objects.bulk_create(session_list)
 
 #
 # Weight entry generator
 #
-if hasattr(args, 'number_weight'):
-    print("** Generating {0} weight entries per user".format(args.number_weight))
+def generate_weight(user_pks):
+    '''
+    Creates the weight entries for a chunk of users, a random walk around a
+    different weight for every user
+    '''
+    existing = set(WeightEntry.objects.filter(user_id__in=user_pks)
+                                      .values_list('user_id', 'date'))
+    new_entries = []
+    for user_pk in user_pks:
+        rng = get_random('weight', user_pk)
+        weight = args.base_weight + rng.gauss(0, 10)
+        trend = rng.choice([-0.05, 0, 0, 0.03])
 
-    if args.add_to_user:
-        userlist = [User.objects.get(pk=args.add_to_user)]
-    else:
-        userlist = [i for i in User.objects.all()]
+        # Weight entries
+        for i in range(args.number_weight, 0, -1):
+            weight += trend + rng.gauss(0, 0.3)
+            creation_date = end_date - datetime.timedelta(days=i - 1)
+            if (user_pk, creation_date) not in existing:
+                new_entries.append(WeightEntry(user_id=user_pk,
+                                               weight=round(max(weight, 40), 1),
+                                               date=creation_date))
 
-    for user in userlist:
-        new_entries = []
-        print('   - generating for {0}'.format(user.username))
+    # Bulk-create the weight entries
+    WeightEntry.objects.bulk_create(new_entries, batch_size=args.batch_size)
+    return {'weight entries': len(new_entries)}
 
-        existing_entries = [i.date for i in WeightEntry.objects.filter(user=user)]
 
-        # Weight entries
-        for i in range(1, args.number_weight):
+if hasattr(args, 'number_weight'):
+    print("** Generating {0} weight entries per user".format(args.number_weight))
+    run('weight', generate_weight, split(get_user_pks()))
 
-            creation_date = datetime.date.today() - datetime.timedelta(days=i)
-            if creation_date not in existing_entries:
-                entry = WeightEntry(user=user,
-                                    weight=args.base_weight + 0.5 * i + random.randint(1, 3),
-                                    date=creation_date)
-                new_entries.append(entry)
 
-        # Bulk-create the weight entries
-        WeightEntry.objects.bulk_create(new_entries)
+#
+# Nutrition generator
+#
+def generate_nutrition(user_pks):
+    '''
+    Creates the nutrition plans for a chunk of users
+    '''
+    with transaction.atomic():
+        plans = []
+        structure = []
+        for user_pk in user_pks:
+            rng = get_random('nutrition', user_pk)
+            for i in range(args.number_nutrition_plans):
+                plans.append(NutritionPlan(user_id=user_pk,
+                                           language_id=language_pk,
+                                           description='Dummy nutrition plan - {0:04x}'.format(
+                                               rng.getrandbits(16))))
+
+                # Most plans have three to five meals with a few items each
+                nr_of_meals = weighted_choice(rng, [2, 3, 4, 5, 6], [5, 30, 35, 20, 10])
+                structure.append([[(rng.choice(ingredient_list), rng.randint(10, 250))
+                                   for k in range(min(1 + int(rng.expovariate(0.5)), 10))]
+                                  for j in range(nr_of_meals)])
+        insert(NutritionPlan, plans)
+
+        meals = []
+        for plan, plan_meals in zip(plans, structure):
+            for order in range(1, len(plan_meals) + 1):
+                meals.append(Meal(plan_id=plan.pk, order=order))
+        bulk_create_children(Meal, meals, 'plan_id')
+
+        items = []
+        position = 0
+        for plan_meals in structure:
+            for meal_items in plan_meals:
+                meal = meals[position]
+                position += 1
+                for order, (ingredient, amount) in enumerate(meal_items, 1):
+                    items.append(MealItem(meal_id=meal.pk,
+                                          ingredient_id=ingredient,
+                                          order=order,
+                                          amount=amount))
+        MealItem.objects.bulk_create(items, batch_size=args.batch_size)
+
+    return {'nutrition plans': len(plans), 'meals': len(meals), 'meal items': len(items)}
+
 
-# Nutrition Generator
 if hasattr(args, 'number_nutrition_plans'):
     print("** Generating {0} nutrition plan(s) per user".format(args.number_nutrition_plans))
 
-    if args.add_to_user:
-        userlist = [User.objects.get(pk=args.add_to_user)]
-    else:
-        userlist = [i for i in User.objects.all()]
-
-    # Load all ingredients to a list
-    ingredientList = [i for i in Ingredient.objects.order_by('?').all()[:100]]
-
-    # Total meals per plan
-    total_meals = 4
-
-    for user in userlist:
-        print('   - generating for {0}'.format(user.username))
-
-        # Add nutrition plan
-        for i in range(0, args.number_nutrition_plans):
-            uid = str(uuid.uuid4()).split('-')
-            start_date = datetime.date.today() - datetime.timedelta(days=random.randint(0, 100))
-            nutrition_plan = NutritionPlan(language=Language.objects.all()[1], description='Dummy nutrition plan - {0}'.format(uid[1]),
-                              creation_date=start_date)
-            nutrition_plan.user = user
-
-            nutrition_plan.save()
-
-            # Add meals to plan
-            order = 1
-            for j in range(0, total_meals):
-                meal = Meal(plan=nutrition_plan, order=order)
-                meal.save()
-                for k in range(0, random.randint(1,5)):
-                    ingredient = random.choice(ingredientList)
-                    meal_item = MealItem(meal=meal, ingredient=ingredient, weight_unit=None, order=order, amount=random.randint(10, 250))
-                    meal_item.save()
-                order = order + 1
+    # Load some ingredients to a list
+    ingredient_list = list(Ingredient.objects.order_by('pk').values_list('pk', flat=True))
+    ingredient_list = get_random('nutrition', 'ingredients').sample(ingredient_list,
+                                                                    min(100, len(ingredient_list)))
+    language_pk = Language.objects.get(short_name='en').pk
+    run('nutrition', generate_nutrition, split(get_user_pks()))
@@ -19,8 +19,11 @@
 import logging
 
 # Third Party
-from django.core.cache import cache
-from django.db import models
+from django.db import (
+    models,
+    transaction
+)
+from django.db.models import Q
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
@@ -29,15 +32,17 @@ from wger.core.models import (
     Language,
     UserProfile
 )
-from wger.gym.helpers import is_any_gym_admin
-from wger.gym.models import (
-    Gym,
-    GymUserConfig
+from wger.gym.helpers import (
+    DEFAULT_GYM_BACKGROUND_THRESHOLD,
+    assign_default_gym
 )
+from wger.gym.models import Gym
 from wger.utils.cache import (
+    cache_delete,
     cache_mapper,
     delete_template_fragment_cache
 )
+from wger.utils.jobs import enqueue
 
 
 logger = logging.getLogger(__name__)
@@ -88,7 +93,7 @@ class LanguageConfig(models.Model):
         super(LanguageConfig, self).save(*args, **kwargs)
 
         # Cached objects
-        cache.delete(cache_mapper.get_language_config_key(self.language, self.item))
+        cache_delete(cache_mapper.get_language_config_key(self.language, self.item))
 
         # Cached template fragments
         delete_template_fragment_cache('muscle-overview', self.language_id)
@@ -100,7 +105,7 @@ class LanguageConfig(models.Model):
         '''
 
         # Cached objects
-        cache.delete(cache_mapper.get_language_config_key(self.language, self.item))
+        cache_delete(cache_mapper.get_language_config_key(self.language, self.item))
 
         # Cached template fragments
         delete_template_fragment_cache('muscle-overview', self.language_id)
@@ -142,20 +147,16 @@ class GymConfig(models.Model):
         '''
         if self.default_gym:
 
-            # All users that have no gym set in the profile are edited
-            UserProfile.objects.filter(gym=None).update(gym=self.default_gym)
-
-            # All users in the gym must have a gym config
-            for profile in UserProfile.objects.filter(gym=self.default_gym):
-                user = profile.user
-                if not is_any_gym_admin(user):
-                    try:
-                        user.gymuserconfig
-                    except GymUserConfig.DoesNotExist:
-                        config = GymUserConfig()
-                        config.gym = self.default_gym
-                        config.user = user
-                        config.save()
-                        logger.debug('Creating GymUserConfig for user {0}'.format(user.username))
+            # All users that have no gym set in the profile are moved to the
+            # default gym, and all users in the gym must have a gym config.
+            # On large installations this is done in the background.
+            gym_pk = self.default_gym.pk
+            profile_count = UserProfile.objects.filter(Q(gym=None) | Q(gym=gym_pk)).count()
+            if profile_count >= DEFAULT_GYM_BACKGROUND_THRESHOLD:
+                transaction.on_commit(lambda: enqueue(assign_default_gym,
+                                                      args=(gym_pk,),
+                                                      key='default-gym-{0}'.format(gym_pk)))
+            else:
+                assign_default_gym(gym_pk)
 
         return super(GymConfig, self).save(*args, **kwargs)
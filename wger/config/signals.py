@@ -22,6 +22,11 @@ from django.dispatch import receiver
 # wger
 from wger.config.models import LanguageConfig
 from wger.core.models import Language
+from wger.utils.cache import (
+    cache_delete,
+    cache_mapper,
+    delete_template_fragment_cache
+)
 
 
 @receiver(post_save, sender=Language)
@@ -29,20 +34,31 @@ def init_language_config(sender, instance, created, **kwargs):
     '''
     Creates language config entries when new languages are created
     (all combinations of all languages)
+
+    The existing entries are loaded at once and only the missing ones are
+    inserted, in bulk. If nothing is missing, nothing is written.
     '''
-    for language_source in Language.objects.all():
-        for language_target in Language.objects.all():
-            if not LanguageConfig.objects.filter(language=language_source)\
-                                         .filter(language_target=language_target)\
-                                         .exists():
-
-                for item in LanguageConfig.SHOW_ITEM_LIST:
-                    config = LanguageConfig()
-                    config.language = language_source
-                    config.language_target = language_target
-                    config.item = item[0]
-                    if language_source == language_target:
-                        config.show = True
-                    else:
-                        config.show = False
-                    config.save()
+    language_pks = list(Language.objects.values_list('pk', flat=True))
+    existing = set(LanguageConfig.objects.values_list('language_id', 'language_target_id', 'item'))
+
+    missing = []
+    for language_source in language_pks:
+        for language_target in language_pks:
+            for item, name in LanguageConfig.SHOW_ITEM_LIST:
+                if (language_source, language_target, item) not in existing:
+                    missing.append(LanguageConfig(language_id=language_source,
+                                                  language_target_id=language_target,
+                                                  item=item,
+                                                  show=language_source == language_target))
+    if not missing:
+        return
+
+    LanguageConfig.objects.bulk_create(missing)
+
+    # bulk_create doesn't call save(), reset the caches of every changed
+    # source language and item once
+    for language_pk, item in set((i.language_id, i.item) for i in missing):
+        cache_delete(cache_mapper.get_language_config_key(language_pk, item))
+    for language_pk in set(i.language_id for i in missing):
+        delete_template_fragment_cache('muscle-overview', language_pk)
+        delete_template_fragment_cache('exercise-overview', language_pk)
@@ -18,11 +18,14 @@
 # Third Party
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 # wger
 from wger.config.models import GymConfig
 from wger.core.models import UserProfile
 from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.gym.helpers import assign_default_gym
 from wger.gym.models import (
     Gym,
     GymUserConfig
@@ -98,3 +101,28 @@ class GymConfigTestCase(WorkoutManagerTestCase):
 
         # 13 non-managers
         self.assertEqual(GymUserConfig.objects.filter(gym=gym).count(), 13)
+
+    def test_update_userprofile_queries(self):
+        '''
+        Test that the users are updated in bulk
+        '''
+        UserProfile.objects.update(gym=None)
+        GymUserConfig.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            updated, created = assign_default_gym(2)
+        self.assertEqual(updated, 24)
+        self.assertEqual(created, 13)
+        self.assertLess(len(queries), 10)
+
+        # Users that already have a config are left alone
+        self.assertEqual(assign_default_gym(2), (0, 0))
+        self.assertEqual(GymUserConfig.objects.filter(gym_id=2).count(), 13)
+
+    def test_delete_gym(self):
+        '''
+        Test that deleting a gym removes it from the members' profiles
+        '''
+        self.assertTrue(UserProfile.objects.filter(gym_id=2).exists())
+        Gym.objects.get(pk=2).delete()
+        self.assertFalse(UserProfile.objects.filter(gym_id=2).exists())
@@ -17,7 +17,11 @@
 
 # wger
 from wger.config.models import LanguageConfig
-from wger.core.tests.base_testcase import WorkoutManagerEditTestCase
+from wger.core.models import Language
+from wger.core.tests.base_testcase import (
+    WorkoutManagerEditTestCase,
+    WorkoutManagerTestCase
+)
 
 
 class EditLanguageConfigTestCase(WorkoutManagerEditTestCase):
@@ -29,3 +33,39 @@ class EditLanguageConfigTestCase(WorkoutManagerEditTestCase):
     url = 'config:language_config:edit'
     pk = 1
     data = {'show': False}
+
+
+class InitLanguageConfigTestCase(WorkoutManagerTestCase):
+    '''
+    Tests creating the language configs when saving languages
+    '''
+
+    def test_new_language(self):
+        '''
+        Test that all combinations with a new language are created
+        '''
+        item_count = len(LanguageConfig.SHOW_ITEM_LIST)
+        language_count = Language.objects.count()
+        config_count = LanguageConfig.objects.count()
+
+        language = Language.objects.create(short_name='eo', full_name='Esperanto')
+        self.assertEqual(LanguageConfig.objects.count(),
+                         config_count + (2 * language_count + 1) * item_count)
+
+        self.assertEqual(LanguageConfig.objects.filter(language=language,
+                                                       language_target=language,
+                                                       show=True).count(),
+                         item_count)
+        self.assertFalse(LanguageConfig.objects.filter(language=language, show=True)
+                         .exclude(language_target=language).exists())
+
+    def test_nothing_missing(self):
+        '''
+        Test that nothing is written if all configs already exist
+        '''
+        language = Language.objects.get(pk=1)
+        language.save()
+
+        # Update of the language, list of languages and list of configs
+        with self.assertNumQueries(3):
+            language.save()
@@ -28,6 +28,7 @@ from django.utils.translation import ugettext as _
 # wger
 from wger.core.models import DaysOfWeek
 from wger.exercises.models import Exercise
+from wger.manager import analytics
 from wger.manager.models import (
     Day,
     Schedule,
@@ -44,6 +45,7 @@ from wger.nutrition.models import (
     MealItem,
     NutritionPlan
 )
+from wger.utils.cache import reset_content_version
 from wger.utils.language import load_language
 from wger.weight.models import WeightEntry
 
@@ -188,8 +190,9 @@ def create_demo_entries(user):
 
     Setting.objects.bulk_create(setting_list)
 
-    # Save all the log entries
+    # Save all the log entries, bulk_create sends no signals
     WorkoutLog.objects.bulk_create(weight_log)
+    analytics.rebuild([user.pk])
 
     #
     # (Body) weight entries
@@ -204,6 +207,7 @@ def create_demo_entries(user):
                                 date=creation_date)
             temp.append(entry)
     WeightEntry.objects.bulk_create(temp)
+    reset_content_version('weight', user.pk)
 
     #
     # Nutritional plan
@@ -181,3 +181,35 @@ class FeedbackAnonymousForm(FeedbackRegisteredForm):
     captcha = ReCaptchaField(attrs={'theme': 'clean'},
                              label=_('Confirmation text'),
                              help_text=_('As a security measure, please enter the previous words'),)
+
+
+class UserListFilterForm(forms.Form):
+    '''
+    Form used to validate the filters, sorting and page of the user lists
+
+    See wger.core.helpers.filter_user_list and get_user_list_page
+    '''
+    TEMPORARY_CHOICES = (('', ''),
+                         ('1', _('Only temporary users')),
+                         ('0', _('Only regular users')))
+    SORT_CHOICES = (('id', _('ID')),
+                    ('-id', _('ID (descending)')),
+                    ('username', _('Username')),
+                    ('-username', _('Username (descending)')))
+
+    q = forms.CharField(max_length=100, required=False)
+    gym = forms.IntegerField(min_value=0, required=False)
+    members_only = forms.BooleanField(required=False)
+    temporary = forms.ChoiceField(choices=TEMPORARY_CHOICES, required=False)
+    active_since = forms.DateField(required=False)
+    inactive_since = forms.DateField(required=False)
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+    cursor = forms.CharField(max_length=500, required=False)
+    limit = forms.IntegerField(min_value=1, required=False)
+
+    def clean_temporary(self):
+        '''
+        Convert the flag to a boolean
+        '''
+        temporary = self.cleaned_data['temporary']
+        return None if temporary == '' else temporary == '1'
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import base64
+import datetime
+import json
+
+# Third Party
+import six
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.utils import translation
+
+# wger
+from wger.gym.models import Gym
+from wger.manager.models import Schedule
+from wger.nutrition.models import NutritionPlan
+from wger.weight.helpers import group_log_entries
+
+
+USER_LIST_PAGE_SIZE = 50
+'''Default number of users per page of the user lists'''
+
+USER_LIST_MAX_PAGE_SIZE = 500
+'''Maximum number of users per page of the user lists'''
+
+USER_LIST_SORT_FIELDS = ('id', 'username')
+'''Fields the user lists can be sorted by, they need to be unique and indexed'''
+
+
+def warm_user_cache(pk):
+    '''
+    Fills the cache with the data the dashboard and workout views of a user need
+
+    This calculates the canonical form of the current workout, the nutritional
+    values of the last nutrition plan and the logs of the current month. The
+    texts are generated in the user's notification language.
+
+    This is used by the warm-cache command, so it only takes and returns simple
+    (picklable) values.
+
+    :param pk: the ID of the user
+    :return: a tuple with the ID and an error message or None
+    '''
+    try:
+        user = User.objects.select_related('userprofile__notification_language').get(pk=pk)
+        with translation.override(user.userprofile.notification_language.short_name):
+            workout, schedule = Schedule.objects.get_current_workout(user)
+            if workout:
+                workout.canonical_representation
+
+            plan = NutritionPlan.objects.filter(user=user).order_by('-creation_date').first()
+            if plan:
+                plan.get_nutritional_values()
+
+            today = datetime.date.today()
+            group_log_entries(user, today.year, today.month)
+        return pk, None
+    except Exception as e:
+        return pk, str(e)
+
+
+def filter_user_list(queryset, search=None, gym=None, members_only=False,
+                     temporary=None, active_since=None, inactive_since=None):
+    '''
+    Filters a queryset of users for the user lists
+
+    :param queryset: the users to filter
+    :param search: only users whose username, email or name contain this text
+    :param gym: only users of the gym with this ID, 0 for users without a gym
+    :param members_only: with a gym, only its members (not trainers, etc.)
+    :param temporary: True or False to only show temporary (demo) or regular users
+    :param active_since: only users with an activity on or after this date
+    :param inactive_since: only users without an activity since this date
+    '''
+    if search:
+        queryset = queryset.filter(Q(username__icontains=search) |
+                                   Q(email__icontains=search) |
+                                   Q(first_name__icontains=search) |
+                                   Q(last_name__icontains=search))
+    if gym is not None:
+        if gym and members_only:
+            queryset = queryset.filter(pk__in=Gym.objects.get_members(gym).values('pk'))
+        else:
+            queryset = queryset.filter(userprofile__gym_id=gym or None)
+    if temporary is not None:
+        queryset = queryset.filter(userprofile__is_temporary=temporary)
+    if active_since:
+        queryset = queryset.filter(usercache__last_activity__gte=active_since)
+    if inactive_since:
+        queryset = queryset.filter(Q(usercache__last_activity__lt=inactive_since) |
+                                   Q(usercache__last_activity__isnull=True))
+    return queryset
+
+
+def encode_user_list_cursor(user, field):
+    '''
+    Returns the opaque cursor pointing after a user in a sorted user list
+
+    :param user: the last user of the current page
+    :param field: the field the list is sorted by
+    '''
+    data = json.dumps([getattr(user, field), user.pk])
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def decode_user_list_cursor(cursor):
+    '''
+    Returns the sort value and user ID of a cursor
+
+    :raise ValueError: if the cursor is invalid
+    '''
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(str(cursor)).decode('utf-8'))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(pk, six.integer_types):
+        raise ValueError('Invalid cursor')
+    return value, pk
+
+
+def get_user_list_page(queryset, sort='id', cursor=None, limit=USER_LIST_PAGE_SIZE):
+    '''
+    Returns one page of a user list, with keyset pagination
+
+    Instead of an offset, the following page starts after the sort value of
+    the last user of the current one, so every page only reads its own rows
+    from the (sorted) index, no matter how far in the list it is. The user ID
+    is added as tie-breaker.
+
+    :param queryset: the (filtered) users
+    :param sort: the field to sort by, see USER_LIST_SORT_FIELDS. Prefix it
+                 with a '-' to sort in descending order.
+    :param cursor: the cursor of the page to return, None for the first one
+    :param limit: the number of users per page
+    :return: a tuple with the list of users and the cursor of the next page,
+             None if this was the last one
+    :raise ValueError: if the sort field or the cursor are invalid
+    '''
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in USER_LIST_SORT_FIELDS:
+        raise ValueError('Invalid sort field {0}'.format(field))
+
+    lookup = 'lt' if descending else 'gt'
+    if cursor:
+        value, pk = decode_user_list_cursor(cursor)
+        if field == 'id':
+            queryset = queryset.filter(**{'pk__' + lookup: pk})
+        else:
+            queryset = queryset.filter(Q(**{field + '__' + lookup: value}) |
+                                       Q(**{field: value, 'pk__' + lookup: pk}))
+
+    order = [sort] if field == 'id' else [sort, '-pk' if descending else 'pk']
+    users = list(queryset.order_by(*order)[:limit + 1])
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_user_list_cursor(users[-1], field)
+    return users, next_cursor
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 *-*
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Third Party
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# wger
+from wger.utils.cache import (
+    get_cache_stats,
+    reset_cache_stats
+)
+
+
+class Command(BaseCommand):
+    '''
+    Prints the cache statistics per key family
+    '''
+
+    help = 'Prints the hits, misses, sets, invalidations and stored bytes of the ' \
+           'cache for each key family. The statistics are only collected if ' \
+           'WGER_SETTINGS["CACHE_STATS"] is set.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset',
+                            action='store_true',
+                            dest='reset',
+                            default=False,
+                            help='Reset the counters after printing them')
+
+    def handle(self, **options):
+        if not settings.WGER_SETTINGS.get('CACHE_STATS', False):
+            self.stdout.write('Cache statistics are disabled, set '
+                              'WGER_SETTINGS["CACHE_STATS"] to collect them')
+
+        self.stdout.write('{0:<34} {1:>10} {2:>10} {3:>8} {4:>10} {5:>10} {6:>12}'.format(
+            'Family', 'Hits', 'Misses', 'Hit rate', 'Sets', 'Deletes', 'Avg. bytes'))
+
+        for family, counters in sorted(get_cache_stats().items()):
+            hit_rate = counters['hit_rate']
+            average_size = counters['bytes'] // counters['sets'] if counters['sets'] else 0
+            self.stdout.write('{0:<34} {1:>10} {2:>10} {3:>8} {4:>10} {5:>10} {6:>12}'.format(
+                family,
+                counters['hits'],
+                counters['misses'],
+                '{0:.1%}'.format(hit_rate) if hit_rate is not None else '-',
+                counters['sets'],
+                counters['invalidations'],
+                average_size))
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write('Counters were reset')
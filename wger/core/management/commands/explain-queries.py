@@ -0,0 +1,135 @@
+# -*- coding: utf-8 *-*
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import datetime
+
+# Third Party
+from django.contrib.auth.models import User
+from django.core.management.base import (
+    BaseCommand,
+    CommandError
+)
+from django.db import connection
+
+# wger
+from wger.manager.models import (
+    WorkoutLog,
+    WorkoutSession
+)
+from wger.nutrition.models import NutritionPlan
+from wger.weight.models import WeightEntry
+
+
+class Command(BaseCommand):
+    '''
+    Prints the query plans of the most frequent queries
+    '''
+
+    help = 'Prints the database query plans (EXPLAIN) of the most frequent queries. ' \
+           'Use this to check that the indexes are used, e.g. after changing a query ' \
+           'or the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user',
+                            action='store',
+                            dest='user',
+                            default=None,
+                            help='Username to use in the queries (default: the user '
+                                 'with the most recent workout log)')
+
+        parser.add_argument('--analyze',
+                            action='store_true',
+                            dest='analyze',
+                            default=False,
+                            help='Execute the queries and show the actual timings '
+                                 '(PostgreSQL only)')
+
+    def handle(self, **options):
+        '''
+        Process the options
+        '''
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError('User {0} does not exist'.format(options['user']))
+        else:
+            user_id = WorkoutLog.objects.order_by('-id').values_list('user', flat=True).first()
+            user = User.objects.filter(pk=user_id).first() or User.objects.first()
+            if user is None:
+                raise CommandError('There are no users in the database')
+
+        for name, queryset in self.get_queries(user):
+            self.stdout.write('*** {0}'.format(name))
+            sql, params = queryset.query.sql_with_params()
+            if int(options['verbosity']) >= 2:
+                self.stdout.write(sql % params)
+            for line in self.explain(sql, params, options['analyze']):
+                self.stdout.write('    {0}'.format(line))
+            self.stdout.write('')
+
+    def get_queries(self, user):
+        '''
+        Returns the querysets to explain, with values from the user's data
+
+        :return: list of (description, queryset) tuples
+        '''
+        today = datetime.date.today()
+        last_log = WorkoutLog.objects.filter(user=user).order_by('-date').first()
+        exercise_id = last_log.exercise_id if last_log else 1
+        reps = last_log.reps if last_log else 10
+
+        return [
+            ('Workout log calendar (user, date)',
+             WorkoutLog.objects.filter(user=user, date__year=today.year, date__month=today.month)),
+            ('Workout log months (user, date)',
+             WorkoutLog.objects.filter(user=user).dates('date', 'month')),
+            ('Last weight (user, exercise, reps, -date)',
+             WorkoutLog.objects.filter(user=user,
+                                       exercise_id=exercise_id,
+                                       reps=reps).order_by('-date')[:1]),
+            ('Exercise logs (user, exercise)',
+             WorkoutLog.objects.filter(user=user, exercise_id=exercise_id)),
+            ('Workout session (user, date)',
+             WorkoutSession.objects.filter(user=user, date=today)),
+            ('Latest weight entry (user, -date)',
+             WeightEntry.objects.filter(user=user).order_by('-date')[:1]),
+            ('Latest nutrition plan (user, creation_date)',
+             NutritionPlan.objects.filter(user=user).order_by('-creation_date')[:1]),
+        ]
+
+    @staticmethod
+    def explain(sql, params, analyze=False):
+        '''
+        Returns the query plan of a query as a list of lines
+        '''
+        if connection.vendor == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif connection.vendor == 'postgresql' and analyze:
+            prefix = 'EXPLAIN ANALYZE '
+        else:
+            prefix = 'EXPLAIN '
+
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+
+        # SQLite returns the description in the last column, PostgreSQL one
+        # line per row and MySQL a table.
+        if connection.vendor in ('sqlite', 'postgresql'):
+            return [row[-1] for row in rows]
+        return [' | '.join([str(column) for column in row]) for row in rows]
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 *-*
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import os
+import pstats
+
+# Third Party
+import six
+from django.contrib.auth.models import User
+from django.core.management.base import (
+    BaseCommand,
+    CommandError
+)
+
+# wger
+from wger.utils.profiler import (
+    get_profile_dir,
+    get_profiles,
+    make_profile_token
+)
+
+
+class Command(BaseCommand):
+    '''
+    Prints a report of the profiles collected by the ProfilerMiddleware
+    '''
+
+    help = 'Aggregates the profiles collected by the sampling profiler and prints ' \
+           'the functions where most time was spent, per URL name.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url-name',
+                            action='append',
+                            dest='url_names',
+                            default=[],
+                            help='Only show the report for this URL name, e.g. '
+                                 'manager:workout:view. Can be given more than once')
+
+        parser.add_argument('--limit',
+                            action='store',
+                            dest='limit',
+                            type=int,
+                            default=20,
+                            help='Number of functions to show per URL (default: 20)')
+
+        parser.add_argument('--sort',
+                            action='store',
+                            dest='sort',
+                            default='tottime',
+                            choices=['tottime', 'cumulative', 'calls'],
+                            help='Sort the functions by their own time, the time '
+                                 'including the called functions or the number of '
+                                 'calls (default: tottime)')
+
+        parser.add_argument('--clear',
+                            action='store_true',
+                            dest='clear',
+                            default=False,
+                            help='Delete the profiles after the report')
+
+        parser.add_argument('--token',
+                            action='store',
+                            dest='token',
+                            default=None,
+                            help='Print the X-Wger-Profile header that profiles the '
+                                 'requests of the given staff user and exit')
+
+    def handle(self, **options):
+        '''
+        Process the options
+        '''
+        if options['token']:
+            try:
+                user = User.objects.get(username=options['token'], is_staff=True)
+            except User.DoesNotExist:
+                raise CommandError('Staff user {0} does not exist'.format(options['token']))
+            self.stdout.write('X-Wger-Profile: {0}'.format(make_profile_token(user)))
+            return
+
+        profiles = get_profiles()
+        if not profiles:
+            self.stdout.write('No profiles found in {0}'.format(get_profile_dir()))
+            return
+
+        for url_name, files in sorted(profiles.items()):
+            if options['url_names'] and url_name not in options['url_names']:
+                continue
+
+            self.stdout.write('*** {0} ({1} profiles)'.format(url_name, len(files)))
+            report = six.StringIO()
+            stats = pstats.Stats(*files, stream=report)
+            stats.strip_dirs()
+            stats.sort_stats(options['sort'])
+            stats.print_stats(options['limit'])
+            self.stdout.write(report.getvalue())
+
+            if options['clear']:
+                for filename in files:
+                    os.remove(filename)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 *-*
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import datetime
+import multiprocessing
+import time
+
+# Third Party
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+# wger
+from wger.core.helpers import warm_user_cache
+from wger.core.models import UserCache
+
+
+class Command(BaseCommand):
+    '''
+    Fills the cache for the recently active users
+    '''
+
+    help = 'Fills the cache with the current workout, the nutritional values of the ' \
+           'last nutrition plan and the workout logs of the current month of all ' \
+           'recently active users. Useful after a deploy or after clearing the cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days',
+                            action='store',
+                            dest='days',
+                            type=int,
+                            default=30,
+                            help='Only users that were active in the last number of '
+                                 'days (default: 30)')
+
+        parser.add_argument('--processes',
+                            action='store',
+                            dest='processes',
+                            type=int,
+                            default=multiprocessing.cpu_count(),
+                            help='Number of processes to use (default: number of CPUs)')
+
+        parser.add_argument('--rate',
+                            action='store',
+                            dest='rate',
+                            type=float,
+                            default=0,
+                            help='Maximum number of users processed per second, to '
+                                 'limit the load on the database (default: no limit)')
+
+    def throttle(self, user_ids, rate):
+        '''
+        Yields the user IDs, not more than rate per second
+        '''
+        start = time.time()
+        for count, pk in enumerate(user_ids):
+            if rate:
+                delay = start + count / rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            yield pk
+
+    def handle(self, **options):
+        '''
+        Process the options
+        '''
+        since = datetime.date.today() - datetime.timedelta(days=options['days'])
+        user_ids = list(UserCache.objects.filter(last_activity__gte=since)
+                                         .order_by('-last_activity')
+                                         .values_list('user_id', flat=True))
+        users = self.throttle(user_ids, options['rate'])
+
+        if options['processes'] > 1:
+            # The child processes can't share the database connections
+            connections.close_all()
+            pool = multiprocessing.Pool(options['processes'])
+            results = pool.imap_unordered(warm_user_cache, users)
+        else:
+            pool = None
+            results = (warm_user_cache(i) for i in users)
+
+        start = time.time()
+        errors = 0
+        for count, (pk, error) in enumerate(results, 1):
+            if error:
+                errors += 1
+                self.stdout.write('Could not process user {0}: {1}'.format(pk, error))
+            if int(options['verbosity']) >= 2 and (count % 100 == 0 or count == len(user_ids)):
+                self.stdout.write('Processed {0} of {1} users ({2:.1f}/s)'.format(
+                    count, len(user_ids), count / max(time.time() - start, 0.001)))
+
+        if pool:
+            pool.close()
+            pool.join()
+
+        self.stdout.write('Warmed the cache of {0} users in {1:.1f}s, {2} errors'
+                          .format(len(user_ids), time.time() - start, errors))
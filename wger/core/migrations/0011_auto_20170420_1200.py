@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_auto_20170403_0144'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usercache',
+            name='last_activity',
+            field=models.DateField(db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='is_temporary',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+    ]
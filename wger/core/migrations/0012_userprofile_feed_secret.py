@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_auto_20170420_1200'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='feed_secret',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
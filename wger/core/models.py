@@ -138,7 +138,8 @@ class UserProfile(models.Model):
     '''
 
     is_temporary = models.BooleanField(default=False,
-                                       editable=False)
+                                       editable=False,
+                                       db_index=True)
     '''
     Flag to mark a temporary user (demo account)
     '''
@@ -330,6 +331,14 @@ by the US Department of Agriculture. It is extremely complete, with around
                                     default=False)
     '''Allow anonymous read-only access'''
 
+    feed_secret = models.CharField(max_length=32,
+                                   editable=False,
+                                   blank=True)
+    '''
+    Secret used to sign the links of the calendar feeds, changing it revokes
+    all of them. Generated on first use, see wger.utils.helpers.make_feed_token
+    '''
+
     num_days_weight_reminder = models.IntegerField(verbose_name=_('Automatic reminders for weight '
                                                                   'entries'),
                                                    help_text=_('Number of days after the last '
@@ -511,7 +520,8 @@ class UserCache(models.Model):
     The user
     '''
 
-    last_activity = models.DateField(null=True)
+    last_activity = models.DateField(null=True,
+                                     db_index=True)
     '''
     The user's last activity.
 
@@ -138,6 +138,10 @@ class BaseTestCase(object):
         # Set logging level
         logging.disable(logging.INFO)
 
+        # Run the background jobs synchronously, otherwise they won't see
+        # the data in the test's transaction
+        settings.WGER_SETTINGS['BACKGROUND_JOBS'] = False
+
         # Set MEDIA_ROOT
         self.media_root = tempfile.mkdtemp()
         settings.MEDIA_ROOT = self.media_root
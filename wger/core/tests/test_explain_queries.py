@@ -0,0 +1,48 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Third Party
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from six import StringIO
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+
+
+class ExplainQueriesTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the explain-queries command
+    '''
+
+    def test_command(self):
+        '''
+        Test that the plans of all the queries are printed
+        '''
+        out = StringIO()
+        call_command('explain-queries', user='admin', stdout=out)
+        output = out.getvalue()
+        self.assertIn('*** Last weight (user, exercise, reps, -date)', output)
+        self.assertIn('*** Latest nutrition plan (user, creation_date)', output)
+        self.assertIn('manager_workoutlog', output)
+
+    def test_wrong_user(self):
+        '''
+        Test passing a user that does not exist
+        '''
+        self.assertRaises(CommandError,
+                          call_command,
+                          'explain-queries',
+                          user='does-not-exist',
+                          stdout=StringIO())
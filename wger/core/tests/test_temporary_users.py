@@ -20,6 +20,7 @@ import random
 from django.contrib.auth.models import User
 from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.db.models import Sum
 
 # wger
 from wger.core.demo import (
@@ -27,8 +28,11 @@ from wger.core.demo import (
     create_temporary_user
 )
 from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.manager import analytics
 from wger.manager.models import (
     Day,
+    ExerciseWeekStats,
+    PersonalRecord,
     Schedule,
     ScheduleStep,
     Workout,
@@ -97,6 +101,21 @@ class DemoUserTestCase(WorkoutManagerTestCase):
         # Body weight
         self.assertEqual(WeightEntry.objects.filter(user=user).count(), 19)
 
+    def test_demo_data_exercise_stats(self):
+        '''
+        Tests that the exercise statistics of the demo logs are created
+        '''
+        self.client.get(reverse('core:dashboard'))
+        user = User.objects.get(pk=User.objects.latest('id').id)
+        self.client.get(reverse('core:user:demo-entries'))
+
+        logs = analytics.get_counted_logs().filter(user=user)
+        self.assertTrue(logs.exists())
+        stats = ExerciseWeekStats.objects.filter(user=user)
+        self.assertEqual(stats.aggregate(count=Sum('log_count'))['count'], logs.count())
+        self.assertEqual(PersonalRecord.objects.filter(user=user).count(),
+                         logs.order_by().values('exercise', 'reps').distinct().count())
+
     def test_demo_data_body_weight(self):
         '''
         Tests that the helper function that creates demo data filters out
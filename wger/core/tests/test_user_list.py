@@ -0,0 +1,161 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import datetime
+import json
+
+# Third Party
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+
+# wger
+from wger.core.helpers import (
+    filter_user_list,
+    get_user_list_page
+)
+from wger.core.models import UserProfile
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+
+
+class UserListPaginationTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the keyset pagination of the user lists
+    '''
+
+    def get_all_pages(self, sort, limit):
+        '''
+        Helper function that follows the cursors until the last page
+        '''
+        users = []
+        cursor = None
+        while True:
+            page, cursor = get_user_list_page(User.objects.all(), sort, cursor, limit)
+            self.assertLessEqual(len(page), limit)
+            users.extend(page)
+            if cursor is None:
+                return users
+
+    def test_pagination_id(self):
+        '''
+        Test paginating through all users, sorted by ID
+        '''
+        users = self.get_all_pages('id', 5)
+        self.assertEqual([i.pk for i in users],
+                         list(User.objects.order_by('pk').values_list('pk', flat=True)))
+
+        users = self.get_all_pages('-id', 7)
+        self.assertEqual([i.pk for i in users],
+                         list(User.objects.order_by('-pk').values_list('pk', flat=True)))
+
+    def test_pagination_username(self):
+        '''
+        Test paginating through all users, sorted by username
+        '''
+        users = self.get_all_pages('-username', 4)
+        self.assertEqual([i.username for i in users],
+                         list(User.objects.order_by('-username')
+                              .values_list('username', flat=True)))
+
+    def test_invalid(self):
+        '''
+        Test invalid sort fields and cursors
+        '''
+        self.assertRaises(ValueError, get_user_list_page, User.objects.all(), 'email')
+        self.assertRaises(ValueError, get_user_list_page, User.objects.all(), 'id', 'abc')
+
+    def test_filters(self):
+        '''
+        Test filtering the users
+        '''
+        users = filter_user_list(User.objects.all(), search='member1')
+        self.assertEqual(sorted(users.values_list('username', flat=True)),
+                         ['member1', 'member10', 'member11'])
+
+        users = filter_user_list(User.objects.all(), gym=2)
+        self.assertEqual(set(users.values_list('pk', flat=True)),
+                         set(UserProfile.objects.filter(gym_id=2)
+                             .values_list('user_id', flat=True)))
+
+        users = filter_user_list(User.objects.all(), gym=1, members_only=True)
+        self.assertIn(14, users.values_list('pk', flat=True))
+        self.assertNotIn(4, users.values_list('pk', flat=True))
+
+        UserProfile.objects.filter(user_id=3).update(is_temporary=True)
+        users = filter_user_list(User.objects.all(), temporary=True)
+        self.assertEqual(list(users.values_list('pk', flat=True)), [3])
+
+        users = filter_user_list(User.objects.all(), active_since=datetime.date(2000, 1, 1))
+        inactive = filter_user_list(User.objects.all(), inactive_since=datetime.date(2000, 1, 1))
+        self.assertEqual(users.count() + inactive.count(), User.objects.count())
+
+
+class UserListDataTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the JSON endpoint of the user lists
+    '''
+
+    url = reverse('core:user:list-data')
+
+    def test_general_manager(self):
+        '''
+        Test that general managers can list all users
+        '''
+        self.user_login('general_manager1')
+        response = self.client.get(self.url, {'limit': 10})
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.content.decode('utf8'))
+        self.assertEqual(len(data['results']), 10)
+        self.assertTrue(data['next'])
+        self.assertEqual(data['results'][0]['id'], 1)
+
+        response = self.client.get(self.url, {'limit': 10, 'cursor': data['next']})
+        data = json.loads(response.content.decode('utf8'))
+        self.assertEqual(data['results'][0]['id'], 11)
+
+    def test_trainer(self):
+        '''
+        Test that trainers can only list the users of their own gym
+        '''
+        self.user_login('trainer1')
+        response = self.client.get(self.url, {'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf8'))
+        self.assertTrue(data['results'])
+        for user in data['results']:
+            self.assertEqual(user['gym']['id'], 1)
+
+        response = self.client.get(self.url, {'gym': 2})
+        self.assertEqual(response.status_code, 403)
+
+    def test_access(self):
+        '''
+        Test that regular users and anonymous users can't access the list
+        '''
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+        self.user_login('member1')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_parameters(self):
+        '''
+        Test that invalid parameters are rejected
+        '''
+        self.user_login('general_manager1')
+        self.assertEqual(self.client.get(self.url, {'cursor': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'sort': 'email'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, 400)
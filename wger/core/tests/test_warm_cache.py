@@ -0,0 +1,50 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import datetime
+
+# Third Party
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from six import StringIO
+
+# wger
+from wger.core.models import UserCache
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.manager.models import Schedule
+from wger.utils.cache import cache_mapper
+
+
+class WarmCacheTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the warm-cache command
+    '''
+
+    def test_command(self):
+        '''
+        Test that only the recently active users are processed
+        '''
+        today = datetime.date.today()
+        UserCache.objects.filter(user_id=2).update(last_activity=today)
+
+        out = StringIO()
+        call_command('warm-cache', processes=1, stdout=out)
+        self.assertIn('Warmed the cache of 1 users', out.getvalue())
+        self.assertIsNotNone(cache.get(cache_mapper.get_current_workout_key(2, today)))
+        self.assertIsNone(cache.get(cache_mapper.get_current_workout_key(1, today)))
+
+        workout, schedule = Schedule.objects.get_current_workout(User.objects.get(pk=2))
+        self.assertTrue(cache.get(cache_mapper.get_workout_canonical(workout.pk)))
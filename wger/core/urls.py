@@ -95,6 +95,9 @@ patterns_user = [
     url(r'^(?P<pk>\d+)/overview',
         user.UserDetailView.as_view(),
         name='overview'),
+    url(r'^list/data$',
+        user.user_list_data,
+        name='list-data'),
     url(r'^list',
         user.UserListView.as_view(),
         name='list'),
@@ -202,6 +205,9 @@ urlpatterns = [
     url(r'^feedback$',
         misc.FeedbackClass.as_view(),
         name='feedback'),
+    url(r'^cache-stats$',
+        misc.cache_stats,
+        name='cache-stats'),
 
     url(r'^language/', include(patterns_language, namespace="language")),
     url(r'^user/', include(patterns_user, namespace="user")),
@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU Affero General Public License
 
 # Standard Library
+import json
 import logging
 
 # Third Party
@@ -28,7 +29,11 @@ from django.core.urlresolvers import (
     reverse,
     reverse_lazy
 )
-from django.http import HttpResponseRedirect
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    HttpResponseRedirect
+)
 from django.shortcuts import render
 from django.template.loader import render_to_string
 from django.utils.translation import ugettext as _
@@ -47,6 +52,7 @@ from wger.core.forms import (
 from wger.core.models import DaysOfWeek
 from wger.manager.models import Schedule
 from wger.nutrition.models import NutritionPlan
+from wger.utils.cache import get_cache_stats
 from wger.weight.helpers import get_last_entries
 from wger.weight.models import WeightEntry
 
@@ -92,6 +98,21 @@ def demo_entries(request):
     return HttpResponseRedirect(reverse('core:dashboard'))
 
 
+@login_required
+def cache_stats(request):
+    '''
+    Returns the hits, misses, etc. of the cache per key family as JSON
+
+    Only available to staff members.
+    '''
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+
+    data = {'enabled': settings.WGER_SETTINGS.get('CACHE_STATS', False),
+            'families': get_cache_stats()}
+    return HttpResponse(json.dumps(data, sort_keys=True), 'application/json')
+
+
 @login_required
 def dashboard(request):
     '''
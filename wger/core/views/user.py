@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU Affero General Public License
 
 # Standard Library
+import json
 import logging
 
 # Third Party
@@ -34,6 +35,8 @@ from django.contrib.auth.models import User
 from django.contrib.auth.views import login as django_loginview
 from django.core.urlresolvers import reverse
 from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
     HttpResponseForbidden,
     HttpResponseRedirect
 )
@@ -49,8 +52,8 @@ from django.utils.translation import (
 )
 from django.views.generic import (
     DetailView,
-    ListView,
     RedirectView,
+    TemplateView,
     UpdateView
 )
 from rest_framework.authtoken.models import Token
@@ -61,19 +64,26 @@ from wger.core.forms import (
     PasswordConfirmationForm,
     RegistrationForm,
     RegistrationFormNoCaptcha,
+    UserListFilterForm,
     UserLoginForm,
     UserPersonalInformationForm,
     UserPreferencesForm
 )
+from wger.core.helpers import (
+    USER_LIST_MAX_PAGE_SIZE,
+    USER_LIST_PAGE_SIZE,
+    filter_user_list,
+    get_user_list_page
+)
 from wger.core.models import Language
 from wger.gym.models import (
     AdminUserNote,
     Contract,
+    Gym,
     GymUserConfig
 )
 from wger.manager.models import (
     Workout,
-    WorkoutLog,
     WorkoutSession
 )
 from wger.nutrition.models import NutritionPlan
@@ -502,14 +512,7 @@ class UserDetailView(LoginRequiredMixin, WgerMultiplePermissionRequiredMixin, De
         Send some additional data to the template
         '''
         context = super(UserDetailView, self).get_context_data(**kwargs)
-        out = []
-        workouts = Workout.objects.filter(user=self.object).all()
-        for workout in workouts:
-            logs = WorkoutLog.objects.filter(workout=workout)
-            out.append({'workout': workout,
-                        'logs': logs.dates('date', 'day').count(),
-                        'last_log': logs.last()})
-        context['workouts'] = out
+        context['workouts'] = Workout.objects.with_log_stats().filter(user=self.object)
         context['weight_entries'] = WeightEntry.objects.filter(user=self.object)\
             .order_by('-date')[:5]
         context['nutrition_plans'] = NutritionPlan.objects.filter(user=self.object)\
@@ -520,37 +523,92 @@ class UserDetailView(LoginRequiredMixin, WgerMultiplePermissionRequiredMixin, De
         return context
 
 
-class UserListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class UserListView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
     '''
     Overview of all users in the instance
+
+    The users are loaded page by page from user_list_data
     '''
-    model = User
     permission_required = ('gym.manage_gyms',)
     template_name = 'user/list.html'
 
-    def get_queryset(self):
-        '''
-        Return a list with the users, not really a queryset.
-        '''
-        out = {'admins': [],
-               'members': []}
-
-        for u in User.objects.select_related('usercache', 'userprofile__gym').all():
-            out['members'].append({'obj': u,
-                                   'last_log': u.usercache.last_activity})
-
-        return out
-
     def get_context_data(self, **kwargs):
         '''
         Pass other info to the template
         '''
         context = super(UserListView, self).get_context_data(**kwargs)
         context['show_gym'] = True
+        context['show_filters'] = True
+        context['gyms'] = Gym.objects.all()
+        context['user_list_url'] = reverse('core:user:list-data')
         context['user_table'] = {'keys': [_('ID'),
                                           _('Username'),
                                           _('Name'),
                                           _('Last activity'),
-                                          _('Gym')],
-                                 'users': context['object_list']['members']}
+                                          _('Gym')]}
         return context
+
+
+def user_list_data(request):
+    '''
+    Returns one page of a user list as JSON
+
+    The list can be filtered, sorted and paginated with the parameters of
+    UserListFilterForm. The response contains the users and the cursor of the
+    next page, which has to be passed as parameter to get it.
+
+    General managers can list all users, gym managers and trainers only the
+    users of their own gym.
+    '''
+    user = request.user
+    if not user.is_authenticated():
+        return HttpResponseForbidden()
+
+    if not user.has_perm('gym.manage_gyms') \
+            and not user.has_perm('gym.manage_gym') \
+            and not user.has_perm('gym.gym_trainer'):
+        return HttpResponseForbidden()
+
+    form = UserListFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(json.dumps(form.errors), 'application/json')
+    data = form.cleaned_data
+
+    gym = data['gym']
+    if not user.has_perm('gym.manage_gyms'):
+        if not user.userprofile.gym_id or gym not in (None, user.userprofile.gym_id):
+            return HttpResponseForbidden()
+        gym = user.userprofile.gym_id
+
+    queryset = filter_user_list(User.objects.select_related('usercache', 'userprofile__gym'),
+                                search=data['q'],
+                                gym=gym,
+                                members_only=data['members_only'],
+                                temporary=data['temporary'],
+                                active_since=data['active_since'],
+                                inactive_since=data['inactive_since'])
+    try:
+        users, next_cursor = get_user_list_page(queryset,
+                                                sort=data['sort'] or 'id',
+                                                cursor=data['cursor'],
+                                                limit=min(data['limit'] or USER_LIST_PAGE_SIZE,
+                                                          USER_LIST_MAX_PAGE_SIZE))
+    except ValueError as e:
+        return HttpResponseBadRequest(json.dumps({'cursor': [str(e)]}), 'application/json')
+
+    results = []
+    for current_user in users:
+        last_activity = current_user.usercache.last_activity
+        gym = current_user.userprofile.gym
+        results.append({'id': current_user.pk,
+                        'username': current_user.username,
+                        'name': current_user.get_full_name(),
+                        'url': reverse('core:user:overview', kwargs={'pk': current_user.pk}),
+                        'last_activity': last_activity.isoformat() if last_activity else None,
+                        'is_temporary': current_user.userprofile.is_temporary,
+                        'gym': {'id': gym.pk,
+                                'name': gym.name,
+                                'url': gym.get_absolute_url()} if gym else None})
+
+    return HttpResponse(json.dumps({'results': results, 'next': next_cursor}),
+                        'application/json')
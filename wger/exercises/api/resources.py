@@ -16,7 +16,6 @@
 
 # Third Party
 from easy_thumbnails.alias import aliases
-from easy_thumbnails.files import get_thumbnailer
 from tastypie import fields
 from tastypie.constants import (
     ALL,
@@ -29,6 +28,7 @@ from wger.core.api.resources import (
     LanguageResource,
     LicenseResource
 )
+from wger.exercises.helpers import get_thumbnail_url
 from wger.exercises.models import (
     Equipment,
     Exercise,
@@ -102,12 +102,12 @@ class ExerciseImageResource(ModelResource):
 
     def dehydrate(self, bundle):
         '''
-        Also send the URLs for the thumbnailed pictures
+        Also send the URLs for the thumbnailed pictures (or a placeholder, if
+        they are not generated yet)
         '''
         thumbnails = {}
         for alias in aliases.all():
-            t = get_thumbnailer(bundle.obj.image)
-            thumbnails[alias] = {'url': t.get_thumbnail(aliases.get(alias)).url,
+            thumbnails[alias] = {'url': get_thumbnail_url(bundle.obj.image, alias),
                                  'settings': aliases.get(alias)}
 
         bundle.data['thumbnails'] = thumbnails
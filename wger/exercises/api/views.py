@@ -18,7 +18,6 @@
 # Third Party
 from django.utils.translation import ugettext as _
 from easy_thumbnails.alias import aliases
-from easy_thumbnails.files import get_thumbnailer
 from rest_framework import viewsets
 from rest_framework.decorators import (
     api_view,
@@ -38,6 +37,7 @@ from wger.exercises.api.serializers import (
     ExerciseSerializer,
     MuscleSerializer
 )
+from wger.exercises.helpers import get_thumbnail_url
 from wger.exercises.models import (
     Equipment,
     Exercise,
@@ -108,8 +108,7 @@ def search(request):
             if exercise.main_image:
                 image_obj = exercise.main_image
                 image = image_obj.image.url
-                t = get_thumbnailer(image_obj.image)
-                thumbnail = t.get_thumbnail(aliases.get('micro_cropped')).url
+                thumbnail = get_thumbnail_url(image_obj.image, 'micro_cropped')
             else:
                 image = None
                 thumbnail = None
@@ -189,6 +188,8 @@ class ExerciseImageViewSet(viewsets.ModelViewSet):
     def thumbnails(self, request, pk):
         '''
         Return a list of the image's thumbnails
+
+        Thumbnails that are not generated yet point to a placeholder image.
         '''
         try:
             image = ExerciseImage.objects.get(pk=pk)
@@ -197,9 +198,8 @@ class ExerciseImageViewSet(viewsets.ModelViewSet):
 
         thumbnails = {}
         for alias in aliases.all():
-            t = get_thumbnailer(image.image)
             thumbnails[alias] = {
-                'url': t.get_thumbnail(aliases.get(alias)).url,
+                'url': get_thumbnail_url(image.image, alias),
                 'settings': aliases.get(alias)
             }
         thumbnails['original'] = image.image.url
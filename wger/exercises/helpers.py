@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import logging
+
+# Third Party
+from django.contrib.staticfiles.templatetags.staticfiles import static
+from django.db import transaction
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import get_thumbnailer
+
+# wger
+from wger.exercises.models import ExerciseImage
+from wger.utils.jobs import enqueue
+
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_PLACEHOLDER = 'images/icons/image-placeholder.svg'
+'''Static image used while the thumbnails are not yet generated'''
+
+
+def generate_thumbnails(image):
+    '''
+    Generates all the missing thumbnails for an image
+
+    :param image: an image field, e.g. ExerciseImage.image
+    :return: the number of generated thumbnails
+    '''
+    thumbnailer = get_thumbnailer(image)
+    count = 0
+    for alias, options in aliases.all(image).items():
+        if thumbnailer.get_existing_thumbnail(options) is None:
+            thumbnailer.get_thumbnail(options)
+            count += 1
+    return count
+
+
+def generate_exercise_image_thumbnails(pk):
+    '''
+    Generates all the missing thumbnails for an exercise image
+
+    This is used by the generate-thumbnails command, so it only takes and
+    returns simple (picklable) values.
+
+    :param pk: the ID of the exercise image
+    :return: a tuple with the ID, the number of generated thumbnails and an
+             error message or None
+    '''
+    try:
+        image = ExerciseImage.objects.get(pk=pk)
+        return pk, generate_thumbnails(image.image), None
+    except Exception as e:
+        return pk, 0, str(e)
+
+
+def schedule_thumbnails(image):
+    '''
+    Generates the thumbnails for an image in the background
+
+    The job is only queued after the current transaction is committed, so
+    that it is not executed with a half saved image.
+
+    :param image: an image field, e.g. ExerciseImage.image
+    '''
+    transaction.on_commit(lambda: enqueue(generate_thumbnails,
+                                          args=(image,),
+                                          key='thumbnails-{0}'.format(image.name)))
+
+
+def get_thumbnail_url(image, alias):
+    '''
+    Returns the URL of an image's thumbnail, without generating it
+
+    If the thumbnail is not available yet, the URL of a placeholder is returned
+    and the thumbnails are generated in the background.
+
+    :param image: an image field, e.g. ExerciseImage.image
+    :param alias: the thumbnail alias, see THUMBNAIL_ALIASES
+    :return: the thumbnail's URL
+    '''
+    thumbnail = get_thumbnailer(image).get_existing_thumbnail(aliases.get(alias))
+    if thumbnail is None:
+        schedule_thumbnails(image)
+        return static(THUMBNAIL_PLACEHOLDER)
+    return thumbnail.url
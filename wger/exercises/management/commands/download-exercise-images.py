@@ -15,7 +15,12 @@
 # You should have received a copy of the GNU Affero General Public License
 
 # Standard Library
+import hashlib
+import json
 import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 # Third Party
 import requests
@@ -31,6 +36,7 @@ from django.core.management.base import (
     CommandError
 )
 from django.core.validators import URLValidator
+from requests.adapters import HTTPAdapter
 from requests.utils import default_user_agent
 
 # wger
@@ -41,13 +47,38 @@ from wger.exercises.models import (
 )
 
 
+EXERCISE_API = "{0}/api/v2/exercise/?limit=999&status=2"
+IMAGE_API = "{0}/api/v2/exerciseimage/?exercise={1}"
+THUMBNAIL_API = "{0}/api/v2/exerciseimage/{1}/thumbnails/"
+
+CHUNK_SIZE = 64 * 1024
+'''Size of the chunks in which the images are read and written'''
+
+
+def file_hash(path):
+    '''
+    Returns the SHA1 hash of a file on disk, read in chunks
+    '''
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
 class Command(BaseCommand):
     '''
     Download exercise images from wger.de and updates the local database
 
     The script assumes that the local IDs correspond to the remote ones, which
     is the case if the user installed the exercises from the JSON fixtures.
-    Otherwise, the exercise is simply skipped
+    Otherwise, the exercise is simply skipped.
+
+    The network work (fetching the image lists and downloading the files) is
+    done by a pool of threads sharing one HTTP session, while all database
+    operations happen in the main thread. The IDs of the completely processed
+    exercises are saved to a checkpoint file, so an interrupted run can be
+    resumed where it stopped.
     '''
 
     help = ('Download exercise images from wger.de and update the local database\n'
@@ -64,82 +95,253 @@ class Command(BaseCommand):
                             default='https://wger.de',
                             help='Remote URL to fetch the exercises from (default: '
                                  'https://wger.de)')
+        parser.add_argument('--threads',
+                            action='store',
+                            dest='threads',
+                            type=int,
+                            default=8,
+                            help='Number of parallel downloads (default: 8)')
+        parser.add_argument('--checkpoint',
+                            action='store',
+                            dest='checkpoint',
+                            default=None,
+                            help='File used to save the progress, so that an interrupted '
+                                 'run can be resumed (default: '
+                                 '<MEDIA_ROOT>/download-exercise-images.json)')
+        parser.add_argument('--restart',
+                            action='store_true',
+                            dest='restart',
+                            default=False,
+                            help='Ignore the progress of a previous, interrupted run')
 
     def handle(self, **options):
 
         if not settings.MEDIA_ROOT:
             raise ImproperlyConfigured('Please set MEDIA_ROOT in your settings file')
 
-        remote_url = options['remote_url']
+        self.remote_url = options['remote_url']
         try:
             val = URLValidator()
-            val(remote_url)
+            val(self.remote_url)
         except ValidationError:
             raise CommandError('Please enter a valid URL')
 
-        exercise_api = "{0}/api/v2/exercise/?limit=999&status=2"
-        image_api = "{0}/api/v2/exerciseimage/?exercise={1}"
-        thumbnail_api = "{0}/api/v2/exerciseimage/{1}/thumbnails/"
+        threads = max(options['threads'], 1)
+        self.checkpoint_path = options['checkpoint'] or os.path.join(
+            settings.MEDIA_ROOT,
+            'download-exercise-images.json')
+        self.verbose = int(options['verbosity']) > 1
 
-        headers = {'User-agent': default_user_agent('wger/{} + requests'.format(get_version()))}
+        # One session for all requests, so the connections are kept alive and
+        # reused. The pool is sized so that every thread can have its own.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=threads, pool_maxsize=threads)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-agent'] = default_user_agent(
+            'wger/{} + requests'.format(get_version()))
 
-        # Get all exercises
-        result = requests.get(exercise_api.format(remote_url), headers=headers).json()
-        for exercise_json in result['results']:
-            exercise_name = exercise_json['name'].encode('utf-8')
-            exercise_uuid = exercise_json['uuid']
-            exercise_id = exercise_json['id']
+        self.lock = threading.Lock()
+        self.stats = {'downloaded': 0, 'unchanged': 0, 'errors': 0, 'bytes': 0}
+        self.start = time.time()
 
-            self.stdout.write('')
-            self.stdout.write(u"*** Processing {0} (ID: {1}, UUID: {2})".format(exercise_name,
-                                                                                exercise_id,
-                                                                                exercise_uuid))
+        done = set() if options['restart'] else self.load_checkpoint()
+        if done:
+            self.stdout.write('Resuming previous run, {0} exercises already '
+                              'processed'.format(len(done)))
 
-            try:
-                exercise = Exercise.objects.get(uuid=exercise_uuid)
+        # Get all exercises and match them with the local ones
+        result = self.session.get(EXERCISE_API.format(self.remote_url)).json()
+        remote_exercises = [e for e in result['results'] if e['id'] not in done]
+        exercises = {str(e.uuid): e for e in Exercise.objects.filter(
+            uuid__in=[e['uuid'] for e in remote_exercises])}
 
-            except Exercise.DoesNotExist:
-                self.stdout.write('    Remote exercise not found in local DB, skipping...')
+        # Paths of the images already present locally, the threads only get
+        # these plain values and never touch the database.
+        self.local_images = {}
+        for image in ExerciseImage.objects.all():
+            self.local_images[image.pk] = image
+        local_paths = {pk: image.image.path for pk, image in self.local_images.items()
+                       if image.image}
 
+        jobs = []
+        for exercise_json in remote_exercises:
+            exercise = exercises.get(exercise_json['uuid'])
+            if exercise is None:
+                self.stdout.write(u'*** Remote exercise {0} (UUID: {1}) not found in local DB, '
+                                  u'skipping...'.format(exercise_json['id'],
+                                                        exercise_json['uuid']))
                 continue
+            jobs.append((exercise_json['id'], exercise, local_paths))
+
+        pool = ThreadPool(threads)
+        try:
+            for count, (exercise_id, exercise, results, error) in enumerate(
+                    pool.imap_unordered(self.fetch_exercise_images, jobs), 1):
+                if error:
+                    self.stats['errors'] += 1
+                    self.stderr.write(u'*** Error processing exercise {0}: {1}'.format(exercise_id,
+                                                                                       error))
+                else:
+                    for result in results:
+                        self.save_image(exercise, result)
+                    done.add(exercise_id)
+                    self.save_checkpoint(done)
+                self.report_progress(count, len(jobs))
+        finally:
+            pool.terminate()
+            pool.join()
+
+        # Everything went fine, the next run starts from scratch
+        if not self.stats['errors'] and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        elapsed = max(time.time() - self.start, 0.001)
+        self.stdout.write('Downloaded {0} images ({1:.1f} MB) in {2:.1f}s, {3:.2f} MB/s. '
+                          '{4} images unchanged, {5} errors'.format(
+                              self.stats['downloaded'],
+                              self.stats['bytes'] / 1024.0 / 1024.0,
+                              elapsed,
+                              self.stats['bytes'] / 1024.0 / 1024.0 / elapsed,
+                              self.stats['unchanged'],
+                              self.stats['errors']))
+
+    def load_checkpoint(self):
+        '''
+        Loads the IDs of the exercises processed by a previous run
+        '''
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (IOError, ValueError):
+            return set()
+
+        # Only resume runs against the same server
+        if checkpoint.get('remote_url') != self.remote_url:
+            return set()
+        return set(checkpoint.get('done', []))
+
+    def save_checkpoint(self, done):
+        '''
+        Saves the IDs of the processed exercises
+
+        The file is written to a temporary name and then renamed, so that it
+        is never left half written if the command is interrupted.
+        '''
+        tmp_path = '{0}.tmp'.format(self.checkpoint_path)
+        with open(tmp_path, 'w') as f:
+            json.dump({'remote_url': self.remote_url, 'done': sorted(done)}, f)
+        os.rename(tmp_path, self.checkpoint_path)
+
+    def fetch_exercise_images(self, job):
+        '''
+        Fetches the list of images of an exercise and downloads them
+
+        This runs in the worker threads, it must not access the database.
+
+        :param job: tuple with the remote exercise ID, the local exercise and
+                    a dictionary with the paths of the local images
+        :return: tuple with the remote exercise ID, the local exercise, a list
+                 with the results of download_image and an error or None
+        '''
+        exercise_id, exercise, local_paths = job
+        try:
+            url = IMAGE_API.format(self.remote_url, exercise_id)
+            images = self.session.get(url).json()
+            results = [self.download_image(image_json, local_paths)
+                       for image_json in images['results']]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            return exercise_id, exercise, [], e
+        return exercise_id, exercise, results, None
+
+    def download_image(self, image_json, local_paths):
+        '''
+        Downloads a single image, unless the local copy is unchanged
+
+        The file is streamed to a temporary file in chunks, it is never held
+        completely in memory. Files that already exist locally are first
+        compared by size (with a HEAD request) and, after downloading, by
+        their hash.
+
+        :return: a dictionary with the image's JSON, its file name and an open
+                 temporary file with the content, or None if unchanged
+        '''
+        image_id = image_json['id']
+        url = THUMBNAIL_API.format(self.remote_url, image_id)
+        original = self.session.get(url).json()['original']
+        result = {'json': image_json, 'name': os.path.basename(original), 'file': None}
+
+        local_path = local_paths.get(image_id)
+        if local_path and os.path.exists(local_path):
+            response = self.session.head(original, allow_redirects=True)
+            size = response.headers.get('Content-Length')
+            if response.ok and size is not None and int(size) == os.path.getsize(local_path):
+                return result
+        else:
+            local_path = None
+
+        response = self.session.get(original, stream=True)
+        response.raise_for_status()
+        sha1 = hashlib.sha1()
+        size = 0
+        img_temp = NamedTemporaryFile(delete=True)
+        for chunk in response.iter_content(CHUNK_SIZE):
+            img_temp.write(chunk)
+            sha1.update(chunk)
+            size += len(chunk)
+        img_temp.flush()
+
+        with self.lock:
+            self.stats['bytes'] += size
+
+        if local_path and sha1.hexdigest() == file_hash(local_path):
+            img_temp.close()
+            return result
+
+        result['file'] = img_temp
+        return result
+
+    def save_image(self, exercise, result):
+        '''
+        Saves a downloaded image to the database
+        '''
+        image_json = result['json']
+        image_id = image_json['id']
+
+        if result['file'] is None:
+            self.stats['unchanged'] += 1
+            if self.verbose:
+                self.stdout.write('    Image {0} - {1} unchanged, skipping...'.format(
+                    image_id, result['name']))
+            return
+
+        image = self.local_images.get(image_id)
+        if image is None:
+            if self.verbose:
+                self.stdout.write('    Image {0} - {1} not found in local DB, '
+                                  'creating now...'.format(image_id, result['name']))
+            image = ExerciseImage()
+            image.pk = image_id
+        elif self.verbose:
+            self.stdout.write('    Image {0} - {1} changed, updating...'.format(
+                image_id, result['name']))
+
+        image.exercise = exercise
+        image.is_main = image_json['is_main']
+        image.status = image_json['status']
+        with result['file'] as img_temp:
+            image.image.save(result['name'], File(img_temp), save=False)
+            image.save()
+        self.stats['downloaded'] += 1
 
-            # Get all images
-            images = requests.get(image_api.format(remote_url, exercise_id), headers=headers).json()
-
-            if images['count']:
-
-                for image_json in images['results']:
-                    image_id = image_json['id']
-                    result = requests.get(thumbnail_api.format(remote_url, image_id),
-                                          headers=headers).json()
-
-                    image_name = os.path.basename(result['original'])
-                    self.stdout.write('    Fetching image {0} - {1}'.format(image_id, image_name))
-
-                    try:
-                        image = ExerciseImage.objects.get(pk=image_id)
-                        self.stdout.write('    --> Image already present locally, skipping...')
-                        continue
-                    except ExerciseImage.DoesNotExist:
-                        self.stdout.write('    --> Image not found in local DB, creating now...')
-                        image = ExerciseImage()
-                        image.pk = image_id
-
-                    # Save the downloaded image, see link for details
-                    # http://stackoverflow.com/questions/1308386/programmatically-saving-image-to-
-                    retrieved_image = requests.get(result['original'], headers=headers)
-                    img_temp = NamedTemporaryFile(delete=True)
-                    img_temp.write(retrieved_image.content)
-                    img_temp.flush()
-
-                    image.exercise = exercise
-                    image.is_main = image_json['is_main']
-                    image.status = image_json['status']
-                    image.image.save(
-                        os.path.basename(image_name),
-                        File(img_temp),
-                    )
-                    image.save()
-
-            else:
-                self.stdout.write('    No images for this exercise, nothing to do')
+    def report_progress(self, count, total):
+        '''
+        Prints the progress and the current download throughput
+        '''
+        elapsed = max(time.time() - self.start, 0.001)
+        self.stdout.write('[{0}/{1}] {2} images downloaded, {3} unchanged, '
+                          '{4:.2f} MB/s'.format(count,
+                                                total,
+                                                self.stats['downloaded'],
+                                                self.stats['unchanged'],
+                                                self.stats['bytes'] / 1024.0 / 1024.0 / elapsed))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 *-*
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import multiprocessing
+
+# Third Party
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+# wger
+from wger.exercises.helpers import generate_exercise_image_thumbnails
+from wger.exercises.models import ExerciseImage
+
+
+class Command(BaseCommand):
+    '''
+    Generates the missing thumbnails for the exercise images
+    '''
+
+    help = 'Generates all missing thumbnails for the exercise images. The work is ' \
+           'distributed over several processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes',
+                            action='store',
+                            dest='processes',
+                            type=int,
+                            default=multiprocessing.cpu_count(),
+                            help='Number of processes to use (default: number of CPUs)')
+
+    def handle(self, **options):
+        '''
+        Process the options
+        '''
+        image_ids = list(ExerciseImage.objects.values_list('id', flat=True))
+
+        if options['processes'] > 1:
+            # The child processes can't share the database connections
+            connections.close_all()
+            pool = multiprocessing.Pool(options['processes'])
+            results = pool.imap_unordered(generate_exercise_image_thumbnails, image_ids)
+        else:
+            pool = None
+            results = (generate_exercise_image_thumbnails(i) for i in image_ids)
+
+        total = 0
+        errors = 0
+        for pk, count, error in results:
+            total += count
+            if error:
+                errors += 1
+                self.stdout.write('Could not process image {0}: {1}'.format(pk, error))
+            elif count and int(options['verbosity']) >= 2:
+                self.stdout.write('Generated {0} thumbnails for image {1}'.format(count, pk))
+
+        if pool:
+            pool.close()
+            pool.join()
+
+        self.stdout.write('Processed {0} images, generated {1} thumbnails, {2} errors'
+                          .format(len(image_ids), total, errors))
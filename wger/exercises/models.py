@@ -26,7 +26,6 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.sites.models import Site
 from django.core import mail
-from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.core.validators import MinLengthValidator
 from django.db import models
@@ -39,6 +38,7 @@ from django.utils.translation import ugettext_lazy as _
 # wger
 from wger.core.models import Language
 from wger.utils.cache import (
+    cache_delete,
     cache_mapper,
     delete_template_fragment_cache,
     reset_workout_canonical_form
@@ -237,7 +237,7 @@ class Exercise(AbstractSubmissionModel, AbstractLicenseModel, models.Model):
         super(Exercise, self).save(*args, **kwargs)
 
         # Cached objects
-        cache.delete(cache_mapper.get_exercise_muscle_bg_key(self))
+        cache_delete(cache_mapper.get_exercise_muscle_bits_key(self))
 
         # Cached template fragments
         for language in Language.objects.all():
@@ -256,7 +256,7 @@ class Exercise(AbstractSubmissionModel, AbstractLicenseModel, models.Model):
         '''
 
         # Cached objects
-        cache.delete(cache_mapper.get_exercise_muscle_bg_key(self))
+        cache_delete(cache_mapper.get_exercise_muscle_bits_key(self))
 
         # Cached template fragments
         for language in Language.objects.all():
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+'''
+Maps of the muscles worked by exercises and workouts
+
+The main and secondary muscles are kept as bitsets (the bit of a muscle is
+1 << muscle.pk), so the maps of several exercises can be combined with a
+bitwise OR. The bitsets of every exercise and the combined ones of every
+workout are cached, the latter with the workout's content version.
+
+The muscles are rendered as one composite SVG per side, only the silhouette
+of the human body is a separate (static) image.
+'''
+
+# Standard Library
+import io
+import re
+
+# Third Party
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.templatetags.staticfiles import static
+from django.core.urlresolvers import reverse
+
+# wger
+from wger.exercises.models import (
+    Exercise,
+    Muscle
+)
+from wger.utils.cache import (
+    cache_delete,
+    cache_get,
+    cache_mapper,
+    cache_set,
+    get_content_version,
+    reset_workout_canonical_form
+)
+
+
+MUSCLE_IMAGE_MAIN = 'images/muscles/main/muscle-{0}.svg'
+'''Static image of a main muscle'''
+
+MUSCLE_IMAGE_SECONDARY = 'images/muscles/secondary/muscle-{0}.svg'
+'''Static image of a secondary muscle'''
+
+MUSCLE_IMAGE_SILHOUETTE = {'front': 'images/muscles/muscular_system_front.svg',
+                           'back': 'images/muscles/muscular_system_back.svg'}
+'''Static images of the human body, rendered behind the muscles'''
+
+MUSCLE_MAP_SIDES = ('front', 'back')
+
+
+def get_muscle_sides():
+    '''
+    Returns a dictionary with the pk of every muscle and whether it is on
+    the front of the body
+    '''
+    key = cache_mapper.get_muscle_sides_key()
+    sides = cache_get(key)
+    if sides is None:
+        sides = dict(Muscle.objects.values_list('pk', 'is_front'))
+        cache_set(key, sides)
+    return sides
+
+
+def get_muscle_pks(bits):
+    '''
+    Returns the (sorted) muscle IDs of a bitset
+    '''
+    pks = []
+    pk = 0
+    while bits:
+        if bits & 1:
+            pks.append(pk)
+        bits >>= 1
+        pk += 1
+    return pks
+
+
+class MuscleMap(object):
+    '''
+    The main and secondary muscles worked by an exercise, day or workout
+    '''
+
+    def __init__(self, main=0, secondary=0):
+        self.main = main
+        self.secondary = secondary
+
+    def __or__(self, other):
+        return MuscleMap(self.main | other.main, self.secondary | other.secondary)
+
+    def __eq__(self, other):
+        return (self.main, self.secondary) == (other.main, other.secondary)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'MuscleMap({0:#x}, {1:#x})'.format(self.main, self.secondary)
+
+    def get_side(self, side):
+        '''
+        Returns the bitsets of the main and secondary muscles of one side
+
+        Muscles that are both main and secondary (e.g. in different exercises
+        of a workout) are only shown as main muscles.
+
+        :param side: 'front' or 'back'
+        '''
+        mask = 0
+        for pk, is_front in get_muscle_sides().items():
+            if is_front == (side == 'front'):
+                mask |= 1 << pk
+        return self.main & mask, self.secondary & ~self.main & mask
+
+    def get_backgrounds(self, side):
+        '''
+        Returns the URLs of the background images of one side, the muscles
+        first and the silhouette last, so it is rendered behind them
+        '''
+        main, secondary = self.get_side(side)
+        return [reverse('exercise:muscle:map', kwargs={'side': side,
+                                                       'main': '{0:x}'.format(main),
+                                                       'secondary': '{0:x}'.format(secondary)}),
+                static(MUSCLE_IMAGE_SILHOUETTE[side])]
+
+
+def get_exercise_maps(exercise_pks):
+    '''
+    Returns the muscle maps of several exercises
+
+    The bitsets of the exercises not in the cache are loaded with one query
+    per relationship.
+
+    :return: a dictionary with the exercise pk as key and the MuscleMap
+    '''
+    maps = {}
+    missing = {}
+    for pk in set(exercise_pks):
+        bits = cache_get(cache_mapper.get_exercise_muscle_bits_key(pk))
+        if bits is None:
+            missing[pk] = [0, 0]
+        else:
+            maps[pk] = MuscleMap(*bits)
+
+    if missing:
+        for exercise_pk, muscle_pk in Exercise.muscles.through.objects\
+                .filter(exercise_id__in=missing.keys())\
+                .values_list('exercise_id', 'muscle_id'):
+            missing[exercise_pk][0] |= 1 << muscle_pk
+        for exercise_pk, muscle_pk in Exercise.muscles_secondary.through.objects\
+                .filter(exercise_id__in=missing.keys())\
+                .values_list('exercise_id', 'muscle_id'):
+            missing[exercise_pk][1] |= 1 << muscle_pk
+
+        for pk, bits in missing.items():
+            cache_set(cache_mapper.get_exercise_muscle_bits_key(pk), tuple(bits))
+            maps[pk] = MuscleMap(*bits)
+    return maps
+
+
+def get_exercise_map(exercise):
+    '''
+    Returns the muscle map of an exercise
+    '''
+    pk = cache_mapper.get_pk(exercise)
+    return get_exercise_maps([pk])[pk]
+
+
+def get_workout_map(workout):
+    '''
+    Returns the muscle map of a workout, combined from all its exercises
+
+    The result is cached until the workout (or one of its exercises) changes.
+    '''
+    pk = cache_mapper.get_pk(workout)
+    key = cache_mapper.get_workout_muscle_map_key(pk, get_content_version('workout', pk))
+    bits = cache_get(key)
+    if bits is None:
+        # Importing at the top would be circular, the manager app depends
+        # on the exercises
+        from wger.manager.models import Set
+
+        exercise_pks = Set.exercises.through.objects\
+            .filter(set__exerciseday__training_id=pk)\
+            .values_list('exercise_id', flat=True)
+        workout_map = MuscleMap()
+        for exercise_map in get_exercise_maps(exercise_pks).values():
+            workout_map |= exercise_map
+
+        bits = (workout_map.main, workout_map.secondary)
+        cache_set(key, bits)
+
+    return MuscleMap(*bits)
+
+
+def reset_exercise_maps(exercise_pks):
+    '''
+    Resets the cached muscle maps of exercises and of the workouts using them
+    '''
+    from wger.manager.models import Set
+
+    for pk in exercise_pks:
+        cache_delete(cache_mapper.get_exercise_muscle_bits_key(pk))
+
+    workout_pks = Set.exercises.through.objects\
+        .filter(exercise_id__in=exercise_pks)\
+        .values_list('set__exerciseday__training_id', flat=True)\
+        .distinct()
+    for pk in workout_pks:
+        reset_workout_canonical_form(pk)
+
+
+def render_muscle_map(side, main, secondary):
+    '''
+    Returns an SVG image with the muscles of one side, without the silhouette
+
+    The images of the single muscles are inlined, so the browser only needs
+    to load one file. The result is cached.
+
+    :param side: 'front' or 'back'
+    :param main: bitset of the main muscles
+    :param secondary: bitset of the secondary muscles
+    '''
+    main, secondary = MuscleMap(main, secondary).get_side(side)
+    key = cache_mapper.get_muscle_map_svg_key(side, main, secondary)
+    svg = cache_get(key)
+    if svg is None:
+        # The muscles are drawn in order, the main ones last so they are on top
+        layers = [MUSCLE_IMAGE_SECONDARY.format(pk) for pk in get_muscle_pks(secondary)]
+        layers += [MUSCLE_IMAGE_MAIN.format(pk) for pk in get_muscle_pks(main)]
+
+        width = 200
+        height = 0
+        content = []
+        for layer in layers:
+            path = finders.find(layer)
+            if not path:
+                continue
+            with io.open(path, encoding='utf-8') as image:
+                data = image.read()
+
+            # Nest the image's root element, without the XML declaration
+            root = re.search(r'<svg\b[^>]*>', data)
+            data = data[root.start():]
+            size = dict(re.findall(r'\s(width|height)="([0-9.]+)"', root.group(0)))
+            width = max(width, float(size.get('width', 0)))
+            height = max(height, float(size.get('height', 0)))
+            content.append(data)
+
+        svg = u'<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n' \
+              u'<svg xmlns="http://www.w3.org/2000/svg" width="{0:g}" height="{1:g}">\n' \
+              u'{2}\n</svg>\n'.format(width, height, u'\n'.join(content))
+        cache_set(key, svg)
+    return svg
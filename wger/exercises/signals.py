@@ -17,16 +17,27 @@
 
 # Third Party
 from django.db.models.signals import (
+    m2m_changed,
     post_delete,
+    post_save,
     pre_save
 )
 from django.dispatch import receiver
 from easy_thumbnails.files import get_thumbnailer
-from easy_thumbnails.signal_handlers import generate_aliases
 from easy_thumbnails.signals import saved_file
 
 # wger
-from wger.exercises.models import ExerciseImage
+from wger.exercises.helpers import schedule_thumbnails
+from wger.exercises.models import (
+    Exercise,
+    ExerciseImage,
+    Muscle
+)
+from wger.exercises.muscle_map import reset_exercise_maps
+from wger.utils.cache import (
+    cache_delete,
+    cache_mapper
+)
 
 
 @receiver(post_delete, sender=ExerciseImage)
@@ -56,10 +67,41 @@ def delete_exercise_image_on_update(sender, instance, **kwargs):
 
     new_file = instance.image
     if not old_file == new_file:
-        thumbnailer = get_thumbnailer(instance.image)
+        thumbnailer = get_thumbnailer(old_file)
         thumbnailer.delete_thumbnails()
-        instance.image.delete(save=False)
+        old_file.delete(save=False)
+
+
+@receiver(saved_file, sender=ExerciseImage)
+def generate_exercise_image_thumbnails(sender, fieldfile, **kwargs):
+    '''
+    Generate the thumbnails in the background when uploading a new image
+    '''
+    schedule_thumbnails(fieldfile)
+
 
+@receiver(post_save, sender=Muscle)
+@receiver(post_delete, sender=Muscle)
+def reset_muscle_sides(sender, instance, **kwargs):
+    '''
+    Reset the cached sides of the muscles used by the muscle maps
+    '''
+    cache_delete(cache_mapper.get_muscle_sides_key())
+
+
+@receiver(m2m_changed, sender=Exercise.muscles.through)
+@receiver(m2m_changed, sender=Exercise.muscles_secondary.through)
+def reset_exercise_muscle_maps(sender, instance, action, reverse, pk_set, **kwargs):
+    '''
+    Reset the muscle maps when the muscles of an exercise change
+    '''
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
 
-# Generate thumbnails when uploading a new image
-saved_file.connect(generate_aliases)
+    if not reverse:
+        reset_exercise_maps([instance.pk])
+    elif action == 'pre_clear':
+        reset_exercise_maps(list(sender.objects.filter(muscle=instance)
+                                               .values_list('exercise_id', flat=True)))
+    else:
+        reset_exercise_maps(pk_set)
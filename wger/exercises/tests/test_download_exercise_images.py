@@ -0,0 +1,146 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import json
+import os
+import threading
+
+# Third Party
+from django.conf import settings
+from django.core.management import call_command
+from six import StringIO
+from six.moves import BaseHTTPServer
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.exercises.models import (
+    Exercise,
+    ExerciseImage
+)
+
+
+class RemoteHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''
+    Stand-in for the API of the remote wger server
+    '''
+
+    def get_content(self):
+        server = self.server
+        if self.path.startswith('/api/v2/exercise/'):
+            return 'application/json', json.dumps(
+                {'results': [{'id': 1, 'uuid': server.exercise_uuid, 'name': 'Test'}]}).encode()
+        elif self.path.startswith('/api/v2/exerciseimage/?exercise=1'):
+            return 'application/json', json.dumps(
+                {'count': 1, 'results': [{'id': 10, 'is_main': True, 'status': '2'}]}).encode()
+        elif self.path.startswith('/api/v2/exerciseimage/10/thumbnails/'):
+            url = 'http://127.0.0.1:{0}/media/wildschwein.jpg'.format(server.server_port)
+            return 'application/json', json.dumps({'original': url}).encode()
+        elif self.path == '/media/wildschwein.jpg':
+            with open('wger/exercises/tests/wildschwein.jpg', 'rb') as f:
+                return 'image/jpeg', f.read()
+        return None, None
+
+    def send_content(self, body=True):
+        content_type, content = self.get_content()
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if body:
+            self.wfile.write(content)
+
+    def do_GET(self):
+        # The size checks use HEAD, only count the actual downloads
+        if self.path == '/media/wildschwein.jpg':
+            self.server.downloads += 1
+        self.send_content()
+
+    def do_HEAD(self):
+        self.send_content(body=False)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadExerciseImagesTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the download-exercise-images command against a local server
+    '''
+
+    def setUp(self):
+        super(DownloadExerciseImagesTestCase, self).setUp()
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), RemoteHandler)
+        self.server.exercise_uuid = str(Exercise.objects.get(pk=1).uuid)
+        self.server.downloads = 0
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.remote_url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+        self.checkpoint = os.path.join(settings.MEDIA_ROOT, 'download-exercise-images.json')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super(DownloadExerciseImagesTestCase, self).tearDown()
+
+    def download(self, **kwargs):
+        out = StringIO()
+        call_command('download-exercise-images',
+                     remote_url=self.remote_url,
+                     threads=2,
+                     stdout=out,
+                     **kwargs)
+        return out.getvalue()
+
+    def test_download(self):
+        '''
+        Test downloading a new image and skipping it the second time
+        '''
+        self.assertFalse(ExerciseImage.objects.filter(pk=10).exists())
+        out = self.download()
+        image = ExerciseImage.objects.get(pk=10)
+        self.assertEqual(image.exercise_id, 1)
+        self.assertTrue(image.is_main)
+        self.assertEqual(os.path.getsize(image.image.path),
+                         os.path.getsize('wger/exercises/tests/wildschwein.jpg'))
+        self.assertIn('Downloaded 1 images', out)
+        self.assertEqual(self.server.downloads, 1)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+        # The local file is unchanged, it is not downloaded again
+        out = self.download()
+        self.assertIn('Downloaded 0 images', out)
+        self.assertIn('1 images unchanged', out)
+        self.assertEqual(self.server.downloads, 1)
+
+    def test_resume(self):
+        '''
+        Test that exercises processed by an interrupted run are skipped
+        '''
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'remote_url': self.remote_url, 'done': [1]}, f)
+
+        out = self.download()
+        self.assertIn('Resuming previous run', out)
+        self.assertFalse(ExerciseImage.objects.filter(pk=10).exists())
+        self.assertEqual(self.server.downloads, 0)
+
+        # Starting from scratch ignores the checkpoint
+        self.download(restart=True)
+        self.assertTrue(ExerciseImage.objects.filter(pk=10).exists())
@@ -438,7 +438,7 @@ class ExercisesCacheTestCase(WorkoutManagerTestCase):
         Test that the template cache for the overview is correctly reseted when
         performing certain operations
         '''
-        self.assertFalse(cache.get(cache_mapper.get_exercise_muscle_bg_key(2)))
+        self.assertFalse(cache.get(cache_mapper.get_exercise_muscle_bits_key(2)))
         self.assertFalse(cache.get(get_template_cache_name('muscle-overview', 2)))
         self.assertFalse(cache.get(get_template_cache_name('muscle-overview-mobile', 2)))
         self.assertFalse(cache.get(get_template_cache_name('muscle-overview-search', 2)))
@@ -447,7 +447,7 @@ class ExercisesCacheTestCase(WorkoutManagerTestCase):
         self.client.get(reverse('exercise:exercise:overview'))
         self.client.get(reverse('exercise:exercise:view', kwargs={'id': 2}))
 
-        old_exercise_bg = cache.get(cache_mapper.get_exercise_muscle_bg_key(2))
+        old_exercise_bg = cache.get(cache_mapper.get_exercise_muscle_bits_key(2))
         old_muscle_overview = cache.get(get_template_cache_name('muscle-overview', 2))
         old_exercise_overview = cache.get(get_template_cache_name('exercise-overview', 2))
         old_exercise_overview_mobile = cache.get(get_template_cache_name('exercise-overview-mobile',
@@ -459,7 +459,7 @@ class ExercisesCacheTestCase(WorkoutManagerTestCase):
         exercise.muscles_secondary.add(Muscle.objects.get(pk=2))
         exercise.save()
 
-        self.assertFalse(cache.get(cache_mapper.get_exercise_muscle_bg_key(2)))
+        self.assertFalse(cache.get(cache_mapper.get_exercise_muscle_bits_key(2)))
         self.assertFalse(cache.get(get_template_cache_name('muscle-overview', 2)))
         self.assertFalse(cache.get(get_template_cache_name('exercise-overview', 2)))
         self.assertFalse(cache.get(get_template_cache_name('exercise-overview-mobile', 2)))
@@ -468,7 +468,7 @@ class ExercisesCacheTestCase(WorkoutManagerTestCase):
         self.client.get(reverse('exercise:muscle:overview'))
         self.client.get(reverse('exercise:exercise:view', kwargs={'id': 2}))
 
-        new_exercise_bg = cache.get(cache_mapper.get_exercise_muscle_bg_key(2))
+        new_exercise_bg = cache.get(cache_mapper.get_exercise_muscle_bits_key(2))
         new_muscle_overview = cache.get(get_template_cache_name('muscle-overview', 2))
         new_exercise_overview = cache.get(get_template_cache_name('exercise-overview', 2))
         new_exercise_overview_mobile = cache.get(get_template_cache_name('exercise-overview-mobile',
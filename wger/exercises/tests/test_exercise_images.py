@@ -14,7 +14,9 @@
 
 # Third Party
 from django.core.files import File
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from six import StringIO
 
 # wger
 from wger.core.tests.base_testcase import (
@@ -23,6 +25,12 @@ from wger.core.tests.base_testcase import (
     WorkoutManagerEditTestCase,
     WorkoutManagerTestCase
 )
+from wger.exercises.helpers import (
+    THUMBNAIL_PLACEHOLDER,
+    generate_exercise_image_thumbnails,
+    generate_thumbnails,
+    get_thumbnail_url
+)
 from wger.exercises.models import (
     Exercise,
     ExerciseImage
@@ -153,3 +161,41 @@ class DeleteExerciseImageTestCase(WorkoutManagerDeleteTestCase):
 #     data = {'is_main': 'true',
 #             'exercise': '1',
 #             'id': 1}
+
+
+class ThumbnailsTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the thumbnail generation helpers and command
+    '''
+
+    def setUp(self):
+        super(ThumbnailsTestCase, self).setUp()
+        self.image = ExerciseImage()
+        self.image.exercise = Exercise.objects.get(pk=2)
+        self.image.status = ExerciseImage.STATUS_ACCEPTED
+        self.image.image.save('protestschwein.jpg',
+                              File(open('wger/exercises/tests/protestschwein.jpg', 'rb')))
+        self.image.save()
+
+    def test_placeholder(self):
+        '''
+        Test that a placeholder is returned for missing thumbnails
+        '''
+        url = get_thumbnail_url(self.image.image, 'small')
+        self.assertTrue(url.endswith(THUMBNAIL_PLACEHOLDER))
+
+        generate_thumbnails(self.image.image)
+        url = get_thumbnail_url(self.image.image, 'small')
+        self.assertFalse(url.endswith(THUMBNAIL_PLACEHOLDER))
+
+    def test_command(self):
+        '''
+        Test the generate-thumbnails command
+        '''
+        out = StringIO()
+        call_command('generate-thumbnails', processes=1, stdout=out)
+        self.assertIn('Processed 4 images', out.getvalue())
+
+        # The thumbnails of the image saved above were generated by the command
+        self.assertEqual(generate_exercise_image_thumbnails(self.image.pk),
+                         (self.image.pk, 0, None))
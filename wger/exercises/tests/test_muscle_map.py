@@ -0,0 +1,136 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Third Party
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.exercises.models import (
+    Exercise,
+    Muscle
+)
+from wger.exercises.muscle_map import (
+    MuscleMap,
+    get_exercise_map,
+    get_muscle_pks,
+    get_workout_map
+)
+from wger.manager.models import (
+    Set,
+    Workout
+)
+
+
+class MuscleMapTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the muscle maps of exercises and workouts
+    '''
+
+    def test_exercise_map(self):
+        '''
+        Test that the bitsets contain the muscles of the exercise
+        '''
+        exercise = Exercise.objects.get(pk=2)
+        muscle_map = get_exercise_map(exercise)
+        self.assertEqual(get_muscle_pks(muscle_map.main),
+                         sorted(exercise.muscles.values_list('pk', flat=True)))
+        self.assertEqual(get_muscle_pks(muscle_map.secondary),
+                         sorted(exercise.muscles_secondary.values_list('pk', flat=True)))
+
+        # Cached result
+        with self.assertNumQueries(0):
+            self.assertEqual(get_exercise_map(exercise), muscle_map)
+
+    def test_old_cache_format(self):
+        '''
+        Test that the backgrounds cached by previous versions are not used
+        '''
+        cache.set('exercise-muscle-bg-2', (['images/muscles/main/muscle-1.svg'],
+                                           ['images/muscles/secondary/muscle-2.svg']))
+        muscle_map = get_exercise_map(Exercise.objects.get(pk=2))
+        self.assertIsInstance(muscle_map.main, int)
+        muscle_map.get_backgrounds('front')
+
+    def test_sides(self):
+        '''
+        Test splitting the maps in front and back muscles
+        '''
+        muscle_map = MuscleMap(main=(1 << 1) | (1 << 2), secondary=(1 << 2) | (1 << 3))
+        front = set(Muscle.objects.filter(is_front=True).values_list('pk', flat=True))
+
+        main, secondary = muscle_map.get_side('front')
+        self.assertEqual(get_muscle_pks(main), [i for i in (1, 2) if i in front])
+        self.assertEqual(get_muscle_pks(secondary), [i for i in (3, ) if i in front])
+
+        main, secondary = muscle_map.get_side('back')
+        self.assertEqual(get_muscle_pks(main), [i for i in (1, 2) if i not in front])
+        self.assertEqual(get_muscle_pks(secondary), [i for i in (3, ) if i not in front])
+
+    def test_workout_map(self):
+        '''
+        Test that the workout's map combines the ones of its exercises
+        '''
+        workout = Workout.objects.get(pk=1)
+        workout_map = get_workout_map(workout)
+
+        expected = MuscleMap()
+        for exercise in Exercise.objects.filter(set__exerciseday__training=workout):
+            expected |= get_exercise_map(exercise)
+        self.assertEqual(workout_map, expected)
+
+        with self.assertNumQueries(0):
+            get_workout_map(workout)
+
+    def test_workout_map_cache(self):
+        '''
+        Test that the workout's map is updated when an exercise changes
+        '''
+        workout = Workout.objects.get(pk=1)
+        workout_map = get_workout_map(workout)
+
+        exercise = Set.objects.filter(exerciseday__training=workout)[0].exercises.all()[0]
+        exercise.muscles.clear()
+        exercise.muscles_secondary.clear()
+        muscle = Muscle.objects.create(name='Musculus testus', is_front=True)
+        exercise.muscles.add(muscle)
+        self.assertNotEqual(get_workout_map(workout), workout_map)
+        self.assertTrue(get_workout_map(workout).main & (1 << muscle.pk))
+
+    def test_render(self):
+        '''
+        Test the composite image with all muscles of a side
+        '''
+        muscle = Muscle.objects.filter(is_front=True)[0]
+        bits = '{0:x}'.format(1 << muscle.pk)
+        url = MuscleMap(main=1 << muscle.pk).get_backgrounds('front')[0]
+        self.assertEqual(url, reverse('exercise:muscle:map', kwargs={'side': 'front',
+                                                                     'main': bits,
+                                                                     'secondary': '0'}))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        content = response.content.decode('utf8')
+
+        # The outer image and the muscle
+        self.assertEqual(content.count('<svg'), 2)
+
+        # Back muscles are not rendered on the front
+        response = self.client.get(reverse('exercise:muscle:map',
+                                           kwargs={'side': 'back',
+                                                   'main': bits,
+                                                   'secondary': '0'}))
+        self.assertEqual(response.content.decode('utf8').count('<svg'), 1)
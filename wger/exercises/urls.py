@@ -50,6 +50,9 @@ patterns_muscle = [
     url(r'^(?P<pk>\d+)/delete/$',
         muscles.MuscleDeleteView.as_view(),
         name='delete'),
+    url(r'^map/(?P<side>front|back)/(?P<main>[0-9a-f]{1,32})-(?P<secondary>[0-9a-f]{1,32})\.svg$',
+        muscles.muscle_map,
+        name='map'),
 ]
 
 # sub patterns for exercise images
@@ -28,7 +28,6 @@ from django.contrib.auth.mixins import (
     PermissionRequiredMixin
 )
 from django.core import mail
-from django.core.cache import cache
 from django.core.urlresolvers import (
     reverse,
     reverse_lazy
@@ -65,8 +64,12 @@ from wger.exercises.models import (
     ExerciseCategory,
     Muscle
 )
-from wger.manager.models import WorkoutLog
-from wger.utils.cache import cache_mapper
+from wger.exercises.muscle_map import get_exercise_map
+from wger.manager.models import (
+    ExerciseWeekStats,
+    PersonalRecord,
+    WorkoutLog
+)
 from wger.utils.generic_views import (
     WgerDeleteMixin,
     WgerFormMixin
@@ -85,6 +88,11 @@ from wger.weight.helpers import process_log_entries
 
 logger = logging.getLogger(__name__)
 
+EXERCISE_STATS_WEEKS = 8
+'''
+Number of weeks whose statistics are shown on the exercise detail page
+'''
+
 
 class ExerciseListView(ListView):
     '''
@@ -127,46 +135,30 @@ def view(request, id, slug=None):
 
     template_data['exercise'] = exercise
 
-    # Create the backgrounds that show what muscles the exercise works on
-    backgrounds = cache.get(cache_mapper.get_exercise_muscle_bg_key(int(id)))
-    if not backgrounds:
-        backgrounds_back = []
-        backgrounds_front = []
-
-        for muscle in exercise.muscles.all():
-            if muscle.is_front:
-                backgrounds_front.append('images/muscles/main/muscle-%s.svg' % muscle.id)
-            else:
-                backgrounds_back.append('images/muscles/main/muscle-%s.svg' % muscle.id)
-
-        for muscle in exercise.muscles_secondary.all():
-            if muscle.is_front:
-                backgrounds_front.append('images/muscles/secondary/muscle-%s.svg' % muscle.id)
-            else:
-                backgrounds_back.append('images/muscles/secondary/muscle-%s.svg' % muscle.id)
-
-        # Append the "main" background, with the silhouette of the human body
-        # This has to happen as the last step, so it is rendered behind the muscles.
-        backgrounds_front.append('images/muscles/muscular_system_front.svg')
-        backgrounds_back.append('images/muscles/muscular_system_back.svg')
-        backgrounds = (backgrounds_front, backgrounds_back)
-
-        cache.set(cache_mapper.get_exercise_muscle_bg_key(int(id)),
-                  (backgrounds_front, backgrounds_back))
-
-    template_data['muscle_backgrounds_front'] = backgrounds[0]
-    template_data['muscle_backgrounds_back'] = backgrounds[1]
+    # The backgrounds that show what muscles the exercise works on
+    muscle_map = get_exercise_map(exercise)
+    template_data['muscle_backgrounds_front'] = muscle_map.get_backgrounds('front')
+    template_data['muscle_backgrounds_back'] = muscle_map.get_backgrounds('back')
 
     # If the user is logged in, load the log and prepare the entries for
     # rendering in the D3 chart
     entry_log = []
     chart_data = []
+    week_stats = []
+    personal_records = []
     if request.user.is_authenticated():
         logs = WorkoutLog.objects.filter(user=request.user, exercise=exercise)
         entry_log, chart_data = process_log_entries(logs)
 
+        # The statistics of the last weeks (newest first) and the records
+        week_stats = ExerciseWeekStats.objects.filter(user=request.user, exercise=exercise)\
+            .order_by('-week')[:EXERCISE_STATS_WEEKS]
+        personal_records = PersonalRecord.objects.filter(user=request.user, exercise=exercise)
+
     template_data['logs'] = entry_log
     template_data['json'] = chart_data
+    template_data['week_stats'] = week_stats
+    template_data['personal_records'] = personal_records
     template_data['svg_uuid'] = str(uuid.uuid4())
 
     return render(request, 'exercise/view.html', template_data)
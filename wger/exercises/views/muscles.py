@@ -26,6 +26,8 @@ from django.core.urlresolvers import (
     reverse,
     reverse_lazy
 )
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
 from django.utils.translation import (
     ugettext as _,
     ugettext_lazy
@@ -40,6 +42,7 @@ from django.views.generic import (
 # wger
 from wger.config.models import LanguageConfig
 from wger.exercises.models import Muscle
+from wger.exercises.muscle_map import render_muscle_map
 from wger.utils.generic_views import (
     WgerDeleteMixin,
     WgerFormMixin
@@ -49,6 +52,9 @@ from wger.utils.language import load_item_languages
 
 logger = logging.getLogger(__name__)
 
+MUSCLE_MAP_MAX_AGE = 7 * 24 * 60 * 60
+'''Seconds the browsers can cache the rendered muscle maps'''
+
 
 class MuscleListView(ListView):
     '''
@@ -130,3 +136,15 @@ class MuscleDeleteView(WgerDeleteMixin, LoginRequiredMixin, PermissionRequiredMi
         context['title'] = _(u'Delete {0}?').format(self.object.name)
         context['form_action'] = reverse('exercise:muscle:delete', kwargs={'pk': self.kwargs['pk']})
         return context
+
+
+def muscle_map(request, side, main, secondary):
+    '''
+    Renders the main and secondary muscles of one side as one SVG image
+
+    The muscles are passed as hexadecimal bitsets, see wger.exercises.muscle_map
+    '''
+    svg = render_muscle_map(side, int(main, 16), int(secondary, 16))
+    response = HttpResponse(svg, content_type='image/svg+xml')
+    patch_cache_control(response, public=True, max_age=MUSCLE_MAP_MAX_AGE)
+    return response
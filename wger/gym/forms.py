@@ -21,6 +21,9 @@ from django.utils.translation import ugettext as _
 
 # wger
 from wger.core.forms import UserPersonalInformationForm
+from wger.gym.models import Gym
+from wger.manager.models import Workout
+from wger.nutrition.models import NutritionPlan
 from wger.utils.widgets import BootstrapSelectMultiple
 
 
@@ -94,3 +97,44 @@ class GymUserAddForm(GymUserPermisssionForm, UserPersonalInformationForm):
         except User.DoesNotExist:
             return username
         raise forms.ValidationError(_("A user with that username already exists."))
+
+
+class GymCopyToMembersForm(forms.Form):
+    '''
+    Form used by trainers to copy one of their workouts and/or nutrition plans
+    to several members of the gym
+    '''
+
+    workout = forms.ModelChoiceField(queryset=Workout.objects.none(),
+                                     required=False,
+                                     label=_('Workout'))
+    comment = forms.CharField(max_length=100,
+                              required=False,
+                              label=_('Description'),
+                              help_text=_('Description of the copied workouts, if empty the '
+                                          'one of the workout is used.'))
+    plan = forms.ModelChoiceField(queryset=NutritionPlan.objects.none(),
+                                  required=False,
+                                  label=_('Nutrition plan'))
+    members = forms.ModelMultipleChoiceField(queryset=User.objects.none(),
+                                             label=_('Members'),
+                                             widget=BootstrapSelectMultiple())
+
+    def __init__(self, trainer, gym_pk, *args, **kwargs):
+        '''
+        Only the trainer's own workouts and plans can be copied, and only to
+        members of the gym
+        '''
+        super(GymCopyToMembersForm, self).__init__(*args, **kwargs)
+        self.fields['workout'].queryset = Workout.objects.filter(user=trainer)
+        self.fields['plan'].queryset = NutritionPlan.objects.filter(user=trainer)
+        self.fields['members'].queryset = Gym.objects.get_members(gym_pk).order_by('username')
+
+    def clean(self):
+        '''
+        At least a workout or a nutrition plan has to be selected
+        '''
+        cleaned_data = super(GymCopyToMembersForm, self).clean()
+        if not cleaned_data.get('workout') and not cleaned_data.get('plan'):
+            raise forms.ValidationError(_('Select a workout or a nutrition plan.'))
+        return cleaned_data
@@ -14,13 +14,32 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 
+# Standard Library
+import logging
+
+# Third Party
+from django.contrib.auth.models import User
+from django.db import transaction
+
 # wger
+from wger.core.models import UserProfile
+from wger.gym.managers import get_role_permission_ids
+from wger.gym.models import GymUserConfig
 from wger.manager.models import (
     WorkoutLog,
     WorkoutSession
 )
 
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_GYM_BACKGROUND_THRESHOLD = 5000
+'''
+Number of affected profiles from which the default gym is assigned in the
+background (if background jobs are enabled)
+'''
+
+
 def get_user_last_activity(user):
     '''
     Find out when the user was last active. "Active" means in this context logging
@@ -84,3 +103,45 @@ def get_permission_list(user):
         form_group_permission.append('manager')
 
     return form_group_permission
+
+
+def create_missing_user_configs(gym_pk):
+    '''
+    Creates the member configuration for all users of a gym that don't have one
+
+    Administrators (trainers, managers, etc.) don't get a member configuration.
+    The users are found with one query and the configurations are inserted in
+    bulk.
+
+    :param gym_pk: the ID of the gym
+    :return: the number of created configurations
+    '''
+    permission_ids = list(get_role_permission_ids().values())
+    users = User.objects.filter(userprofile__gym_id=gym_pk, gymuserconfig__isnull=True)\
+        .exclude(is_superuser=True)\
+        .exclude(groups__permissions__in=permission_ids)\
+        .exclude(user_permissions__in=permission_ids)\
+        .distinct()
+
+    configs = [GymUserConfig(gym_id=gym_pk, user_id=pk)
+               for pk in users.values_list('pk', flat=True).iterator()]
+    GymUserConfig.objects.bulk_create(configs, batch_size=1000)
+    logger.debug('Created {0} GymUserConfigs for gym {1}'.format(len(configs), gym_pk))
+    return len(configs)
+
+
+def assign_default_gym(gym_pk):
+    '''
+    Moves all users without a gym to the default gym
+
+    The profiles are updated with one query and the missing member
+    configurations are created in bulk, see create_missing_user_configs.
+
+    :param gym_pk: the ID of the default gym
+    :return: a tuple with the number of updated profiles and created
+             configurations
+    '''
+    with transaction.atomic():
+        updated = UserProfile.objects.filter(gym=None).update(gym=gym_pk)
+        created = create_missing_user_configs(gym_pk)
+    return updated, created
@@ -26,7 +26,7 @@ from django.utils import translation
 from django.utils.translation import ugettext as _
 
 # wger
-from wger.gym.helpers import is_any_gym_admin
+from wger.gym.managers import get_user_roles
 from wger.gym.models import Gym
 
 
@@ -57,19 +57,21 @@ class Command(BaseCommand):
                     self.stdout.write("  Reminders deactivatd, skipping")
                 continue
 
-            for profile in gym.userprofile_set.all():
-                user = profile.user
+            users = [profile.user for profile in
+                     gym.userprofile_set.select_related('user__usercache')]
+            roles = get_user_roles(users)
+            for user in users:
 
                 # check if the account was deactivated (user can't login)
                 if not user.is_active:
                     continue
 
                 # add to trainer list that will be notified
-                if user.has_perm('gym.gym_trainer'):
+                if roles[user.pk]['gym_trainer']:
                     trainer_list.append(user)
 
                 # Check appropriate permissions
-                if is_any_gym_admin(user):
+                if roles[user.pk]['any_admin']:
                     continue
 
                 # Check user preferences
@@ -14,13 +14,87 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 
+# Standard Library
+import threading
+
 # Third Party
 from django.contrib.auth.models import (
     Permission,
     User
 )
 from django.db import models
-from django.db.models import Q
+
+
+GYM_ROLES = ('manage_gym', 'manage_gyms', 'gym_trainer')
+'''Codenames of the permissions that make a user a gym administrator'''
+
+_role_permission_ids = {}
+_role_permission_lock = threading.Lock()
+
+
+def get_role_permission_ids():
+    '''
+    Returns the IDs of the gym role permissions, as a codename -> ID dictionary
+
+    The permissions don't change while the application is running, so they
+    are only loaded once per process.
+    '''
+    if not _role_permission_ids:
+        permissions = Permission.objects.filter(content_type__app_label='gym',
+                                                codename__in=GYM_ROLES)
+        with _role_permission_lock:
+            _role_permission_ids.update(permissions.values_list('codename', 'pk'))
+    return _role_permission_ids
+
+
+def reset_role_permission_ids():
+    '''
+    Forgets the loaded permission IDs, e.g. after the database was recreated
+    '''
+    with _role_permission_lock:
+        _role_permission_ids.clear()
+
+
+def get_user_roles(users):
+    '''
+    Returns the gym roles of several users at once
+
+    The result is the same as calling user.has_perm('gym.<role>') for every
+    user and role, but the group and user permissions of all the users are
+    loaded with one query each.
+
+    :param users: a list of users
+    :return: a dictionary user ID -> {'manage_gym': bool, 'manage_gyms': bool,
+             'gym_trainer': bool, 'any_admin': bool}
+    '''
+    permission_ids = get_role_permission_ids()
+    codenames = {pk: codename for codename, pk in permission_ids.items()}
+    user_pks = [user.pk for user in users if user.is_active and not user.is_superuser]
+
+    granted = set()
+    if user_pks:
+        group_permissions = User.groups.through.objects\
+            .filter(user_id__in=user_pks, group__permissions__in=list(codenames))\
+            .values_list('user_id', 'group__permissions')
+        user_permissions = User.user_permissions.through.objects\
+            .filter(user_id__in=user_pks, permission_id__in=list(codenames))\
+            .values_list('user_id', 'permission_id')
+        granted.update(group_permissions)
+        granted.update(user_permissions)
+
+    out = {}
+    for user in users:
+        roles = {}
+        for codename in GYM_ROLES:
+            if not user.is_active:
+                roles[codename] = False
+            elif user.is_superuser:
+                roles[codename] = True
+            else:
+                roles[codename] = (user.pk, permission_ids.get(codename)) in granted
+        roles['any_admin'] = any(roles.values())
+        out[user.pk] = roles
+    return out
 
 
 class GymManager(models.Manager):
@@ -31,24 +105,14 @@ class GymManager(models.Manager):
         '''
         Returns all members for this gym (i.e non-admin ones)
         '''
-        perm_gym = Permission.objects.get(codename='manage_gym')
-        perm_gyms = Permission.objects.get(codename='manage_gyms')
-        perm_trainer = Permission.objects.get(codename='gym_trainer')
-
         users = User.objects.filter(userprofile__gym_id=gym_pk)
-        return users.exclude(Q(groups__permissions=perm_gym) |
-                             Q(groups__permissions=perm_gyms) |
-                             Q(groups__permissions=perm_trainer)).distinct()
+        return users.exclude(groups__permissions__in=list(get_role_permission_ids().values()))\
+            .distinct()
 
     def get_admins(self, gym_pk):
         '''
         Returns all admins for this gym (i.e trainers, managers, etc.)
         '''
-        perm_gym = Permission.objects.get(codename='manage_gym')
-        perm_gyms = Permission.objects.get(codename='manage_gyms')
-        perm_trainer = Permission.objects.get(codename='gym_trainer')
-
         users = User.objects.filter(userprofile__gym_id=gym_pk)
-        return users.filter(Q(groups__permissions=perm_gym) |
-                            Q(groups__permissions=perm_gyms) |
-                            Q(groups__permissions=perm_trainer)).distinct()
+        return users.filter(groups__permissions__in=list(get_role_permission_ids().values()))\
+            .distinct()
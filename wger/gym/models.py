@@ -101,10 +101,8 @@ class Gym(m.Model):
         Make sure that there are no users with this gym in their profiles
         '''
 
-        # Not accessing the profile directly to avoid cyclic import problems
-        for user in User.objects.filter(userprofile__gym=self).all():
-            user.userprofile.gym = None
-            user.userprofile.save()
+        # Not accessing the profile model directly to avoid cyclic import problems
+        self.userprofile_set.update(gym=None)
         super(Gym, self).delete(using)
 
     def get_absolute_url(self):
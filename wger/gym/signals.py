@@ -18,11 +18,13 @@
 # Third Party
 from django.db.models.signals import (
     post_delete,
+    post_migrate,
     post_save
 )
 from django.dispatch import receiver
 
 # wger
+from wger.gym.managers import reset_role_permission_ids
 from wger.gym.models import (
     Gym,
     GymConfig,
@@ -50,3 +52,11 @@ def delete_user_document_on_delete(sender, instance, **kwargs):
     '''
 
     instance.document.delete(save=False)
+
+
+@receiver(post_migrate)
+def reset_role_permissions(sender, **kwargs):
+    '''
+    The permissions might have been (re)created, e.g. when flushing the database
+    '''
+    reset_role_permission_ids()
@@ -0,0 +1,107 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Third Party
+from django.core.urlresolvers import (
+    reverse,
+    reverse_lazy
+)
+
+# wger
+from wger.core.tests.base_testcase import (
+    WorkoutManagerAccessTestCase,
+    WorkoutManagerTestCase
+)
+from wger.manager.models import Workout
+from wger.nutrition.models import NutritionPlan
+
+
+class CopyToMembersAccessTestCase(WorkoutManagerAccessTestCase):
+    '''
+    Tests accessing the page to copy workouts and plans to the gym members
+    '''
+    url = reverse_lazy('gym:gym:copy-to-members', kwargs={'gym_pk': 1})
+    anonymous_fail = True
+    user_success = ('admin',
+                    'trainer1',
+                    'trainer2',
+                    'manager1',
+                    'general_manager1')
+    user_fail = ('member1',
+                 'trainer4',
+                 'manager3')
+
+
+class CopyToMembersTestCase(WorkoutManagerTestCase):
+    '''
+    Tests copying workouts and plans to the gym members
+    '''
+
+    url = reverse_lazy('gym:gym:copy-to-members', kwargs={'gym_pk': 1})
+
+    def test_copy_workout_and_plan(self):
+        '''
+        Test copying a workout and a plan to several members
+        '''
+        self.user_login('admin')
+        workouts_before = Workout.objects.count()
+        plans_before = NutritionPlan.objects.count()
+
+        response = self.client.post(self.url, {'workout': 1,
+                                               'plan': 3,
+                                               'comment': 'Program for beginners',
+                                               'members': [14, 15, 16]})
+        self.assertRedirects(response, reverse('gym:gym:user-list', kwargs={'pk': 1}))
+        self.assertEqual(Workout.objects.count(), workouts_before + 3)
+        self.assertEqual(NutritionPlan.objects.count(), plans_before + 3)
+
+        for pk in (14, 15, 16):
+            workout = Workout.objects.get(user_id=pk)
+            self.assertEqual(workout.comment, 'Program for beginners')
+            self.assertEqual(workout.day_set.count(), Workout.objects.get(pk=1).day_set.count())
+
+            plan = NutritionPlan.objects.get(user_id=pk)
+            self.assertEqual(plan.meal_set.count(),
+                             NutritionPlan.objects.get(pk=3).meal_set.count())
+
+    def test_copy_foreign_workout(self):
+        '''
+        Test that only the trainer's own workouts can be copied
+        '''
+        self.user_login('admin')
+        workouts_before = Workout.objects.count()
+
+        response = self.client.post(self.url, {'workout': 3, 'members': [14]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Workout.objects.count(), workouts_before)
+
+    def test_copy_other_gym(self):
+        '''
+        Test that members of other gyms can't be selected
+        '''
+        self.user_login('admin')
+        workouts_before = Workout.objects.count()
+
+        response = self.client.post(self.url, {'workout': 1, 'members': [19]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Workout.objects.count(), workouts_before)
+
+    def test_copy_nothing_selected(self):
+        '''
+        Test that at least a workout or a plan has to be selected
+        '''
+        self.user_login('admin')
+        response = self.client.post(self.url, {'members': [14]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
@@ -0,0 +1,96 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Third Party
+from django.contrib.auth.models import (
+    Group,
+    Permission,
+    User
+)
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.gym.managers import (
+    GYM_ROLES,
+    get_role_permission_ids,
+    get_user_roles
+)
+
+
+class UserRolesTestCase(WorkoutManagerTestCase):
+    '''
+    Tests resolving the gym roles of several users at once
+    '''
+
+    def assert_same_as_has_perm(self, users):
+        '''
+        Helper function that compares the roles with the django permissions
+        '''
+        roles = get_user_roles(users)
+        for user in users:
+            user = User.objects.get(pk=user.pk)
+            for codename in GYM_ROLES:
+                self.assertEqual(roles[user.pk][codename],
+                                 user.has_perm('gym.{0}'.format(codename)),
+                                 '{0} {1}'.format(user, codename))
+            self.assertEqual(roles[user.pk]['any_admin'],
+                             any(user.has_perm('gym.{0}'.format(i)) for i in GYM_ROLES))
+
+    def test_roles(self):
+        '''
+        Test that the roles are the same as the permissions
+        '''
+        self.assert_same_as_has_perm(list(User.objects.all()))
+
+    def test_roles_special_cases(self):
+        '''
+        Test permissions set directly on the user, superusers and inactive users
+        '''
+        User.objects.filter(pk=14).update(is_superuser=True)
+        User.objects.filter(pk=4).update(is_active=False)
+        User.objects.get(pk=15).user_permissions.add(
+            Permission.objects.get(codename='gym_trainer'))
+        self.assert_same_as_has_perm(list(User.objects.all()))
+
+    def test_queries(self):
+        '''
+        Test that the number of queries doesn't depend on the number of users
+        '''
+        get_role_permission_ids()
+        users = list(User.objects.all())
+        with self.assertNumQueries(2):
+            get_user_roles(users)
+
+    def test_member_list_queries(self):
+        '''
+        Test that the gym member page needs the same queries for more admins
+        '''
+        self.user_login('admin')
+        url = reverse('gym:gym:user-list', kwargs={'pk': 1})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries_before:
+            self.client.get(url)
+
+        Group.objects.get(name='gym_trainer').user_set.add(*User.objects.filter(pk__in=(14, 15)))
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries_after:
+            response = self.client.get(url)
+
+        admins = [i['obj'].pk for i in response.context['object_list']['admins']]
+        self.assertIn(14, admins)
+        self.assertIn(15, admins)
+        self.assertEqual(len(queries_after), len(queries_before))
@@ -53,6 +53,9 @@ patterns_gym = [
     url(r'^(?P<gym_pk>\d+)/add-member$',
         gym.GymAddUserView.as_view(),
         name='add-user'),
+    url(r'^(?P<gym_pk>\d+)/copy-to-members$',
+        gym.GymCopyToMembersView.as_view(),
+        name='copy-to-members'),
     url(r'^add$',
         gym.GymAddView.as_view(),
         name='add'),
@@ -21,6 +21,7 @@ import datetime
 import logging
 
 # Third Party
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import (
     LoginRequiredMixin,
@@ -50,6 +51,7 @@ from django.utils.translation import (
 from django.views.generic import (
     CreateView,
     DeleteView,
+    FormView,
     ListView,
     UpdateView
 )
@@ -57,6 +59,7 @@ from django.views.generic import (
 # wger
 from wger.config.models import GymConfig as GlobalGymConfig
 from wger.gym.forms import (
+    GymCopyToMembersForm,
     GymUserAddForm,
     GymUserPermisssionForm
 )
@@ -64,6 +67,7 @@ from wger.gym.helpers import (
     get_permission_list,
     is_any_gym_admin
 )
+from wger.gym.managers import get_user_roles
 from wger.gym.models import (
     Gym,
     GymAdminConfig,
@@ -118,23 +122,18 @@ class GymUserListView(LoginRequiredMixin, WgerMultiplePermissionRequiredMixin, L
 
     def get_queryset(self):
         '''
-        Return a list with the users, not really a queryset.
-        '''
-        out = {'admins': [],
-               'members': []}
+        Return a list with the admins, not really a queryset.
 
-        for u in Gym.objects.get_members(self.kwargs['pk']).select_related('usercache'):
-            out['members'].append({'obj': u,
-                                   'last_log': u.usercache.last_activity})
+        The members are loaded page by page from core:user:list-data
+        '''
+        out = {'admins': []}
 
         # admins list
-        for u in Gym.objects.get_admins(self.kwargs['pk']):
+        admins = list(Gym.objects.get_admins(self.kwargs['pk']))
+        roles = get_user_roles(admins)
+        for u in admins:
             out['admins'].append({'obj': u,
-                                  'perms': {'manage_gym': u.has_perm('gym.manage_gym'),
-                                            'manage_gyms': u.has_perm('gym.manage_gyms'),
-                                            'gym_trainer': u.has_perm('gym.gym_trainer'),
-                                            'any_admin': is_any_gym_admin(u)}
-                                  })
+                                  'perms': roles[u.pk]})
         return out
 
     def get_context_data(self, **kwargs):
@@ -144,12 +143,79 @@ class GymUserListView(LoginRequiredMixin, WgerMultiplePermissionRequiredMixin, L
         context = super(GymUserListView, self).get_context_data(**kwargs)
         context['gym'] = Gym.objects.get(pk=self.kwargs['pk'])
         context['admin_count'] = len(context['object_list']['admins'])
-        context['user_count'] = len(context['object_list']['members'])
-        context['user_table'] = {'keys': [_('ID'), _('Username'), _('Name'), _('Last activity')],
-                                 'users': context['object_list']['members']}
+        context['user_count'] = Gym.objects.get_members(self.kwargs['pk']).count()
+        context['user_list_url'] = reverse('core:user:list-data')
+        context['list_gym'] = int(self.kwargs['pk'])
+        context['user_table'] = {'keys': [_('ID'), _('Username'), _('Name'), _('Last activity')]}
         return context
 
 
+class GymCopyToMembersView(LoginRequiredMixin, FormView):
+    '''
+    Copies a workout and/or nutrition plan of a trainer to several members
+
+    The workout and plan are loaded once and copied to all the selected members
+    in one go, see Workout.copy_to and NutritionPlan.copy_to
+    '''
+    template_name = 'form.html'
+
+    def dispatch(self, request, *args, **kwargs):
+        '''
+        Only managers and trainers for this gym can copy to the members
+        '''
+        if not request.user.is_authenticated():
+            return HttpResponseForbidden()
+
+        if request.user.has_perm('gym.manage_gyms') \
+            or ((request.user.has_perm('gym.manage_gym')
+                or request.user.has_perm('gym.gym_trainer'))
+                and request.user.userprofile.gym_id == int(self.kwargs['gym_pk'])):
+            return super(GymCopyToMembersView, self).dispatch(request, *args, **kwargs)
+        return HttpResponseForbidden()
+
+    def get_form(self, form_class=None):
+        '''
+        Pass the trainer and the gym to the form
+        '''
+        return GymCopyToMembersForm(self.request.user,
+                                    self.kwargs['gym_pk'],
+                                    **self.get_form_kwargs())
+
+    def get_context_data(self, **kwargs):
+        '''
+        Set necessary template data to correctly render the form
+        '''
+        context = super(GymCopyToMembersView, self).get_context_data(**kwargs)
+        context['title'] = _('Copy to members')
+        # TODO: change template so it iterates through form and not formfields
+        context['form_fields'] = context['form']
+        context['form_action'] = reverse('gym:gym:copy-to-members',
+                                         kwargs={'gym_pk': self.kwargs['gym_pk']})
+        context['submit_text'] = _('Copy')
+        context['extend_template'] = 'base_empty.html' if self.request.is_ajax() else 'base.html'
+        return context
+
+    def form_valid(self, form):
+        '''
+        Copy the workout and plan to the selected members
+        '''
+        members = list(form.cleaned_data['members'])
+        workout = form.cleaned_data['workout']
+        plan = form.cleaned_data['plan']
+
+        if workout:
+            workout.copy_to(members, comment=form.cleaned_data['comment'] or None)
+            messages.success(self.request,
+                             _('Copied the workout to {0} members.').format(len(members)))
+        if plan:
+            plan.copy_to(members)
+            messages.success(self.request,
+                             _('Copied the nutrition plan to {0} members.').format(len(members)))
+
+        return HttpResponseRedirect(reverse('gym:gym:user-list',
+                                            kwargs={'pk': self.kwargs['gym_pk']}))
+
+
 class GymAddView(WgerFormMixin, LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     '''
     View to add a new gym
@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+'''
+Weekly statistics and personal records per user and exercise
+
+The statistics are kept in their own tables (ExerciseWeekStats and
+PersonalRecord) so they don't need to be calculated from all the logs each
+time they are shown. They are updated by the signal handlers in
+wger.manager.signals every time a log is saved or deleted: the statistics
+of the affected week are calculated again from the week's logs, which are
+only a few, and the personal records are compared with the new log or,
+when a log is changed, looked up again with the index on the logs' user,
+exercise and repetitions. Deleted logs are collected and processed once
+per transaction, so that deleting e.g. a workout with a long history
+doesn't need queries for every log.
+
+Bulk operations (e.g. QuerySet.update or loading fixtures) don't send
+signals, after them the tables can be built again with the
+rebuild-exercise-stats command.
+'''
+
+# Standard Library
+import datetime
+import logging
+import threading
+from decimal import Decimal
+
+# Third Party
+from django.contrib.auth.models import User
+from django.db import transaction
+
+# wger
+from wger.manager.models import (
+    ExerciseWeekStats,
+    PersonalRecord,
+    WorkoutLog
+)
+
+
+logger = logging.getLogger(__name__)
+
+LB_IN_KG = Decimal('0.45359237')
+
+E1RM_MAX_REPS = 12
+'''
+Maximum repetitions of a set to estimate the one rep max, the formula is
+not accurate for sets with more repetitions
+'''
+
+REBUILD_BATCH_SIZE = 1000
+'''
+Number of rows inserted with one query when building the tables again
+'''
+
+TWO_PLACES = Decimal('0.01')
+
+_pending = threading.local()
+
+
+def get_week(date):
+    '''
+    Returns the monday of the week of a date
+    '''
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def to_kg(weight, weight_unit_id):
+    '''
+    Converts the weight of a log to kg
+
+    :return: the weight or None if the unit is not kg or lb
+    '''
+    if weight_unit_id == 1:
+        return Decimal(weight)
+    elif weight_unit_id == 2:
+        return (Decimal(weight) * LB_IN_KG).quantize(TWO_PLACES)
+    return None
+
+
+def estimate_1rm(weight, reps):
+    '''
+    Estimates the one rep max of a set with Epley's formula
+
+    :return: the weight or None if there are no or too many repetitions
+    '''
+    if not reps or reps > E1RM_MAX_REPS:
+        return None
+    if reps == 1:
+        return weight
+    return (weight * (1 + Decimal(reps) / 30)).quantize(TWO_PLACES)
+
+
+def get_counted_logs(queryset=None):
+    '''
+    Filters the logs that are used for the statistics, those with
+    repetitions as unit and kg or lb as weight unit
+    '''
+    if queryset is None:
+        queryset = WorkoutLog.objects.all()
+    return queryset.filter(repetition_unit_id=1, weight_unit_id__in=(1, 2))
+
+
+def is_counted(log):
+    '''
+    Checks whether a log is used for the statistics
+    '''
+    return log.repetition_unit_id == 1 and log.weight_unit_id in (1, 2)
+
+
+def aggregate_week(sets):
+    '''
+    Calculates the statistics of a week
+
+    :param sets: list of (reps, weight in kg) tuples
+    :return: a dictionary with the fields of ExerciseWeekStats
+    '''
+    stats = {'log_count': 0,
+             'reps': 0,
+             'volume': Decimal(0),
+             'best_weight': Decimal(0),
+             'best_weight_reps': 0,
+             'estimated_1rm': None}
+    for reps, weight in sets:
+        stats['log_count'] += 1
+        stats['reps'] += reps
+        stats['volume'] += reps * weight
+        if (weight, reps) > (stats['best_weight'], stats['best_weight_reps']):
+            stats['best_weight'] = weight
+            stats['best_weight_reps'] = reps
+
+        estimate = estimate_1rm(weight, reps)
+        if estimate is not None and (stats['estimated_1rm'] is None
+                                     or estimate > stats['estimated_1rm']):
+            stats['estimated_1rm'] = estimate
+    stats['volume'] = stats['volume'].quantize(TWO_PLACES)
+    return stats
+
+
+def update_week_stats(user_pk, exercise_pk, week):
+    '''
+    Calculates the statistics of a week again from its logs
+
+    If there are no logs (left), the statistics are deleted.
+    '''
+    logs = get_counted_logs().filter(user_id=user_pk,
+                                     exercise_id=exercise_pk,
+                                     date__gte=week,
+                                     date__lt=week + datetime.timedelta(days=7))
+    sets = [(reps, to_kg(weight, unit))
+            for reps, weight, unit in logs.values_list('reps', 'weight', 'weight_unit_id')]
+
+    if not sets:
+        ExerciseWeekStats.objects.filter(user_id=user_pk,
+                                         exercise_id=exercise_pk,
+                                         week=week).delete()
+        return None
+
+    stats, created = ExerciseWeekStats.objects.update_or_create(user_id=user_pk,
+                                                                exercise_id=exercise_pk,
+                                                                week=week,
+                                                                defaults=aggregate_week(sets))
+    return stats
+
+
+def update_personal_record(user_pk, exercise_pk, reps):
+    '''
+    Looks up the personal record for a number of repetitions again
+
+    If there are no logs (left), the record is deleted.
+    '''
+    logs = get_counted_logs().filter(user_id=user_pk, exercise_id=exercise_pk, reps=reps)
+
+    # The best log of each unit, the weights can only be compared in kg
+    best = None
+    for unit in (1, 2):
+        log = logs.filter(weight_unit_id=unit)\
+            .order_by('-weight', 'date')\
+            .values_list('weight', 'date')\
+            .first()
+        if log:
+            candidate = (to_kg(log[0], unit), log[1])
+            if best is None or (candidate[0], best[1]) > (best[0], candidate[1]):
+                best = candidate
+
+    if best is None:
+        PersonalRecord.objects.filter(user_id=user_pk, exercise_id=exercise_pk, reps=reps)\
+            .delete()
+        return None
+
+    record, created = PersonalRecord.objects.update_or_create(user_id=user_pk,
+                                                              exercise_id=exercise_pk,
+                                                              reps=reps,
+                                                              defaults={'weight': best[0],
+                                                                        'date': best[1]})
+    return record
+
+
+def add_personal_record(log):
+    '''
+    Compares a new log with the personal record for its repetitions
+
+    In contrast to update_personal_record, the other logs are not needed.
+    '''
+    weight = to_kg(log.weight, log.weight_unit_id)
+    try:
+        record = PersonalRecord.objects.get(user_id=log.user_id,
+                                            exercise_id=log.exercise_id,
+                                            reps=log.reps)
+    except PersonalRecord.DoesNotExist:
+        return PersonalRecord.objects.create(user_id=log.user_id,
+                                             exercise_id=log.exercise_id,
+                                             reps=log.reps,
+                                             weight=weight,
+                                             date=log.date)
+
+    if weight > record.weight or (weight == record.weight and log.date < record.date):
+        record.weight = weight
+        record.date = log.date
+        record.save()
+    return record
+
+
+def log_changed(log, previous=None):
+    '''
+    Updates the statistics and records affected by a saved log
+
+    :param log: the WorkoutLog
+    :param previous: for changed logs, a (user pk, exercise pk, date, reps,
+                     counted) tuple with the values before the change
+    '''
+    buckets = set()
+    records = set()
+    if previous and previous[4]:
+        buckets.add((previous[0], previous[1], get_week(previous[2])))
+        records.add((previous[0], previous[1], previous[3]))
+
+    counted = is_counted(log)
+    if counted:
+        buckets.add((log.user_id, log.exercise_id, get_week(log.date)))
+
+    for bucket in buckets:
+        update_week_stats(*bucket)
+
+    # New logs can only improve the record, changed ones can also worsen it
+    if counted and not previous:
+        add_personal_record(log)
+    else:
+        if counted:
+            records.add((log.user_id, log.exercise_id, log.reps))
+        for record in records:
+            update_personal_record(*record)
+
+
+def get_pending():
+    '''
+    Returns the (user pk, exercise pk, week, reps) keys of the deleted logs
+    that were not processed yet
+    '''
+    if not hasattr(_pending, 'keys'):
+        _pending.keys = set()
+    return _pending.keys
+
+
+def log_deleted(log):
+    '''
+    Marks the statistics and records of a deleted log for updating
+
+    Deleting e.g. a workout deletes all its logs, so the keys are only
+    collected here and processed once when the transaction is committed,
+    see flush.
+    '''
+    if not is_counted(log):
+        return
+    get_pending().add((log.user_id, log.exercise_id, get_week(log.date), log.reps))
+
+    # If the transaction is rolled back the callback is discarded, but the
+    # keys are processed with the next one. Calculating them again is harmless.
+    transaction.on_commit(flush)
+
+
+def flush():
+    '''
+    Updates the statistics and records of the deleted logs
+
+    The keys are grouped by user and exercise, each group needs a few
+    queries, independently of the number of logs. The groups of deleted users
+    are skipped, their statistics were deleted as well.
+    '''
+    pending = get_pending()
+    if not pending:
+        return
+
+    groups = {}
+    for user_pk, exercise_pk, week, reps in pending:
+        weeks, records = groups.setdefault((user_pk, exercise_pk), (set(), set()))
+        weeks.add(week)
+        records.add(reps)
+    pending.clear()
+
+    users = set(User.objects.filter(pk__in=set(i[0] for i in groups))
+                            .values_list('pk', flat=True))
+    groups = [(key, value) for key, value in groups.items() if key[0] in users]
+    if not groups:
+        return
+
+    with transaction.atomic():
+        for (user_pk, exercise_pk), (weeks, records) in groups:
+            update_weeks(user_pk, exercise_pk, weeks)
+            update_personal_records(user_pk, exercise_pk, records)
+
+
+def update_weeks(user_pk, exercise_pk, weeks):
+    '''
+    Calculates the statistics of several weeks again from their logs, with
+    one query for the logs
+    '''
+    logs = get_counted_logs().filter(user_id=user_pk,
+                                     exercise_id=exercise_pk,
+                                     date__gte=min(weeks),
+                                     date__lt=max(weeks) + datetime.timedelta(days=7))
+    sets = {}
+    for date, reps, weight, unit in logs.values_list('date', 'reps', 'weight', 'weight_unit_id'):
+        week = get_week(date)
+        if week in weeks:
+            sets.setdefault(week, []).append((reps, to_kg(weight, unit)))
+
+    ExerciseWeekStats.objects.filter(user_id=user_pk,
+                                     exercise_id=exercise_pk,
+                                     week__in=weeks).delete()
+    ExerciseWeekStats.objects.bulk_create([ExerciseWeekStats(user_id=user_pk,
+                                                             exercise_id=exercise_pk,
+                                                             week=week,
+                                                             **aggregate_week(week_sets))
+                                           for week, week_sets in sorted(sets.items())])
+
+
+def update_personal_records(user_pk, exercise_pk, records):
+    '''
+    Looks up the personal records for several numbers of repetitions again,
+    with one query for the logs
+    '''
+    logs = get_counted_logs().filter(user_id=user_pk, exercise_id=exercise_pk, reps__in=records)
+    best = {}
+    for reps, weight, unit, date in logs.order_by('date')\
+            .values_list('reps', 'weight', 'weight_unit_id', 'date'):
+        update_best(best, reps, to_kg(weight, unit), date)
+
+    PersonalRecord.objects.filter(user_id=user_pk, exercise_id=exercise_pk, reps__in=records)\
+        .delete()
+    PersonalRecord.objects.bulk_create([PersonalRecord(user_id=user_pk,
+                                                       exercise_id=exercise_pk,
+                                                       reps=reps,
+                                                       weight=weight,
+                                                       date=date)
+                                        for reps, (weight, date) in sorted(best.items())])
+
+
+def update_best(best, reps, weight, date):
+    '''
+    Updates a dictionary with the best (weight, date) per repetitions
+
+    The logs must be sorted by date, only a heavier one is a new record.
+    '''
+    if reps not in best or weight > best[reps][0]:
+        best[reps] = (weight, date)
+
+
+def rebuild(user_pks=None, batch_size=REBUILD_BATCH_SIZE):
+    '''
+    Builds the statistics and personal records again from all logs
+
+    The logs are read in one pass, sorted by user, exercise and date, so only
+    the data of one exercise of one user is kept in memory at the same time.
+    The rows are inserted in batches.
+
+    :param user_pks: list of user pks, if None all users
+    :param batch_size: number of rows inserted with one query
+    :return: a tuple with the number of weeks and records created
+    '''
+    logs = get_counted_logs()
+    stats = ExerciseWeekStats.objects.all()
+    records = PersonalRecord.objects.all()
+    if user_pks is not None:
+        logs = logs.filter(user_id__in=user_pks)
+        stats = stats.filter(user_id__in=user_pks)
+        records = records.filter(user_id__in=user_pks)
+
+    logs = logs.order_by('user_id', 'exercise_id', 'date')\
+        .values_list('user_id', 'exercise_id', 'date', 'reps', 'weight', 'weight_unit_id')
+
+    new_stats = []
+    new_records = []
+    count = [0, 0]
+
+    def flush(force=False):
+        if new_stats and (force or len(new_stats) >= batch_size):
+            ExerciseWeekStats.objects.bulk_create(new_stats, batch_size=batch_size)
+            count[0] += len(new_stats)
+            del new_stats[:]
+        if new_records and (force or len(new_records) >= batch_size):
+            PersonalRecord.objects.bulk_create(new_records, batch_size=batch_size)
+            count[1] += len(new_records)
+            del new_records[:]
+
+    def add_group(key, weeks, best):
+        for week, sets in sorted(weeks.items()):
+            new_stats.append(ExerciseWeekStats(user_id=key[0],
+                                               exercise_id=key[1],
+                                               week=week,
+                                               **aggregate_week(sets)))
+        for reps, (weight, date) in sorted(best.items()):
+            new_records.append(PersonalRecord(user_id=key[0],
+                                              exercise_id=key[1],
+                                              reps=reps,
+                                              weight=weight,
+                                              date=date))
+        flush()
+
+    with transaction.atomic():
+        stats.delete()
+        records.delete()
+
+        key = None
+        weeks = {}
+        best = {}
+        for user_pk, exercise_pk, date, reps, weight, unit in logs.iterator():
+            if (user_pk, exercise_pk) != key:
+                if key:
+                    add_group(key, weeks, best)
+                key = (user_pk, exercise_pk)
+                weeks = {}
+                best = {}
+
+            weight = to_kg(weight, unit)
+            weeks.setdefault(get_week(date), []).append((reps, weight))
+            update_best(best, reps, weight, date)
+
+        if key:
+            add_group(key, weeks, best)
+        flush(force=True)
+
+    logger.debug('Created {0} weeks and {1} records'.format(*count))
+    return tuple(count)
@@ -27,6 +27,8 @@ from wger.core.api.serializers import (
 from wger.exercises.api.serializers import ExerciseSerializer
 from wger.manager.models import (
     Day,
+    ExerciseWeekStats,
+    PersonalRecord,
     Schedule,
     ScheduleStep,
     Set,
@@ -47,6 +49,21 @@ class WorkoutSerializer(serializers.ModelSerializer):
         exclude = ('user',)
 
 
+class WorkoutLogStatsSerializer(serializers.ModelSerializer):
+    '''
+    Serializer for the log statistics of a workout, see
+    WorkoutManager.with_log_stats
+    '''
+    log_days = serializers.IntegerField(read_only=True)
+    first_log = serializers.DateField(read_only=True)
+    last_log = serializers.DateField(read_only=True)
+    volume = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Workout
+        fields = ('id', 'log_days', 'first_log', 'last_log', 'volume')
+
+
 class WorkoutSessionSerializer(serializers.ModelSerializer):
     '''
     Workout session serializer
@@ -65,6 +82,24 @@ class WorkoutLogSerializer(serializers.ModelSerializer):
         exclude = ('user',)
 
 
+class ExerciseWeekStatsSerializer(serializers.ModelSerializer):
+    '''
+    Weekly exercise statistics serializer
+    '''
+    class Meta:
+        model = ExerciseWeekStats
+        exclude = ('user',)
+
+
+class PersonalRecordSerializer(serializers.ModelSerializer):
+    '''
+    Personal record serializer
+    '''
+    class Meta:
+        model = PersonalRecord
+        exclude = ('user',)
+
+
 class ScheduleStepSerializer(serializers.ModelSerializer):
     '''
     ScheduleStep serializer
@@ -20,23 +20,31 @@ import datetime
 
 # Third Party
 from rest_framework import viewsets
-from rest_framework.decorators import detail_route
+from rest_framework.decorators import (
+    detail_route,
+    list_route
+)
 from rest_framework.response import Response
 
 # wger
 from wger.manager.api.serializers import (
     DaySerializer,
+    ExerciseWeekStatsSerializer,
+    PersonalRecordSerializer,
     ScheduleSerializer,
     ScheduleStepSerializer,
     SetSerializer,
     SettingSerializer,
     WorkoutCanonicalFormSerializer,
     WorkoutLogSerializer,
+    WorkoutLogStatsSerializer,
     WorkoutSerializer,
     WorkoutSessionSerializer
 )
 from wger.manager.models import (
     Day,
+    ExerciseWeekStats,
+    PersonalRecord,
     Schedule,
     ScheduleStep,
     Set,
@@ -81,6 +89,16 @@ class WorkoutViewSet(viewsets.ModelViewSet):
         out = WorkoutCanonicalFormSerializer(self.get_object().canonical_representation).data
         return Response(out)
 
+    @list_route()
+    def log_stats(self, request):
+        '''
+        Output the log statistics of all the user's workouts
+
+        See WorkoutManager.with_log_stats for the available values
+        '''
+        workouts = Workout.objects.with_log_stats().filter(user=self.request.user)
+        return Response(WorkoutLogStatsSerializer(workouts, many=True).data)
+
 
 class WorkoutSessionViewSet(WgerOwnerObjectModelViewSet):
     '''
@@ -280,3 +298,43 @@ class WorkoutLogViewSet(WgerOwnerObjectModelViewSet):
         Return objects to check for ownership permission
         '''
         return [(Workout, 'workout')]
+
+
+class ExerciseWeekStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    '''
+    API endpoint for the weekly statistics of the user's exercises
+
+    The statistics are updated when logs are saved, they can't be edited.
+    '''
+    serializer_class = ExerciseWeekStatsSerializer
+    is_private = True
+    ordering_fields = '__all__'
+    filter_fields = ('exercise',
+                     'week')
+
+    def get_queryset(self):
+        '''
+        Only allow access to appropriate objects
+        '''
+        return ExerciseWeekStats.objects.filter(user=self.request.user)
+
+
+class PersonalRecordViewSet(viewsets.ReadOnlyModelViewSet):
+    '''
+    API endpoint for the personal records of the user, the best weight per
+    exercise and number of repetitions
+
+    The records are updated when logs are saved, they can't be edited.
+    '''
+    serializer_class = PersonalRecordSerializer
+    is_private = True
+    ordering_fields = '__all__'
+    filter_fields = ('exercise',
+                     'reps',
+                     'date')
+
+    def get_queryset(self):
+        '''
+        Only allow access to appropriate objects
+        '''
+        return PersonalRecord.objects.filter(user=self.request.user)
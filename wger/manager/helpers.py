@@ -25,7 +25,6 @@ from django.utils.translation import ugettext as _
 from reportlab.lib import colors
 from reportlab.lib.units import cm
 from reportlab.platypus import (
-    Image,
     KeepTogether,
     ListFlowable,
     ListItem,
@@ -34,11 +33,41 @@ from reportlab.platypus import (
 )
 
 # wger
+from wger.exercises.models import ExerciseImage
 from wger.utils.helpers import normalize_decimal
-from wger.utils.pdf import styleSheet
+from wger.utils.pdf import (
+    PdfImage,
+    get_pdf_image,
+    styleSheet
+)
+
 
+def get_main_images(day_list):
+    '''
+    Loads the main images for all exercises in the given days with one query
 
-def render_workout_day(day, nr_of_weeks=7, images=False, comments=False, only_table=False):
+    :param day_list: a list of workout days, in their canonical form
+    :return: a dictionary with the exercise IDs as keys and the images as values
+    '''
+    exercise_ids = set()
+    for day in day_list:
+        for set_obj in day['set_list']:
+            for exercise in set_obj['exercise_list']:
+                exercise_ids.add(exercise['obj'].id)
+
+    if not exercise_ids:
+        return {}
+
+    return {image.exercise_id: image for image in ExerciseImage.objects.accepted()
+            .filter(exercise_id__in=exercise_ids, is_main=True)}
+
+
+def render_workout_day(day,
+                       nr_of_weeks=7,
+                       images=False,
+                       comments=False,
+                       only_table=False,
+                       main_images=None):
     '''
     Render a table with reportlab with the contents of the training day
 
@@ -50,6 +79,9 @@ def render_workout_day(day, nr_of_weeks=7, images=False, comments=False, only_ta
            be rendered as well
     :param only_table: boolean indicating whether to draw a table with space
            for weight logs or just a list of the exercises
+    :param main_images: the exercises' main images, as returned by get_main_images.
+           When rendering more than one day, load them once for all of them. If
+           not set, they are loaded for this day.
     '''
 
     # If rendering only the table, reset the nr of weeks, since these columns
@@ -57,6 +89,9 @@ def render_workout_day(day, nr_of_weeks=7, images=False, comments=False, only_ta
     if only_table:
         nr_of_weeks = 0
 
+    if images and main_images is None:
+        main_images = get_main_images([day])
+
     data = []
 
     # Init some counters and markers, this will be used after the iteration to
@@ -111,8 +146,9 @@ def render_workout_day(day, nr_of_weeks=7, images=False, comments=False, only_ta
 
             # Add the exercise's main image
             image = Paragraph('', styleSheet["Small"])
-            if images:
-                if exercise['obj'].main_image:
+            if images and exercise['obj'].id in main_images:
+                image_reader = get_pdf_image(main_images[exercise['obj'].id].image)
+                if image_reader:
 
                     # Make the images somewhat larger when printing only the workout and not
                     # also the columns for weight logs
@@ -121,9 +157,7 @@ def render_workout_day(day, nr_of_weeks=7, images=False, comments=False, only_ta
                     else:
                         image_size = 1.5
 
-                    image = Image(exercise['obj'].main_image.image)
-                    image.drawHeight = image_size * cm * image.drawHeight / image.drawWidth
-                    image.drawWidth = image_size * cm
+                    image = PdfImage(image_reader, image_size * cm)
 
             # Put the name and images and comments together
             exercise_content = [Paragraph(exercise['obj'].name, styleSheet["Small"]),
@@ -79,9 +79,10 @@ class Command(BaseCommand):
             elif schedule and not schedule.is_loop:
 
                 schedule_step = schedule.get_current_scheduled_workout()
+                steps, offsets = schedule.get_step_offsets()
 
                 # Only notify if the step is the last one in the schedule
-                if schedule_step == schedule.schedulestep_set.last():
+                if schedule_step == steps[-1]:
 
                     delta = schedule.get_end_date() - datetime.date.today()
                     if datetime.timedelta(days=profile.workout_reminder) > delta:
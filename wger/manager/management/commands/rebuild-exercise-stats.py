@@ -0,0 +1,88 @@
+# -*- coding: utf-8 *-*
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import time
+
+# Third Party
+from django.contrib.auth.models import User
+from django.core.management.base import (
+    BaseCommand,
+    CommandError
+)
+
+# wger
+from wger.manager import analytics
+
+
+class Command(BaseCommand):
+    '''
+    Builds the weekly exercise statistics and personal records again
+    '''
+
+    help = 'Build the weekly exercise statistics and the personal records of ' \
+           'the users again from their workout logs. This is only needed after ' \
+           'changing logs without sending signals (e.g. bulk updates or ' \
+           'loading fixtures) or after changing the calculation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user',
+                            action='append',
+                            dest='users',
+                            default=[],
+                            help='Only process this user (username), can be '
+                                 'given several times')
+
+        parser.add_argument('--users-per-batch',
+                            action='store',
+                            dest='users_per_batch',
+                            type=int,
+                            default=100,
+                            help='Number of users processed in one transaction')
+
+        parser.add_argument('--batch-size',
+                            action='store',
+                            dest='batch_size',
+                            type=int,
+                            default=analytics.REBUILD_BATCH_SIZE,
+                            help='Number of rows inserted with one query')
+
+    def handle(self, **options):
+        '''
+        Process the options
+        '''
+        users = User.objects.order_by('pk')
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+            if users.count() != len(set(options['users'])):
+                raise CommandError('Unknown user in {0}'.format(', '.join(options['users'])))
+        user_pks = list(users.values_list('pk', flat=True))
+
+        start = time.time()
+        weeks = 0
+        records = 0
+        step = max(options['users_per_batch'], 1)
+        for i in range(0, len(user_pks), step):
+            batch = user_pks[i:i + step]
+            result = analytics.rebuild(batch, batch_size=options['batch_size'])
+            weeks += result[0]
+            records += result[1]
+            if int(options['verbosity']) >= 2:
+                self.stdout.write('** Processed {0} of {1} users'.format(i + len(batch),
+                                                                         len(user_pks)))
+
+        self.stdout.write('** Created {0} weeks and {1} personal records for {2} users '
+                          'in {3:.1f}s'.format(weeks, records, len(user_pks), time.time() - start))
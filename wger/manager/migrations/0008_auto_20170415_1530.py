@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0007_auto_20160311_2258'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='workoutlog',
+            index_together=set([('user', 'date'), ('user', 'exercise', 'reps', 'date')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='workoutsession',
+            index_together=set([('user', 'date')]),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('exercises', '0001_initial'),
+        ('manager', '0008_auto_20170415_1530'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseWeekStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField(verbose_name='Week')),
+                ('log_count', models.IntegerField(verbose_name='Number of logs')),
+                ('reps', models.IntegerField(verbose_name='Repetitions')),
+                ('volume', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Volume')),
+                ('best_weight', models.DecimalField(decimal_places=2, max_digits=7, verbose_name='Best weight')),
+                ('best_weight_reps', models.IntegerField(verbose_name='Repetitions')),
+                ('estimated_1rm', models.DecimalField(decimal_places=2, max_digits=7, null=True, verbose_name='Estimated one rep max')),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exercises.Exercise', verbose_name='Exercise')),
+                ('user', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'ordering': ['week'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PersonalRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reps', models.IntegerField(verbose_name='Repetitions')),
+                ('weight', models.DecimalField(decimal_places=2, max_digits=7, verbose_name='Weight')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exercises.Exercise', verbose_name='Exercise')),
+                ('user', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'ordering': ['reps'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='personalrecord',
+            unique_together=set([('user', 'exercise', 'reps')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='exerciseweekstats',
+            unique_together=set([('user', 'exercise', 'week')]),
+        ),
+    ]
@@ -16,13 +16,14 @@
 # along with Workout Manager.  If not, see <http://www.gnu.org/licenses/>.
 
 # Standard Library
+import bisect
 import datetime
 import logging
+from decimal import Decimal
 
 # Third Party
 import six
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.core.exceptions import (
     ObjectDoesNotExist,
     ValidationError
@@ -33,6 +34,17 @@ from django.core.validators import (
     MinValueValidator
 )
 from django.db import models
+from django.db.models import (
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    Max,
+    Min,
+    Sum,
+    Value,
+    When
+)
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 from sortedm2m.fields import SortedManyToManyField
@@ -46,11 +58,20 @@ from wger.core.models import (
 from wger.exercises.models import Exercise
 from wger.manager.helpers import reps_smart_text
 from wger.utils.cache import (
+    cache_get,
     cache_mapper,
+    cache_set,
+    get_content_version,
+    pack_cache_value,
+    reset_content_version,
+    reset_current_workout,
     reset_workout_canonical_form,
-    reset_workout_log
+    reset_workout_log,
+    unpack_cache_value
 )
+from wger.utils.clone import CloneTree
 from wger.utils.fields import Html5DateField
+from wger.utils.helpers import LazyInstanceLoader
 
 
 logger = logging.getLogger(__name__)
@@ -59,6 +80,43 @@ logger = logging.getLogger(__name__)
 #
 # Classes
 #
+class WorkoutManager(models.Manager):
+    '''
+    Custom manager for workouts
+    '''
+
+    def with_log_stats(self):
+        '''
+        Returns the workouts annotated with statistics about their logs
+
+        All values are calculated by the database in one grouped query:
+
+        * log_days: number of days with logs
+        * first_log, last_log: date of the first and last log
+        * volume: sum of repetitions times weight in kg. Only logs with
+          repetitions as the unit and kg or lb as weight unit are counted.
+
+        Workouts without logs have 0 log days and None for the other values.
+        '''
+        output_field = models.DecimalField(max_digits=15, decimal_places=2)
+        reps_weight = ExpressionWrapper(F('workoutlog__reps') * F('workoutlog__weight'),
+                                        output_field=output_field)
+        lb_in_kg = Value(Decimal('0.45359237'), output_field=output_field)
+        volume = Case(When(workoutlog__repetition_unit_id=1,
+                           workoutlog__weight_unit_id=1,
+                           then=reps_weight),
+                      When(workoutlog__repetition_unit_id=1,
+                           workoutlog__weight_unit_id=2,
+                           then=ExpressionWrapper(reps_weight * lb_in_kg,
+                                                  output_field=output_field)),
+                      output_field=output_field)
+
+        return self.get_queryset().annotate(log_days=Count('workoutlog__date', distinct=True),
+                                            first_log=Min('workoutlog__date'),
+                                            last_log=Max('workoutlog__date'),
+                                            volume=Sum(volume))
+
+
 @python_2_unicode_compatible
 class Workout(models.Model):
     '''
@@ -79,6 +137,8 @@ class Workout(models.Model):
                                            "example 'Focus on back' or 'Week 1 of program xy'."))
     user = models.ForeignKey(User, verbose_name=_('User'))
 
+    objects = WorkoutManager()
+
     def get_absolute_url(self):
         '''
         Returns the canonical URL to view a workout
@@ -99,6 +159,7 @@ class Workout(models.Model):
         Reset all cached infos
         '''
         reset_workout_canonical_form(self.id)
+        reset_current_workout(self.user_id)
         super(Workout, self).save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
@@ -106,6 +167,7 @@ class Workout(models.Model):
         Reset all cached infos
         '''
         reset_workout_canonical_form(self.id)
+        reset_current_workout(self.user_id)
         super(Workout, self).delete(*args, **kwargs)
 
     def get_owner_object(self):
@@ -114,6 +176,40 @@ class Workout(models.Model):
         '''
         return self
 
+    def get_clone_tree(self):
+        '''
+        Returns the workout with all its days, sets and settings loaded, ready
+        to be copied
+
+        :return: a CloneTree, see wger.utils.clone
+        '''
+        tree = CloneTree(self)
+        tree.add_children(Day, 'training')
+        tree.add_m2m(Day, 'day')
+        tree.add_children(Set, 'exerciseday')
+        tree.add_m2m(Set, 'exercises')
+        tree.add_children(Setting, 'set')
+        return tree
+
+    def copy_to(self, users, comment=None, tree=None):
+        '''
+        Copies the workout with its days, sets and settings to several users
+
+        :param users: list of users that get a copy
+        :param comment: description of the copies, default: the workout's one
+        :param tree: an already loaded clone tree of this workout, to avoid
+                     loading it again when copying in several steps
+        :return: list with the copies, in the same order as the users
+        '''
+        tree = tree or self.get_clone_tree()
+        comment = self.comment if comment is None else comment
+        copies = tree.copy([{'user_id': user.pk, 'comment': comment} for user in users])
+
+        for workout in copies:
+            reset_workout_canonical_form(workout.pk)
+            reset_current_workout(workout.user_id)
+        return copies
+
     @property
     def canonical_representation(self):
         '''
@@ -122,49 +218,159 @@ class Workout(models.Model):
         This form makes it easier to cache and use everywhere where all or part
         of a workout structure is needed. As an additional benefit, the template
         caches are not needed anymore.
+
+        Only a compact form with the IDs of the objects is saved in the cache,
+        the model instances are loaded when they are first used. The result is
+        also kept on the instance, as long as the cached value doesn't change.
         '''
-        workout_canonical_form = cache.get(cache_mapper.get_workout_canonical(self.pk))
-        if not workout_canonical_form:
-            day_canonical_repr = []
-            muscles_front = []
-            muscles_back = []
-            muscles_front_secondary = []
-            muscles_back_secondary = []
-
-            # Sort list by weekday
-            day_list = [i for i in self.day_set.select_related()]
-            day_list.sort(key=lambda day: day.get_first_day_id)
-
-            for day in day_list:
-                canonical_repr_day = day.get_canonical_representation()
-
-                # Collect all muscles
-                for i in canonical_repr_day['muscles']['front']:
-                    if i not in muscles_front:
-                        muscles_front.append(i)
-                for i in canonical_repr_day['muscles']['back']:
-                    if i not in muscles_back:
-                        muscles_back.append(i)
-                for i in canonical_repr_day['muscles']['frontsecondary']:
-                    if i not in muscles_front_secondary:
-                        muscles_front_secondary.append(i)
-                for i in canonical_repr_day['muscles']['backsecondary']:
-                    if i not in muscles_back_secondary:
-                        muscles_back_secondary.append(i)
-
-                day_canonical_repr.append(canonical_repr_day)
-
-            workout_canonical_form = {'obj': self,
-                                      'muscles': {'front': muscles_front,
-                                                  'back': muscles_back,
-                                                  'frontsecondary': muscles_front_secondary,
-                                                  'backsecondary': muscles_back_secondary},
-                                      'day_list': day_canonical_repr}
-            # Save to cache
-            cache.set(cache_mapper.get_workout_canonical(self.pk), workout_canonical_form)
+        key = cache_mapper.get_workout_canonical(self.pk)
+        packed = cache_get(key)
+        memo = getattr(self, '_canonical_representation', None)
+        if memo is not None and packed is not None and memo[0] == packed:
+            return memo[1]
 
+        if isinstance(packed, tuple):
+            workout_canonical_form = self.expand_canonical_form(unpack_cache_value(packed))
+        else:
+            workout_canonical_form = self.build_canonical_form()
+            packed = pack_cache_value(self.compact_canonical_form(workout_canonical_form))
+            cache_set(key, packed)
+
+        self._canonical_representation = (packed, workout_canonical_form)
         return workout_canonical_form
 
+    def build_canonical_form(self):
+        '''
+        Creates the canonical representation of the workout from the database
+        '''
+        day_canonical_repr = []
+        muscles_front = []
+        muscles_back = []
+        muscles_front_secondary = []
+        muscles_back_secondary = []
+
+        # Sort list by weekday
+        day_list = [i for i in self.day_set.select_related()]
+        day_list.sort(key=lambda day: day.get_first_day_id)
+
+        for day in day_list:
+            canonical_repr_day = day.get_canonical_representation()
+
+            # Collect all muscles
+            for i in canonical_repr_day['muscles']['front']:
+                if i not in muscles_front:
+                    muscles_front.append(i)
+            for i in canonical_repr_day['muscles']['back']:
+                if i not in muscles_back:
+                    muscles_back.append(i)
+            for i in canonical_repr_day['muscles']['frontsecondary']:
+                if i not in muscles_front_secondary:
+                    muscles_front_secondary.append(i)
+            for i in canonical_repr_day['muscles']['backsecondary']:
+                if i not in muscles_back_secondary:
+                    muscles_back_secondary.append(i)
+
+            day_canonical_repr.append(canonical_repr_day)
+
+        return {'obj': self,
+                'muscles': {'front': muscles_front,
+                            'back': muscles_back,
+                            'frontsecondary': muscles_front_secondary,
+                            'backsecondary': muscles_back_secondary},
+                'day_list': day_canonical_repr}
+
+    @staticmethod
+    def compact_canonical_form(canonical):
+        '''
+        Returns the compact form of a canonical representation
+
+        All model instances are replaced by their IDs, so the result only
+        contains primitive types and is small and fast to (un)pickle.
+        '''
+        day_list = []
+        for day in canonical['day_list']:
+            set_list = []
+            for set_dict in day['set_list']:
+                exercise_list = []
+                for exercise in set_dict['exercise_list']:
+                    exercise_list.append({
+                        'id': exercise['obj'].pk,
+                        'setting_ids': [i.pk for i in exercise['setting_obj_list']],
+                        'repetition_unit_ids': [i.pk for i in exercise['repetition_units']],
+                        'weight_unit_ids': [i.pk for i in exercise['weight_units']],
+                        'setting_list': exercise['setting_list'],
+                        'reps_list': exercise['reps_list'],
+                        'weight_list': exercise['weight_list'],
+                        'has_weight': exercise['has_weight'],
+                        'setting_text': exercise['setting_text'],
+                        'comment_list': exercise['comment_list']})
+
+                set_list.append({'id': set_dict['obj'].pk,
+                                 'exercise_list': exercise_list,
+                                 'is_superset': set_dict['is_superset'],
+                                 'has_settings': set_dict['has_settings']})
+
+            day_list.append({'id': day['obj'].pk,
+                             'days_of_week': [i.pk for i in day['days_of_week']['day_list']],
+                             'days_of_week_text': day['days_of_week']['text'],
+                             'muscles': day['muscles'],
+                             'set_list': set_list})
+
+        return {'muscles': canonical['muscles'],
+                'day_list': day_list}
+
+    def expand_canonical_form(self, compact):
+        '''
+        Creates the canonical representation from its compact form
+
+        The model instances are only placeholders, all the instances of a model
+        are loaded with one query when the first one is used.
+        '''
+        loader = LazyInstanceLoader()
+        training_cache = Day._meta.get_field('training').get_cache_name()
+
+        def set_training(day):
+            setattr(day, training_cache, self)
+
+        day_list = []
+        for day in compact['day_list']:
+            set_list = []
+            for set_dict in day['set_list']:
+                exercise_list = []
+                for exercise in set_dict['exercise_list']:
+                    exercise_list.append({
+                        'obj': loader.get(Exercise, exercise['id']),
+                        'setting_obj_list': [loader.get(Setting, i)
+                                             for i in exercise['setting_ids']],
+                        'setting_list': exercise['setting_list'],
+                        'repetition_units': [loader.get(RepetitionUnit, i)
+                                             for i in exercise['repetition_unit_ids']],
+                        'weight_units': [loader.get(WeightUnit, i)
+                                         for i in exercise['weight_unit_ids']],
+                        'weight_list': exercise['weight_list'],
+                        'has_weight': exercise['has_weight'],
+                        'reps_list': exercise['reps_list'],
+                        'setting_text': exercise['setting_text'],
+                        'comment_list': exercise['comment_list']})
+
+                set_list.append({'obj': loader.get(Set, set_dict['id']),
+                                 'exercise_list': exercise_list,
+                                 'is_superset': set_dict['is_superset'],
+                                 'has_settings': set_dict['has_settings'],
+                                 'muscles': dict(day['muscles'])})
+
+            day_list.append({'obj': loader.get(Day, day['id'], callback=set_training),
+                             'days_of_week': {
+                                 'text': day['days_of_week_text'],
+                                 'day_list': [loader.get(DaysOfWeek, i)
+                                              for i in day['days_of_week']]},
+                             'muscles': day['muscles'],
+                             'set_list': set_list})
+
+        return {'obj': self,
+                'muscles': compact['muscles'],
+                'day_list': day_list}
+
 
 class ScheduleManager(models.Manager):
     '''
@@ -175,23 +381,43 @@ class ScheduleManager(models.Manager):
         '''
         Finds the currently active workout for the user, by checking the schedules
         and the workouts
+
+        The result only changes from one day to the next or when the user's
+        workouts or schedules are edited, so it is cached for the current day.
         :rtype : list
         '''
+        key = cache_mapper.get_current_workout_key(user.pk, datetime.date.today())
+        cached = cache_get(key)
+        if cached is not None:
+            workout_id, schedule_id = cached
+            try:
+                active_workout = Workout.objects.get(pk=workout_id) if workout_id else False
+                schedule = Schedule.objects.get(pk=schedule_id) if schedule_id else False
+                return (active_workout, schedule)
+            except ObjectDoesNotExist:
+                pass
 
-        # Try first to find an active schedule that has steps
+        (active_workout, schedule) = self.find_current_workout(user)
+        cache_set(key,
+                  (active_workout.pk if active_workout else None,
+                   schedule.pk if schedule else None),
+                  24 * 60 * 60)
+        return (active_workout, schedule)
+
+    def find_current_workout(self, user):
+        '''
+        Does the actual work for get_current_workout, without using the cache
+        '''
+
+        # Try first to find an active schedule that has steps. The schedule
+        # might exist and have steps, but if it's too far in the past and is
+        # not a loop, we won't use it.
         try:
             schedule = Schedule.objects.filter(user=user).get(is_active=True)
-            if schedule.schedulestep_set.count():
-                # The schedule might exist and have steps, but if it's too far in
-                # the past and is not a loop, we won't use it. Doing it like this
-                # is kind of wrong, but lets us continue to the correct place
-                if not schedule.get_current_scheduled_workout():
-                    raise ObjectDoesNotExist
-
-                active_workout = schedule.get_current_scheduled_workout().workout
-            else:
-                # same as above
+            step = schedule.get_current_scheduled_workout()
+            if not step:
                 raise ObjectDoesNotExist
+            active_workout = step.workout
 
         # there are no active schedules, just return the last workout
         except ObjectDoesNotExist:
@@ -275,29 +501,63 @@ class Schedule(models.Model):
             Schedule.objects.filter(user=self.user).update(is_active=False)
             self.is_active = True
 
+        reset_content_version('schedule', self.pk)
+        reset_current_workout(self.user_id)
         super(Schedule, self).save(*args, **kwargs)
 
-    def get_current_scheduled_workout(self):
+    def delete(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('schedule', self.pk)
+        reset_current_workout(self.user_id)
+        super(Schedule, self).delete(*args, **kwargs)
+
+    def get_step_offsets(self):
+        '''
+        Returns the steps of the schedule together with their offsets
+
+        The offset of a step is the number of days from the schedule's start
+        date to the end of that step. The values are calculated once and kept
+        until the schedule or one of its steps is changed.
+
+        :return: a tuple with the list of steps and the list of offsets
+        '''
+        version = get_content_version('schedule', self.pk)
+        cached = getattr(self, '_step_offsets', None)
+        if cached is None or version is None or cached[0] != version:
+            steps = list(self.schedulestep_set.select_related('workout'))
+            offsets = []
+            total = 0
+            for step in steps:
+                total += step.duration * 7
+                offsets.append(total)
+            self._step_offsets = (version, steps, offsets)
+        return self._step_offsets[1], self._step_offsets[2]
+
+    def get_current_scheduled_workout(self, date=None):
         '''
         Returns the currently active schedule step for a user
+
+        :param date: the date to check, by default today
         '''
-        steps = self.schedulestep_set.all()
-        start_date = self.start_date
-        found = False
+        steps, offsets = self.get_step_offsets()
         if not steps:
             return False
-        while not found:
-            for step in steps:
-                current_limit = start_date + datetime.timedelta(weeks=step.duration)
-                if current_limit >= datetime.date.today():
-                    found = True
-                    return step
-                start_date = current_limit
+
+        days = ((date or datetime.date.today()) - self.start_date).days
+        if days > offsets[-1]:
 
             # If it's not a loop, there's no workout that matches, return
             if not self.is_loop:
                 return False
 
+            # Loops repeat every offsets[-1] days, the last day of the period
+            # still belongs to the last step
+            days = days % offsets[-1] or offsets[-1]
+
+        return steps[bisect.bisect_left(offsets, days)]
+
     def get_end_date(self):
         '''
         Calculates the date when the schedule is over or None is the schedule
@@ -306,10 +566,10 @@ class Schedule(models.Model):
         if self.is_loop:
             return None
 
-        end_date = self.start_date
-        for step in self.schedulestep_set.all():
-            end_date = end_date + datetime.timedelta(weeks=step.duration)
-        return end_date
+        steps, offsets = self.get_step_offsets()
+        if not steps:
+            return self.start_date
+        return self.start_date + datetime.timedelta(days=offsets[-1])
 
 
 @python_2_unicode_compatible
@@ -349,6 +609,22 @@ class ScheduleStep(models.Model):
         '''
         return self.workout
 
+    def save(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('schedule', self.schedule_id)
+        reset_current_workout(self.schedule.user_id)
+        super(ScheduleStep, self).save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('schedule', self.schedule_id)
+        reset_current_workout(self.schedule.user_id)
+        super(ScheduleStep, self).delete(*args, **kwargs)
+
     def __str__(self):
         '''
         Return a more human-readable representation
@@ -359,21 +635,16 @@ class ScheduleStep(models.Model):
         '''
         Calculate the start and end date for this step
         '''
-
-        steps = self.schedule.schedulestep_set.all()
-        start_date = end_date = self.schedule.start_date
-        previous = 0
-
+        steps, offsets = self.schedule.get_step_offsets()
         if not steps:
             return False
 
-        for step in steps:
-            start_date += datetime.timedelta(weeks=previous)
-            end_date += datetime.timedelta(weeks=step.duration)
-            previous = step.duration
-
+        start_date = self.schedule.start_date
+        for index, step in enumerate(steps):
             if step == self:
-                return start_date, end_date
+                start = offsets[index - 1] if index else 0
+                return (start_date + datetime.timedelta(days=start),
+                        start_date + datetime.timedelta(days=offsets[index]))
 
 
 @python_2_unicode_compatible
@@ -735,6 +1006,12 @@ class WorkoutLog(models.Model):
     class Meta:
         ordering = ["date", "reps"]
 
+        # The second index also covers the filters by user and exercise. The
+        # "last weight" lookups sort by descending date, which the database
+        # does by reading the index backwards.
+        index_together = (("user", "date"),
+                          ("user", "exercise", "reps", "date"))
+
     def __str__(self):
         '''
         Return a more human-readable representation
@@ -783,6 +1060,104 @@ class WorkoutLog(models.Model):
         super(WorkoutLog, self).delete(*args, **kwargs)
 
 
+@python_2_unicode_compatible
+class ExerciseWeekStats(models.Model):
+    '''
+    The aggregated logs of a user for one exercise during one week
+
+    The entries are kept up to date when logs are saved or deleted, see
+    wger.manager.analytics. Only logs with repetitions as unit and kg or lb
+    as weight unit are counted, all weights are in kg.
+    '''
+
+    user = models.ForeignKey(User,
+                             verbose_name=_('User'),
+                             editable=False)
+    exercise = models.ForeignKey(Exercise,
+                                 verbose_name=_('Exercise'))
+    week = models.DateField(verbose_name=_('Week'))
+    '''
+    The monday of the week
+    '''
+
+    log_count = models.IntegerField(verbose_name=_('Number of logs'))
+    reps = models.IntegerField(verbose_name=_('Repetitions'))
+    volume = models.DecimalField(verbose_name=_('Volume'),
+                                 max_digits=15,
+                                 decimal_places=2)
+    '''
+    Sum of the repetitions times the weight
+    '''
+
+    best_weight = models.DecimalField(verbose_name=_('Best weight'),
+                                      max_digits=7,
+                                      decimal_places=2)
+    best_weight_reps = models.IntegerField(verbose_name=_('Repetitions'))
+    '''
+    The repetitions of the set with the best weight (the most, if several)
+    '''
+
+    estimated_1rm = models.DecimalField(verbose_name=_('Estimated one rep max'),
+                                        max_digits=7,
+                                        decimal_places=2,
+                                        null=True)
+    '''
+    The best one rep max estimated from the sets, see analytics.estimate_1rm
+    '''
+
+    class Meta:
+        ordering = ["week"]
+        unique_together = ("user", "exercise", "week")
+
+    def __str__(self):
+        '''
+        Return a more human-readable representation
+        '''
+        return u"Week {0} - {1}: {2} kg".format(self.week, self.exercise_id, self.volume)
+
+    def get_owner_object(self):
+        '''
+        Returns the object that has owner information
+        '''
+        return self
+
+
+@python_2_unicode_compatible
+class PersonalRecord(models.Model):
+    '''
+    The best weight of a user for an exercise and number of repetitions
+
+    The weight is in kg, the date is the first time it was lifted.
+    '''
+
+    user = models.ForeignKey(User,
+                             verbose_name=_('User'),
+                             editable=False)
+    exercise = models.ForeignKey(Exercise,
+                                 verbose_name=_('Exercise'))
+    reps = models.IntegerField(verbose_name=_('Repetitions'))
+    weight = models.DecimalField(verbose_name=_('Weight'),
+                                 max_digits=7,
+                                 decimal_places=2)
+    date = models.DateField(verbose_name=_('Date'))
+
+    class Meta:
+        ordering = ["reps"]
+        unique_together = ("user", "exercise", "reps")
+
+    def __str__(self):
+        '''
+        Return a more human-readable representation
+        '''
+        return u"Record: {0} x {1} kg on {2}".format(self.reps, self.weight, self.date)
+
+    def get_owner_object(self):
+        '''
+        Returns the object that has owner information
+        '''
+        return self
+
+
 @python_2_unicode_compatible
 class WorkoutSession(models.Model):
     '''
@@ -864,6 +1239,7 @@ class WorkoutSession(models.Model):
         '''
         ordering = ["date", ]
         unique_together = ("date", "user")
+        index_together = ("user", "date")
 
     def clean(self):
         '''
@@ -17,8 +17,10 @@
 # Third Party
 from django.db.models import Q
 from django.db.models.signals import (
+    post_delete,
     post_save,
-    pre_delete
+    pre_delete,
+    pre_save
 )
 
 # wger
@@ -28,6 +30,7 @@ from wger.exercises.models import (
     Muscle
 )
 from wger.gym.helpers import get_user_last_activity
+from wger.manager import analytics
 from wger.manager.models import (
     WorkoutLog,
     WorkoutSession
@@ -66,3 +69,42 @@ def reset_muscle_cache(sender, instance, **kwargs):
 
 post_save.connect(reset_muscle_cache, sender=Muscle)
 pre_delete.connect(reset_muscle_cache, sender=Muscle)
+
+
+def store_previous_log(sender, instance, raw=False, **kwargs):
+    '''
+    Store the values of a changed log before saving, the statistics of the
+    previous week and repetitions need to be updated as well
+    '''
+    instance._previous_stats_values = None
+    if raw or not instance.pk:
+        return
+
+    previous = WorkoutLog.objects.filter(pk=instance.pk)\
+        .values_list('user_id', 'exercise_id', 'date', 'reps',
+                     'repetition_unit_id', 'weight_unit_id')\
+        .first()
+    if previous:
+        instance._previous_stats_values = previous[:4] + (previous[4] == 1 and
+                                                          previous[5] in (1, 2), )
+
+
+def update_exercise_stats(sender, instance, raw=False, **kwargs):
+    '''
+    Update the weekly statistics and personal records of the log's exercise
+    '''
+    if raw:
+        return
+    analytics.log_changed(instance, previous=getattr(instance, '_previous_stats_values', None))
+
+
+def delete_exercise_stats(sender, instance, **kwargs):
+    '''
+    Update the weekly statistics and personal records of a deleted log
+    '''
+    analytics.log_deleted(instance)
+
+
+pre_save.connect(store_previous_log, sender=WorkoutLog)
+post_save.connect(update_exercise_stats, sender=WorkoutLog)
+post_delete.connect(delete_exercise_stats, sender=WorkoutLog)
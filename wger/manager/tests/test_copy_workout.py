@@ -16,12 +16,18 @@
 import logging
 
 # Third Party
+from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 # wger
 from wger.core.models import UserProfile
 from wger.core.tests.base_testcase import WorkoutManagerTestCase
-from wger.manager.models import Workout
+from wger.manager.models import (
+    Setting,
+    Workout
+)
 
 
 logger = logging.getLogger(__name__)
@@ -124,3 +130,61 @@ class CopyWorkoutTestCase(WorkoutManagerTestCase):
         self.user_login('admin')
         response = self.client.get(reverse('manager:workout:copy', kwargs={'pk': '3'}))
         self.assertEqual(response.status_code, 200)
+
+
+class CopyWorkoutToUsersTestCase(WorkoutManagerTestCase):
+    '''
+    Tests copying a workout to several users at once
+    '''
+
+    def get_structure(self, workout):
+        '''
+        Helper function that returns the content of a workout
+        '''
+        out = []
+        for day in workout.day_set.order_by('pk'):
+            out.append((day.description, [i.pk for i in day.day.all()]))
+            for workout_set in day.set_set.order_by('pk'):
+                out.append((workout_set.sets,
+                            workout_set.order,
+                            [i.pk for i in workout_set.exercises.all()]))
+                for setting in Setting.objects.filter(set=workout_set).order_by('pk'):
+                    out.append((setting.exercise_id,
+                                setting.reps,
+                                setting.weight,
+                                setting.order,
+                                setting.comment))
+        return out
+
+    def test_copy_to_users(self):
+        '''
+        Test that every user gets a complete copy of the workout
+        '''
+        workout = Workout.objects.get(pk=3)
+        users = list(User.objects.filter(pk__in=(1, 2, 3)).order_by('pk'))
+
+        copies = workout.copy_to(users, comment='Copy')
+        self.assertEqual(len(copies), 3)
+        for user, copy in zip(users, copies):
+            copy = Workout.objects.get(pk=copy.pk)
+            self.assertEqual(copy.user, user)
+            self.assertEqual(copy.comment, 'Copy')
+            self.assertEqual(self.get_structure(copy), self.get_structure(workout))
+
+    def test_copy_queries(self):
+        '''
+        Test that the number of queries doesn't depend on the size of the workout
+        '''
+        workout = Workout.objects.get(pk=3)
+        tree = workout.get_clone_tree()
+        users = list(User.objects.filter(pk__in=(1, 2, 3)).order_by('pk'))
+
+        with CaptureQueriesContext(connection) as queries_one:
+            workout.copy_to(users[:1], tree=tree)
+        with CaptureQueriesContext(connection) as queries_three:
+            workout.copy_to(users, tree=tree)
+
+        # Only the workouts themselves are saved one by one if the database
+        # can't return the IDs of the inserted rows
+        extra = 0 if connection.features.can_return_ids_from_bulk_insert else 2
+        self.assertEqual(len(queries_three), len(queries_one) + extra)
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import datetime
+from decimal import Decimal
+
+# Third Party
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.manager import analytics
+from wger.manager.models import (
+    ExerciseWeekStats,
+    PersonalRecord,
+    WorkoutLog
+)
+
+
+class ExerciseStatsTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the weekly exercise statistics and personal records
+    '''
+
+    def setUp(self):
+        super(ExerciseStatsTestCase, self).setUp()
+
+        # The fixtures are loaded without signals
+        analytics.rebuild()
+        analytics.get_pending().clear()
+
+    def get_stats(self, week, user=1, exercise=1):
+        '''
+        Helper function that returns the statistics of a week
+        '''
+        return ExerciseWeekStats.objects.get(user_id=user, exercise_id=exercise, week=week)
+
+    def get_record(self, reps, user=1, exercise=1):
+        '''
+        Helper function that returns a personal record
+        '''
+        return PersonalRecord.objects.get(user_id=user, exercise_id=exercise, reps=reps)
+
+    def add_log(self, date, reps, weight, **kwargs):
+        '''
+        Helper function that creates a log of the admin user for exercise 1
+        '''
+        return WorkoutLog.objects.create(user_id=1, workout_id=1, exercise_id=1,
+                                         date=date, reps=reps, weight=weight, **kwargs)
+
+    def test_estimate_1rm(self):
+        '''
+        Test the estimated one rep max
+        '''
+        self.assertEqual(analytics.estimate_1rm(Decimal(100), 1), Decimal(100))
+        self.assertEqual(analytics.estimate_1rm(Decimal(100), 10), Decimal('133.33'))
+        self.assertIsNone(analytics.estimate_1rm(Decimal(100), 0))
+        self.assertIsNone(analytics.estimate_1rm(Decimal(100), 20))
+
+    def test_rebuild(self):
+        '''
+        Test the statistics calculated from the fixtures
+        '''
+        self.assertEqual(ExerciseWeekStats.objects.filter(user_id=1, exercise_id=1).count(), 4)
+        stats = self.get_stats(datetime.date(2013, 10, 28))
+        self.assertEqual(stats.log_count, 1)
+        self.assertEqual(stats.volume, Decimal(8 * 38))
+        self.assertEqual(stats.best_weight, Decimal(38))
+        self.assertEqual(stats.estimated_1rm, Decimal('48.13'))
+
+        record = self.get_record(8)
+        self.assertEqual(record.weight, Decimal(38))
+        self.assertEqual(record.date, datetime.date(2013, 10, 30))
+        self.assertEqual(self.get_record(8, user=2, exercise=2).weight, Decimal(30))
+
+        # Only the selected users are built again
+        self.assertEqual(analytics.rebuild([2], batch_size=1), (1, 1))
+        self.assertEqual(ExerciseWeekStats.objects.count(), 5)
+
+    def test_create(self):
+        '''
+        Test that new logs update the week and the records
+        '''
+        self.add_log(datetime.date(2015, 1, 5), 5, 50)
+        self.add_log(datetime.date(2015, 1, 7), 5, 60)
+        self.add_log(datetime.date(2015, 1, 11), 8, 40)
+
+        stats = self.get_stats(datetime.date(2015, 1, 5))
+        self.assertEqual(stats.log_count, 3)
+        self.assertEqual(stats.reps, 18)
+        self.assertEqual(stats.volume, Decimal(5 * 50 + 5 * 60 + 8 * 40))
+        self.assertEqual(stats.best_weight, Decimal(60))
+        self.assertEqual(stats.best_weight_reps, 5)
+        self.assertEqual(stats.estimated_1rm, Decimal(70))
+
+        self.assertEqual(self.get_record(5).weight, Decimal(60))
+        self.assertEqual(self.get_record(8).weight, Decimal(40))
+        self.assertEqual(self.get_record(8).date, datetime.date(2015, 1, 11))
+
+        # A lighter set is not a new record
+        self.add_log(datetime.date(2015, 1, 12), 8, 20)
+        self.assertEqual(self.get_record(8).weight, Decimal(40))
+
+    def test_units(self):
+        '''
+        Test that lb are converted and other units ignored
+        '''
+        date = datetime.date(2015, 1, 5)
+        self.add_log(date, 10, 100, weight_unit_id=2)
+        self.add_log(date, 60, 10, repetition_unit_id=3)
+
+        stats = self.get_stats(date)
+        self.assertEqual(stats.log_count, 1)
+        self.assertEqual(stats.volume, Decimal('453.60'))
+        self.assertEqual(self.get_record(10).weight, Decimal('45.36'))
+        self.assertFalse(PersonalRecord.objects.filter(user_id=1, reps=60).exists())
+
+    def test_change(self):
+        '''
+        Test that the previous week and record are updated when a log changes
+        '''
+        log = self.add_log(datetime.date(2015, 1, 5), 5, 60)
+        self.add_log(datetime.date(2015, 1, 6), 5, 50)
+
+        log.weight = 40
+        log.save()
+        self.assertEqual(self.get_stats(datetime.date(2015, 1, 5)).best_weight, Decimal(50))
+        self.assertEqual(self.get_record(5).weight, Decimal(50))
+        self.assertEqual(self.get_record(5).date, datetime.date(2015, 1, 6))
+
+        log.date = datetime.date(2015, 2, 2)
+        log.reps = 3
+        log.save()
+        self.assertEqual(self.get_stats(datetime.date(2015, 1, 5)).log_count, 1)
+        self.assertEqual(self.get_stats(datetime.date(2015, 2, 2)).log_count, 1)
+        self.assertEqual(self.get_record(3).weight, Decimal(40))
+
+    def test_delete(self):
+        '''
+        Test that deleted logs are removed from the week and the records
+        '''
+        date = datetime.date(2015, 1, 5)
+        log = self.add_log(date, 5, 60)
+        self.add_log(date, 5, 50)
+
+        log.delete()
+
+        # The deleted logs are processed when the transaction is committed
+        self.assertEqual(self.get_stats(date).log_count, 2)
+        analytics.flush()
+        self.assertEqual(self.get_stats(date).log_count, 1)
+        self.assertEqual(self.get_record(5).weight, Decimal(50))
+
+        WorkoutLog.objects.get(date=date).delete()
+        analytics.flush()
+        self.assertFalse(ExerciseWeekStats.objects.filter(user_id=1, week=date).exists())
+        self.assertFalse(PersonalRecord.objects.filter(user_id=1, reps=5).exists())
+
+        # The fixture's record is looked up again
+        WorkoutLog.objects.get(pk=3).delete()
+        analytics.flush()
+        self.assertEqual(self.get_record(8).weight, Decimal(32))
+        self.assertEqual(self.get_record(8).date, datetime.date(2012, 10, 10))
+
+    def test_delete_many(self):
+        '''
+        Test that the queries to process deleted logs don't depend on their number
+        '''
+        def delete_logs(count):
+            for i in range(count):
+                self.add_log(datetime.date(2015, 1, 5) + datetime.timedelta(weeks=i), 5, 50 + i)
+            WorkoutLog.objects.filter(date__year=2015).delete()
+            with CaptureQueriesContext(connection) as queries:
+                analytics.flush()
+            return len(queries)
+
+        self.assertEqual(delete_logs(2), delete_logs(20))
+        self.assertFalse(ExerciseWeekStats.objects.filter(week__year=2015).exists())
+        self.assertFalse(PersonalRecord.objects.filter(reps=5).exists())
+        self.assertEqual(self.get_record(8).weight, Decimal(38))
+
+    def test_delete_user(self):
+        '''
+        Test that the logs of deleted users are not processed
+        '''
+        WorkoutLog.objects.create(user_id=2, workout_id=3, exercise_id=2,
+                                  date=datetime.date(2015, 1, 5), reps=5, weight=50)
+        User.objects.get(pk=2).delete()
+        self.assertTrue(analytics.get_pending())
+
+        # Only the users are looked up
+        with self.assertNumQueries(1):
+            analytics.flush()
+        self.assertFalse(analytics.get_pending())
+        self.assertFalse(ExerciseWeekStats.objects.filter(user_id=2).exists())
+
+    def test_incremental_rebuild(self):
+        '''
+        Test that the incremental updates give the same result as a rebuild
+        '''
+        log = self.add_log(datetime.date(2015, 1, 5), 5, 60)
+        self.add_log(datetime.date(2015, 1, 8), 3, 70, weight_unit_id=2)
+        self.add_log(datetime.date(2015, 1, 14), 5, 65)
+        log.weight = 55
+        log.save()
+        WorkoutLog.objects.get(pk=1).delete()
+        analytics.flush()
+
+        fields = ('user_id', 'exercise_id', 'week', 'log_count', 'reps', 'volume',
+                  'best_weight', 'best_weight_reps', 'estimated_1rm')
+        stats = list(ExerciseWeekStats.objects.order_by('user', 'exercise', 'week')
+                     .values_list(*fields))
+        records = list(PersonalRecord.objects.order_by('user', 'exercise', 'reps')
+                       .values_list('user_id', 'exercise_id', 'reps', 'weight', 'date'))
+
+        analytics.rebuild()
+        self.assertEqual(list(ExerciseWeekStats.objects.order_by('user', 'exercise', 'week')
+                              .values_list(*fields)), stats)
+        self.assertEqual(list(PersonalRecord.objects.order_by('user', 'exercise', 'reps')
+                              .values_list('user_id', 'exercise_id', 'reps', 'weight', 'date')),
+                         records)
+
+    def test_api(self):
+        '''
+        Test that the API only returns the user's own statistics
+        '''
+        self.user_login('test')
+        response = self.client.get(reverse('exerciseweekstats-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(reverse('personalrecord-list'), {'exercise': 2})
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(Decimal(response.data[0]['weight']), Decimal(30))
+
+        self.user_logout()
+        response = self.client.get(reverse('personalrecord-list'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_exercise_page(self):
+        '''
+        Test that the statistics are shown on the exercise page
+        '''
+        self.user_login()
+        response = self.client.get(reverse('exercise:exercise:view', kwargs={'id': 1}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['week_stats']), 4)
+        self.assertEqual(response.context['week_stats'][0].week, datetime.date(2013, 10, 28))
+        self.assertEqual(len(response.context['personal_records']), 1)
@@ -17,11 +17,14 @@ import datetime
 
 # Third Party
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 
 # wger
 from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.manager.models import Workout
 from wger.utils.helpers import (
+    make_feed_token,
     make_token,
     next_weekday
 )
@@ -148,7 +151,7 @@ class ScheduleICalExportTestCase(WorkoutManagerTestCase):
         Helper function that checks exporing an ical file using tokens for access
         '''
 
-        user = User.objects.get(username='test')
+        user = User.objects.get(username='admin')
         uid, token = make_token(user)
         response = self.client.get(reverse('manager:schedule:ical', kwargs={'pk': 2,
                                                                             'uidb64': uid,
@@ -223,3 +226,129 @@ class ScheduleICalExportTestCase(WorkoutManagerTestCase):
         self.export_ical(fail=True)
         self.export_ical_token()
         self.export_ical_token_wrong()
+
+
+class ICalFeedTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the iCal feeds for calendar subscriptions
+    '''
+
+    def get_feed(self, **kwargs):
+        '''
+        Helper function that requests the feed for workout 3
+        '''
+        uid, token = make_feed_token(User.objects.get(username='test'), 'workout', 3)
+        return self.client.get(reverse('manager:workout:ical-feed', kwargs={'pk': 3,
+                                                                            'uidb64': uid,
+                                                                            'token': token}),
+                               **kwargs)
+
+    def test_feed(self):
+        '''
+        Test the feed and that the events don't change between requests
+        '''
+        response = self.get_feed()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar')
+        self.assertFalse(response.has_header('Content-Disposition'))
+        self.assertTrue(response['ETag'])
+
+        cache.clear()
+        self.assertEqual(self.get_feed().content, response.content)
+
+    def test_not_modified(self):
+        '''
+        Test that polling with the ETag returns a 304 until the workout changes
+        '''
+        etag = self.get_feed()['ETag']
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Workout.objects.get(pk=3).save()
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_schedule_feed(self):
+        '''
+        Test the feed for a schedule
+        '''
+        uid, token = make_feed_token(User.objects.get(username='admin'), 'schedule', 2)
+        url = reverse('manager:schedule:ical-feed', kwargs={'pk': 2,
+                                                            'uidb64': uid,
+                                                            'token': token})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         304)
+
+    def test_feed_wrong_token(self):
+        '''
+        The feeds can only be accessed with a valid token
+        '''
+        response = self.client.get(reverse('manager:workout:ical-feed',
+                                           kwargs={'pk': 3,
+                                                   'uidb64': 'AB',
+                                                   'token': 'abc-11223344556677889900'}))
+        self.assertEqual(response.status_code, 403)
+
+    def test_feed_other_object(self):
+        '''
+        The feed tokens are only valid for their own object
+        '''
+        uid, token = make_feed_token(User.objects.get(username='admin'), 'workout', 1)
+        for kind, pk in (('workout', 2), ('schedule', 1)):
+            response = self.client.get(reverse('manager:{0}:ical-feed'.format(kind),
+                                               kwargs={'pk': pk,
+                                                       'uidb64': uid,
+                                                       'token': token}))
+            self.assertEqual(response.status_code, 403)
+
+    def test_feed_after_login(self):
+        '''
+        In contrast to the download links, the feeds don't expire on login
+        '''
+        self.assertEqual(self.get_feed().status_code, 200)
+        self.user_login('test')
+        self.user_logout()
+        self.assertEqual(self.get_feed().status_code, 200)
+
+    def test_feed_reset(self):
+        '''
+        Test revoking the feeds of a user
+        '''
+        uid, token = make_feed_token(User.objects.get(username='test'), 'workout', 3)
+        feed_url = reverse('manager:workout:ical-feed', kwargs={'pk': 3,
+                                                                'uidb64': uid,
+                                                                'token': token})
+        self.assertEqual(self.client.get(feed_url).status_code, 200)
+
+        self.user_login('test')
+        url = reverse('manager:workout:view', kwargs={'pk': 3})
+
+        # Only possible with POST
+        response = self.client.get(reverse('manager:workout:ical-feed-reset'), {'next': url})
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.client.get(feed_url).status_code, 200)
+
+        response = self.client.post(reverse('manager:workout:ical-feed-reset'), {'next': url})
+        self.assertRedirects(response, url)
+        self.user_logout()
+
+        self.assertEqual(self.client.get(feed_url).status_code, 403)
+
+    def test_token_other_user(self):
+        '''
+        The tokens of a user can't be used for the objects of other users
+        '''
+        uid, token = make_token(User.objects.get(username='test'))
+        response = self.client.get(reverse('manager:workout:ical', kwargs={'pk': 1,
+                                                                           'uidb64': uid,
+                                                                           'token': token}))
+        self.assertEqual(response.status_code, 404)
+
+        uid, token = make_feed_token(User.objects.get(username='test'), 'workout', 1)
+        response = self.client.get(reverse('manager:workout:ical-feed', kwargs={'pk': 1,
+                                                                                'uidb64': uid,
+                                                                                'token': token}))
+        self.assertEqual(response.status_code, 404)
@@ -18,6 +18,8 @@ from django.core.urlresolvers import reverse
 
 # wger
 from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.manager.helpers import get_main_images
+from wger.manager.models import Workout
 from wger.utils.helpers import make_token
 
 
@@ -255,3 +257,65 @@ class WorkoutPdfTableExportTestCase(WorkoutManagerTestCase):
         self.export_pdf(fail=True)
         self.export_pdf_token()
         self.export_pdf_token_wrong()
+
+
+class WorkoutPdfCacheTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the cache for the rendered workout PDFs
+    '''
+
+    def test_etag(self):
+        '''
+        Test that the ETag is sent and can be used for conditional requests
+        '''
+        self.user_login('test')
+        url = reverse('manager:workout:pdf-log', kwargs={'id': 3})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_invalidation(self):
+        '''
+        Test that editing the workout changes the cached PDF
+        '''
+        self.user_login('test')
+        url = reverse('manager:workout:pdf-table', kwargs={'id': 3})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url)['ETag'], etag)
+
+        workout = Workout.objects.get(pk=3)
+        workout.comment = 'A new description'
+        workout.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class WorkoutPdfImagesTestCase(WorkoutManagerTestCase):
+    '''
+    Tests loading the exercise images for the PDFs
+    '''
+
+    def test_main_images(self):
+        '''
+        Test that the main images of a workout are loaded with one query
+        '''
+        day_list = Workout.objects.get(pk=1).canonical_representation['day_list']
+
+        with self.assertNumQueries(1):
+            main_images = get_main_images(day_list)
+        self.assertEqual(list(main_images.keys()), [1])
+        self.assertEqual(main_images[1].pk, 1)
+
+    def test_main_images_empty(self):
+        '''
+        Test that no query is performed for days without exercises
+        '''
+        with self.assertNumQueries(0):
+            self.assertEqual(get_main_images([]), {})
@@ -312,6 +312,91 @@ class ScheduleEndDateTestCase(WorkoutManagerTestCase):
         self.assertEqual(schedule.get_end_date(), schedule.start_date)
 
 
+class ScheduleCurrentStepTestCase(WorkoutManagerTestCase):
+    '''
+    Test the calculation of the current step of a schedule
+    '''
+
+    def get_step_reference(self, schedule, date):
+        '''
+        Finds the current step by walking over the steps, week by week
+        '''
+        steps = list(schedule.schedulestep_set.all())
+        start_date = schedule.start_date
+        while True:
+            for step in steps:
+                start_date += datetime.timedelta(weeks=step.duration)
+                if start_date >= date:
+                    return step
+            if not schedule.is_loop:
+                return False
+
+    def test_loop_schedule(self):
+        '''
+        Steps: 3, 5 and 2 weeks, starting on the 2013-04-21
+        '''
+        schedule = Schedule.objects.get(pk=2)
+        start = schedule.start_date
+        self.assertEqual(schedule.get_current_scheduled_workout(start).pk, 1)
+        self.assertEqual(schedule.get_current_scheduled_workout(
+            start + datetime.timedelta(days=21)).pk, 1)
+        self.assertEqual(schedule.get_current_scheduled_workout(
+            start + datetime.timedelta(days=22)).pk, 2)
+        self.assertEqual(schedule.get_current_scheduled_workout(
+            start + datetime.timedelta(days=70)).pk, 3)
+        self.assertEqual(schedule.get_current_scheduled_workout(
+            start + datetime.timedelta(days=71)).pk, 1)
+        self.assertEqual(schedule.get_current_scheduled_workout(
+            start + datetime.timedelta(days=7000)).pk, 3)
+
+        for days in range(-10, 400, 3):
+            date = start + datetime.timedelta(days=days)
+            self.assertEqual(schedule.get_current_scheduled_workout(date),
+                             self.get_step_reference(schedule, date))
+
+    def test_not_loop_schedule(self):
+        '''
+        Schedules that are not a loop have no step after their end date
+        '''
+        schedule = Schedule.objects.get(pk=2)
+        schedule.is_loop = False
+        schedule.save()
+        start = schedule.start_date
+        self.assertEqual(schedule.get_current_scheduled_workout(
+            start + datetime.timedelta(days=70)).pk, 3)
+        self.assertFalse(schedule.get_current_scheduled_workout(
+            start + datetime.timedelta(days=71)))
+
+    def test_steps_queries(self):
+        '''
+        The steps are only loaded once
+        '''
+        schedule = Schedule.objects.get(pk=2)
+        schedule.get_current_scheduled_workout()
+        with self.assertNumQueries(0):
+            schedule.get_current_scheduled_workout()
+            schedule.get_end_date()
+            for step in schedule.get_step_offsets()[0]:
+                step.get_dates()
+
+    def test_current_workout_cache(self):
+        '''
+        The user's current workout is cached and reset when changing schedules
+        '''
+        user = User.objects.get(pk=1)
+        workout, schedule = Schedule.objects.get_current_workout(user)
+        self.assertFalse(schedule)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(Schedule.objects.get_current_workout(user), (workout, False))
+
+        schedule = Schedule.objects.get(pk=2)
+        schedule.is_active = True
+        schedule.save()
+        self.assertEqual(Schedule.objects.get_current_workout(user),
+                         (schedule.get_current_scheduled_workout().workout, schedule))
+
+
 class ScheduleModelTestCase(WorkoutManagerTestCase):
     '''
     Tests the model methods
@@ -16,6 +16,7 @@
 from decimal import Decimal
 
 # Third Party
+import six
 from django.core.cache import cache
 
 # wger
@@ -32,7 +33,10 @@ from wger.manager.models import (
     Setting,
     Workout
 )
-from wger.utils.cache import cache_mapper
+from wger.utils.cache import (
+    cache_mapper,
+    unpack_cache_value
+)
 
 
 class WorkoutCanonicalFormTestCase(WorkoutManagerTestCase):
@@ -200,3 +204,39 @@ class WorkoutCacheTestCase(WorkoutManagerTestCase):
 
         workout.delete()
         self.assertFalse(cache.get(cache_mapper.get_workout_canonical(1)))
+
+    def test_canonical_form_compact(self):
+        '''
+        Tests that the cache only contains primitive types, no model instances
+        '''
+        def check_value(value):
+            if isinstance(value, dict):
+                for i in value.values():
+                    check_value(i)
+            elif isinstance(value, list):
+                for i in value:
+                    check_value(i)
+            else:
+                self.assertIsInstance(value, (int, bool, Decimal, type(None),
+                                              six.text_type, six.binary_type))
+
+        Workout.objects.get(pk=1).canonical_representation
+        check_value(unpack_cache_value(cache.get(cache_mapper.get_workout_canonical(1))))
+
+    def test_canonical_form_from_cache(self):
+        '''
+        Tests that the canonical form read from the cache is the same
+        '''
+        canonical = Workout.objects.get(pk=1).canonical_representation
+
+        # The instances of each model are loaded with one query, the days
+        # don't need to load their workout again. The comparison loads all
+        # instances, so it is done afterwards.
+        workout = Workout.objects.get(pk=1)
+        with self.assertNumQueries(1):
+            for day in workout.canonical_representation['day_list']:
+                day['obj'].description
+                self.assertEqual(day['obj'].canonical_representation['obj'], day['obj'])
+                self.assertEqual(day['obj'].training, workout)
+
+        self.assertEqual(workout.canonical_representation, canonical)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import datetime
+from decimal import Decimal
+
+# Third Party
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.manager.models import (
+    Workout,
+    WorkoutLog
+)
+
+
+class WorkoutLogStatsTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the aggregated log statistics of the workouts
+    '''
+
+    def test_stats(self):
+        '''
+        Test the calculated values
+        '''
+        workouts = {i.pk: i for i in Workout.objects.with_log_stats().filter(user_id=1)}
+
+        self.assertEqual(workouts[1].log_days, 4)
+        self.assertEqual(workouts[1].first_log, datetime.date(2012, 10, 1))
+        self.assertEqual(workouts[1].last_log, datetime.date(2013, 10, 30))
+        self.assertEqual(workouts[1].volume, Decimal(8 * (30 + 32 + 38 + 30)))
+
+        self.assertEqual(workouts[2].log_days, 0)
+        self.assertIsNone(workouts[2].first_log)
+        self.assertIsNone(workouts[2].last_log)
+        self.assertIsNone(workouts[2].volume)
+
+    def test_stats_units(self):
+        '''
+        Test that only logs with repetitions and kg or lb are counted in the volume
+        '''
+        date = datetime.date(2012, 10, 1)
+        WorkoutLog.objects.create(user_id=1, workout_id=2, exercise_id=1, date=date,
+                                  reps=10, weight=100, weight_unit_id=2)
+        WorkoutLog.objects.create(user_id=1, workout_id=2, exercise_id=1, date=date,
+                                  reps=60, weight=10, repetition_unit_id=3)
+
+        workout = Workout.objects.with_log_stats().get(pk=2)
+        self.assertEqual(workout.log_days, 1)
+        self.assertAlmostEqual(float(workout.volume), 1000 * 0.45359237, places=1)
+
+    def test_user_overview(self):
+        '''
+        Test that the number of queries doesn't depend on the number of workouts
+        '''
+        self.user_login('admin')
+        url = reverse('core:user:overview', kwargs={'pk': 1})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries_before:
+            self.client.get(url)
+
+        Workout.objects.create(user_id=1, comment='Another workout')
+        Workout.objects.create(user_id=1, comment='And another one')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries_after:
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.context['workouts']), 4)
+        self.assertEqual(len(queries_after), len(queries_before))
+
+    def test_api(self):
+        '''
+        Test the statistics in the REST API
+        '''
+        self.user_login('admin')
+        response = self.client.get(reverse('workout-log-stats'))
+        self.assertEqual(response.status_code, 200)
+
+        stats = {i['id']: i for i in response.data}
+        self.assertEqual(set(stats.keys()), {1, 2})
+        self.assertEqual(stats[1]['log_days'], 4)
+        self.assertEqual(stats[1]['last_log'], '2013-10-30')
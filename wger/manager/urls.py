@@ -85,6 +85,12 @@ patterns_workout = [
     url(r'^calendar/(?P<username>[\w.@+-]+)/(?P<year>\d{4})/(?P<month>\d{1,2})/(?P<day>\d{1,2})$',
         log.day,
         name='calendar-day'),
+    url(r'^ical/feed/reset$',
+        ical.reset_feeds,
+        name='ical-feed-reset'),
+    url(r'^(?P<pk>\d+)/ical/feed/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z_\-]+)$',
+        ical.export_feed,
+        name='ical-feed'),
     url(r'^(?P<pk>\d+)/ical/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z]{1,13}-[0-9A-Za-z]{1,20})$',
         ical.export,
         name='ical'),
@@ -191,6 +197,9 @@ patterns_schedule = [
     url(r'^(?P<pk>\d+)/delete/$',
         schedule.ScheduleDeleteView.as_view(),
         name='delete'),
+    url(r'^(?P<pk>\d+)/ical/feed/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z_\-]+)$',
+        ical.export_schedule_feed,
+        name='ical-feed'),
     url(r'^(?P<pk>\d+)/ical/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z]{1,13}-[0-9A-Za-z]{1,20})$',
         ical.export_schedule,
         name='ical'),
@@ -16,21 +16,28 @@
 
 # Standard Library
 import datetime
+import hashlib
 import logging
 
 # Third Party
 import six
+from django.contrib.auth.decorators import login_required
 from django.contrib.sites.models import Site
+from django.core.urlresolvers import reverse
 from django.http import (
     HttpResponse,
-    HttpResponseForbidden
+    HttpResponseForbidden,
+    HttpResponseNotModified,
+    HttpResponseRedirect
 )
 from django.shortcuts import get_object_or_404
+from django.utils.encoding import force_bytes
+from django.utils.http import is_safe_url
+from django.views.decorators.http import require_POST
 from icalendar import (
     Calendar,
     Event
 )
-from icalendar.tools import UIDGenerator
 
 # wger
 from wger import get_version
@@ -38,9 +45,17 @@ from wger.manager.models import (
     Schedule,
     Workout
 )
+from wger.utils.cache import (
+    cache_get,
+    cache_mapper,
+    cache_set,
+    get_content_version
+)
 from wger.utils.helpers import (
-    check_token,
-    next_weekday
+    check_feed_token,
+    get_token_user,
+    next_weekday,
+    reset_feed_secret
 )
 
 
@@ -51,6 +66,11 @@ logger = logging.getLogger(__name__)
 Exports workouts and schedules as an iCal file that can be imported to a
 calendaring application.
 
+The same files are also available as feeds that calendar applications can
+subscribe to. Since these poll the URL regularly, the generated files are
+cached and the events have stable UIDs, so that they are recognised as the
+same ones on every update.
+
 The icalendar module has atrocious documentation, to get the slightest chance
 to make this work, looking at the module test files or the official RF is
 *really* the only way....
@@ -73,6 +93,20 @@ def get_calendar():
     return calendar
 
 
+def get_event_uid(workout, day, weekday, start_date, host_name):
+    '''
+    Returns the UID for the event of a training day
+
+    The UID only depends on the workout, day, weekday and start date, so that
+    calendar applications recognise the events they already know.
+
+    :return: UID with the same format and length as the ones generated by
+             icalendar's UIDGenerator
+    '''
+    uid = '{0}-{1}-{2}-{3}'.format(workout.pk, day.pk, weekday.pk, start_date.isoformat())
+    return '{0}@{1}'.format(hashlib.md5(force_bytes(uid)).hexdigest(), host_name)
+
+
 def get_events_workout(calendar, workout, duration, start_date=None):
     '''
     Creates all necessary events from the given workout and adds them to
@@ -88,7 +122,6 @@ def get_events_workout(calendar, workout, duration, start_date=None):
 
     start_date = start_date if start_date else workout.creation_date
     end_date = start_date + datetime.timedelta(weeks=duration)
-    generator = UIDGenerator()
     site = Site.objects.get_current()
 
     for day in workout.canonical_representation['day_list']:
@@ -108,72 +141,177 @@ def get_events_workout(calendar, workout, duration, start_date=None):
             event.add('dtstart', next_weekday(start_date, weekday.id - 1))
             event.add('dtend', next_weekday(start_date, weekday.id - 1))
             event.add('rrule', {'freq': 'weekly', 'until': end_date})
-            event['uid'] = generator.uid(host_name=site.domain)
+            event['uid'] = get_event_uid(workout, day['obj'], weekday, start_date, site.domain)
             event.add('priority', 5)
             calendar.add_component(event)
 
 
+def get_schedule_start_date(schedule):
+    '''
+    Returns the date on which the current run of a schedule started
+
+    This is the schedule's start date or, for loops, the start of the current
+    repetition.
+    '''
+    steps, offsets = schedule.get_step_offsets()
+    start_date = schedule.start_date
+    days = (datetime.date.today() - start_date).days
+    if schedule.is_loop and offsets and days > 0:
+        start_date += datetime.timedelta(days=(days - 1) // offsets[-1] * offsets[-1])
+    return start_date
+
+
+def get_ical_cache_key(*args):
+    '''
+    Returns the cache key for a generated iCal file
+
+    The arguments should identify the file completely, including the content
+    version of the objects (see get_content_version).
+    '''
+    key = u':'.join([str(arg) for arg in args])
+    return cache_mapper.get_ical_key(hashlib.md5(force_bytes(key)).hexdigest())
+
+
+def cached_ical_response(request, key, filename, render, feed=False):
+    '''
+    Returns a response with an iCal file, using the cache if possible
+
+    :param request: the current request
+    :param key: the cache key, see get_ical_cache_key
+    :param filename: the filename to use in the Content-Disposition header
+    :param render: callable that returns the file's content as bytes
+    :param feed: if True, the file is sent for subscriptions and not as a
+                 download
+    '''
+    etag = '"{0}"'.format(key)
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    content = cache_get(key)
+    if content is None:
+        content = render()
+        cache_set(key, content)
+
+    response = HttpResponse(content, content_type='text/calendar')
+    if not feed:
+        response['Content-Disposition'] = 'attachment; filename={0}'.format(filename)
+    response['Content-Length'] = len(content)
+    response['ETag'] = etag
+    return response
+
+
+def render_workout_ical(workout):
+    '''
+    Returns the iCal file for a workout as bytes
+    '''
+    calendar = get_calendar()
+    get_events_workout(calendar, workout, workout.user.userprofile.workout_duration)
+    return calendar.to_ical()
+
+
+def render_schedule_ical(schedule, start_date):
+    '''
+    Returns the iCal file for a schedule as bytes
+    '''
+    calendar = get_calendar()
+    steps, offsets = schedule.get_step_offsets()
+    for step in steps:
+        get_events_workout(calendar, step.workout, step.duration, start_date)
+        start_date = start_date + datetime.timedelta(weeks=step.duration)
+    return calendar.to_ical()
+
+
 # Views
-def export(request, pk, uidb64=None, token=None):
+def export(request, pk, uidb64=None, token=None, feed=False):
     '''
     Export the current workout as an iCal file
     '''
 
     # Load the workout
     if uidb64 is not None and token is not None:
-        if check_token(uidb64, token):
-            workout = get_object_or_404(Workout, pk=pk)
+        if feed:
+            user = check_feed_token(uidb64, token, 'workout', pk)
         else:
+            user = get_token_user(uidb64, token)
+        if user is None:
             return HttpResponseForbidden()
+        workout = get_object_or_404(Workout, pk=pk, user=user)
     else:
         if request.user.is_anonymous():
             return HttpResponseForbidden()
         workout = get_object_or_404(Workout, pk=pk, user=request.user)
 
-    # Create the calendar
-    calendar = get_calendar()
+    key = get_ical_cache_key('workout',
+                             workout.pk,
+                             get_content_version('workout', workout.pk),
+                             workout.user.userprofile.workout_duration)
+    return cached_ical_response(request,
+                                key,
+                                'Calendar-workout-{0}.ics'.format(workout.pk),
+                                lambda: render_workout_ical(workout),
+                                feed)
 
-    # Create the events and add them to the calendar
-    get_events_workout(calendar, workout, workout.user.userprofile.workout_duration)
 
-    # Send the file to the user
-    response = HttpResponse(content_type='text/calendar')
-    response['Content-Disposition'] = \
-        'attachment; filename=Calendar-workout-{0}.ics'.format(workout.pk)
-    response.write(calendar.to_ical())
-    response['Content-Length'] = len(response.content)
-    return response
+def export_feed(request, pk, uidb64, token):
+    '''
+    Workout as an iCal feed for calendar subscriptions
+    '''
+    return export(request, pk, uidb64, token, feed=True)
 
 
-def export_schedule(request, pk, uidb64=None, token=None):
+def export_schedule(request, pk, uidb64=None, token=None, feed=False):
     '''
     Export the current schedule as an iCal file
+
+    The downloaded file starts today, while the feed uses the actual dates of
+    the schedule, so that the events don't move every day.
     '''
 
     # Load the schedule
     if uidb64 is not None and token is not None:
-        if check_token(uidb64, token):
-            schedule = get_object_or_404(Schedule, pk=pk)
+        if feed:
+            user = check_feed_token(uidb64, token, 'schedule', pk)
         else:
+            user = get_token_user(uidb64, token)
+        if user is None:
             return HttpResponseForbidden()
+        schedule = get_object_or_404(Schedule, pk=pk, user=user)
     else:
         if request.user.is_anonymous():
             return HttpResponseForbidden()
         schedule = get_object_or_404(Schedule, pk=pk, user=request.user)
 
-    # Create the calendar
-    calendar = get_calendar()
+    start_date = get_schedule_start_date(schedule) if feed else datetime.date.today()
+    steps, offsets = schedule.get_step_offsets()
+    version = [get_content_version('schedule', schedule.pk)]
+    version += [get_content_version('workout', step.workout_id) for step in steps]
 
-    # Create the events and add them to the calendar
-    start_date = datetime.date.today()
-    for step in schedule.schedulestep_set.all():
-        get_events_workout(calendar, step.workout, step.duration, start_date)
-        start_date = start_date + datetime.timedelta(weeks=step.duration)
+    key = get_ical_cache_key('schedule', schedule.pk, '-'.join(version), start_date)
+    return cached_ical_response(request,
+                                key,
+                                'Calendar-schedule-{0}.ics'.format(schedule.pk),
+                                lambda: render_schedule_ical(schedule, start_date),
+                                feed)
 
-    # Send the file to the user
-    response = HttpResponse(content_type='text/calendar')
-    response['Content-Disposition'] = \
-        'attachment; filename=Calendar-schedule-{0}.ics'.format(schedule.pk)
-    response.write(calendar.to_ical())
-    response['Content-Length'] = len(response.content)
-    return response
+
+def export_schedule_feed(request, pk, uidb64, token):
+    '''
+    Schedule as an iCal feed for calendar subscriptions
+    '''
+    return export_schedule(request, pk, uidb64, token, feed=True)
+
+
+@login_required
+@require_POST
+def reset_feeds(request):
+    '''
+    Revokes the links of all calendar feeds of the user
+    '''
+    reset_feed_secret(request.user)
+
+    redirect_to = request.POST.get('next')
+    if not is_safe_url(redirect_to, host=request.get_host()):
+        redirect_to = reverse('manager:workout:overview')
+    return HttpResponseRedirect(redirect_to)
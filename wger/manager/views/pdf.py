@@ -18,10 +18,8 @@
 import logging
 
 # Third Party
-from django.http import (
-    HttpResponse,
-    HttpResponseForbidden
-)
+import six
+from django.http import HttpResponseForbidden
 from django.shortcuts import get_object_or_404
 from django.utils.translation import ugettext as _
 from reportlab.lib.pagesizes import (
@@ -35,10 +33,16 @@ from reportlab.platypus import (
 )
 
 # wger
-from wger.manager.helpers import render_workout_day
+from wger.manager.helpers import (
+    get_main_images,
+    render_workout_day
+)
 from wger.manager.models import Workout
+from wger.utils.cache import get_content_version
 from wger.utils.helpers import check_token
 from wger.utils.pdf import (
+    cached_pdf_response,
+    get_pdf_cache_key,
     render_footer,
     styleSheet
 )
@@ -47,33 +51,26 @@ from wger.utils.pdf import (
 logger = logging.getLogger(__name__)
 
 
-def workout_log(request, id, images=False, comments=False, uidb64=None, token=None):
+def render_workout_pdf(workout, url, images=False, comments=False, only_table=False):
     '''
-    Generates a PDF with the contents of the given workout
+    Renders the PDF for a workout
 
     See also
     * http://www.blog.pythonlibrary.org/2010/09/21/reportlab
     * http://www.reportlab.com/apis/reportlab/dev/platypus.html
-    '''
-    comments = bool(int(comments))
-    images = bool(int(images))
 
-    # Load the workout
-    if uidb64 is not None and token is not None:
-        if check_token(uidb64, token):
-            workout = get_object_or_404(Workout, pk=id)
-        else:
-            return HttpResponseForbidden()
-    else:
-        if request.user.is_anonymous():
-            return HttpResponseForbidden()
-        workout = get_object_or_404(Workout, pk=id, user=request.user)
-
-    # Create the HttpResponse object with the appropriate PDF headers.
-    response = HttpResponse(content_type='application/pdf')
+    :param workout: the workout to render
+    :param url: the absolute URL of the workout, used in the footer
+    :param images: whether to draw the exercise images
+    :param comments: whether to render the exercise comments
+    :param only_table: whether to render only the workout or also the columns
+           for the weight logs
+    :return: the PDF's content as bytes
+    '''
+    buffer = six.BytesIO()
 
-    # Create the PDF object, using the response object as its "file."
-    doc = SimpleDocTemplate(response,
+    # Create the PDF object, using the buffer as its "file."
+    doc = SimpleDocTemplate(buffer,
                             pagesize=A4,
                             # pagesize = landscape(A4),
                             leftMargin=cm,
@@ -82,7 +79,7 @@ def workout_log(request, id, images=False, comments=False, uidb64=None, token=No
                             bottomMargin=0.5 * cm,
                             title=_('Workout'),
                             author='wger Workout Manager',
-                            subject=_('Workout for %s') % request.user.username)
+                            subject=_('Workout for %s') % workout.user.username)
 
     # container for the 'Flowable' objects
     elements = []
@@ -95,33 +92,31 @@ def workout_log(request, id, images=False, comments=False, uidb64=None, token=No
     elements.append(Spacer(10 * cm, 0.5 * cm))
 
     # Iterate through the Workout and render the training days
-    for day in workout.canonical_representation['day_list']:
-        elements.append(render_workout_day(day, images=images, comments=comments))
+    day_list = workout.canonical_representation['day_list']
+    main_images = get_main_images(day_list) if images else None
+    for day in day_list:
+        elements.append(render_workout_day(day,
+                                           images=images,
+                                           comments=comments,
+                                           only_table=only_table,
+                                           main_images=main_images))
         elements.append(Spacer(10 * cm, 0.5 * cm))
 
     # Footer, date and info
     elements.append(Spacer(10 * cm, 0.5 * cm))
-    elements.append(render_footer(request.build_absolute_uri(workout.get_absolute_url())))
+    elements.append(render_footer(url))
 
-    # write the document and send the response to the browser
+    # write the document
     doc.build(elements)
+    return buffer.getvalue()
 
-    # Create the HttpResponse object with the appropriate PDF headers.
-    response['Content-Disposition'] = 'attachment; filename=Workout-{0}-log.pdf'.format(id)
-    response['Content-Length'] = len(response.content)
-    return response
 
-
-def workout_view(request, id, images=False, comments=False, uidb64=None, token=None):
-    '''
-    Generates a PDF with the contents of the workout, without table for logs
+def workout_pdf_response(request, id, images, comments, uidb64, token, only_table):
     '''
+    Returns the (possibly cached) PDF for the workout
 
-    '''
-    Generates a PDF with the contents of the given workout
-    See also
-    * http://www.blog.pythonlibrary.org/2010/09/21/reportlab
-    * http://www.reportlab.com/apis/reportlab/dev/platypus.html
+    The other layout (with or without the columns for the weight logs) is
+    rendered in the background, if needed.
     '''
     comments = bool(int(comments))
     images = bool(int(images))
@@ -137,43 +132,32 @@ def workout_view(request, id, images=False, comments=False, uidb64=None, token=N
             return HttpResponseForbidden()
         workout = get_object_or_404(Workout, pk=id, user=request.user)
 
-    # Create the HttpResponse object with the appropriate PDF headers.
-    response = HttpResponse(content_type='application/pdf')
+    url = request.build_absolute_uri(workout.get_absolute_url())
+    version = get_content_version('workout', workout.pk)
 
-    # Create the PDF object, using the response object as its "file."
-    doc = SimpleDocTemplate(response,
-                            pagesize=A4,
-                            leftMargin=cm,
-                            rightMargin=cm,
-                            topMargin=0.5 * cm,
-                            bottomMargin=0.5 * cm,
-                            title=_('Workout'),
-                            author='wger Workout Manager',
-                            subject=_('Workout for %s') % request.user.username)
-
-    # container for the 'Flowable' objects
-    elements = []
+    variants = []
+    for table in (only_table, not only_table):
+        key = get_pdf_cache_key('workout', workout.pk, version, images, comments, table, url)
+        variants.append((key, lambda table=table: render_workout_pdf(workout,
+                                                                     url,
+                                                                     images=images,
+                                                                     comments=comments,
+                                                                     only_table=table)))
 
-    # Set the title
-    p = Paragraph('<para align="center"><strong>%(description)s</strong></para>' %
-                  {'description': workout},
-                  styleSheet["HeaderBold"])
-    elements.append(p)
-    elements.append(Spacer(10 * cm, 0.5 * cm))
+    key, render = variants[0]
+    filename = 'Workout-{0}-{1}.pdf'.format(id, 'table' if only_table else 'log')
+    return cached_pdf_response(request, key, filename, render, variants=variants)
 
-    # Iterate through the Workout and render the training days
-    for day in workout.canonical_representation['day_list']:
-        elements.append(render_workout_day(day, images=images, comments=comments, only_table=True))
-        elements.append(Spacer(10 * cm, 0.5 * cm))
 
-    # Footer, date and info
-    elements.append(Spacer(10 * cm, 0.5 * cm))
-    elements.append(render_footer(request.build_absolute_uri(workout.get_absolute_url())))
+def workout_log(request, id, images=False, comments=False, uidb64=None, token=None):
+    '''
+    Generates a PDF with the contents of the given workout
+    '''
+    return workout_pdf_response(request, id, images, comments, uidb64, token, only_table=False)
 
-    # write the document and send the response to the browser
-    doc.build(elements)
 
-    # Create the HttpResponse object with the appropriate PDF headers.
-    response['Content-Disposition'] = 'attachment; filename=Workout-{0}-table.pdf'.format(id)
-    response['Content-Length'] = len(response.content)
-    return response
+def workout_view(request, id, images=False, comments=False, uidb64=None, token=None):
+    '''
+    Generates a PDF with the contents of the workout, without table for logs
+    '''
+    return workout_pdf_response(request, id, images, comments, uidb64, token, only_table=True)
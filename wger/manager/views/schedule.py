@@ -19,6 +19,7 @@ import datetime
 import logging
 
 # Third Party
+import six
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.core.urlresolvers import (
@@ -26,7 +27,6 @@ from django.core.urlresolvers import (
     reverse_lazy
 )
 from django.http import (
-    HttpResponse,
     HttpResponseForbidden,
     HttpResponseRedirect
 )
@@ -52,17 +52,24 @@ from reportlab.platypus import (
 )
 
 # wger
-from wger.manager.helpers import render_workout_day
+from wger.manager.helpers import (
+    get_main_images,
+    render_workout_day
+)
 from wger.manager.models import Schedule
+from wger.utils.cache import get_content_version
 from wger.utils.generic_views import (
     WgerDeleteMixin,
     WgerFormMixin
 )
 from wger.utils.helpers import (
     check_token,
+    make_feed_token,
     make_token
 )
 from wger.utils.pdf import (
+    cached_pdf_response,
+    get_pdf_cache_key,
     render_footer,
     styleSheet
 )
@@ -98,16 +105,21 @@ def view(request, pk):
 
     uid, token = make_token(user)
 
+    # The feed links don't expire, only show them to the owner
+    feed_uid, feed_token = None, None
+    if is_owner:
+        feed_uid, feed_token = make_feed_token(user, 'schedule', schedule.pk)
+
     template_data['schedule'] = schedule
     if schedule.is_active:
         template_data['active_workout'] = schedule.get_current_scheduled_workout()
     else:
         template_data['active_workout'] = False
 
-    schedule.get_current_scheduled_workout()
-
     template_data['uid'] = uid
     template_data['token'] = token
+    template_data['feed_uid'] = feed_uid
+    template_data['feed_token'] = feed_token
     template_data['is_owner'] = is_owner
     template_data['owner_user'] = user
     template_data['show_shariff'] = is_owner
@@ -115,30 +127,20 @@ def view(request, pk):
     return render(request, 'schedule/view.html', template_data)
 
 
-def export_pdf_log(request, pk, images=False, comments=False, uidb64=None, token=None):
+def render_schedule_pdf(schedule, url, images=False, comments=False, only_table=False):
     '''
-    Show the workout schedule
+    Renders the PDF for a schedule
+
+    :param schedule: the schedule to render
+    :param url: the absolute URL of the schedule, used in the footer
+    :param images: whether to draw the exercise images
+    :param comments: whether to render the exercise comments
+    :param only_table: whether to render only the workouts or also the columns
+           for the weight logs
+    :return: the PDF's content as bytes
     '''
-    user = request.user
-
-    comments = bool(int(comments))
-    images = bool(int(images))
-
-    # Load the workout
-    if uidb64 is not None and token is not None:
-        if check_token(uidb64, token):
-            schedule = get_object_or_404(Schedule, pk=pk)
-        else:
-            return HttpResponseForbidden()
-    else:
-        if request.user.is_anonymous():
-            return HttpResponseForbidden()
-        schedule = get_object_or_404(Schedule, pk=pk, user=user)
-
-    # Create the HttpResponse object with the appropriate PDF headers.
-    # and use it to the create the PDF using it as a file like object
-    response = HttpResponse(content_type='application/pdf')
-    doc = SimpleDocTemplate(response,
+    buffer = six.BytesIO()
+    doc = SimpleDocTemplate(buffer,
                             pagesize=A4,
                             leftMargin=cm,
                             rightMargin=cm,
@@ -146,7 +148,7 @@ def export_pdf_log(request, pk, images=False, comments=False, uidb64=None, token
                             bottomMargin=0.5 * cm,
                             title=_('Workout'),
                             author='wger Workout Manager',
-                            subject='Schedule for {0}'.format(request.user.username))
+                            subject='Schedule for {0}'.format(schedule.user.username))
 
     # container for the 'Flowable' objects
     elements = []
@@ -156,8 +158,17 @@ def export_pdf_log(request, pk, images=False, comments=False, uidb64=None, token
     elements.append(p)
     elements.append(Spacer(10 * cm, 0.5 * cm))
 
+    # Load the images of all workouts at once
+    steps = schedule.schedulestep_set.select_related('workout')
+    main_images = None
+    if images:
+        day_list = []
+        for step in steps:
+            day_list.extend(step.workout.canonical_representation['day_list'])
+        main_images = get_main_images(day_list)
+
     # Iterate through the Workout and render the training days
-    for step in schedule.schedulestep_set.all():
+    for step in steps:
         p = Paragraph(u'<para>{0} {1}</para>'.format(step.duration, _('Weeks')),
                       styleSheet["HeaderBold"])
         elements.append(p)
@@ -165,27 +176,26 @@ def export_pdf_log(request, pk, images=False, comments=False, uidb64=None, token
 
         for day in step.workout.canonical_representation['day_list']:
             elements.append(
-                render_workout_day(day, images=images, comments=comments, nr_of_weeks=7))
+                render_workout_day(day, images=images, comments=comments, nr_of_weeks=7,
+                                   only_table=only_table, main_images=main_images))
             elements.append(Spacer(10 * cm, 0.5 * cm))
 
     # Footer, date and info
     elements.append(Spacer(10 * cm, 0.5 * cm))
-    url = reverse('manager:schedule:view', kwargs={'pk': schedule.id})
-    elements.append(render_footer(request.build_absolute_uri(url)))
+    elements.append(render_footer(url))
 
-    # write the document and send the response to the browser
+    # write the document
     doc.build(elements)
-    response['Content-Disposition'] = 'attachment; filename=Schedule-{0}-log.pdf'.format(pk)
-    response['Content-Length'] = len(response.content)
-    return response
+    return buffer.getvalue()
 
 
-def export_pdf_table(request, pk, images=False, comments=False, uidb64=None, token=None):
+def schedule_pdf_response(request, pk, images, comments, uidb64, token, only_table):
     '''
-    Show the workout schedule
-    '''
-    user = request.user
+    Returns the (possibly cached) PDF for the schedule
 
+    The content version of a schedule is a combination of the version of the
+    schedule itself and the ones of the workouts in its steps.
+    '''
     comments = bool(int(comments))
     images = bool(int(images))
 
@@ -198,52 +208,41 @@ def export_pdf_table(request, pk, images=False, comments=False, uidb64=None, tok
     else:
         if request.user.is_anonymous():
             return HttpResponseForbidden()
-        schedule = get_object_or_404(Schedule, pk=pk, user=user)
+        schedule = get_object_or_404(Schedule, pk=pk, user=request.user)
 
-    # Create the HttpResponse object with the appropriate PDF headers.
-    # and use it to the create the PDF using it as a file like object
-    response = HttpResponse(content_type='application/pdf')
-    doc = SimpleDocTemplate(response,
-                            pagesize=A4,
-                            leftMargin=cm,
-                            rightMargin=cm,
-                            topMargin=0.5 * cm,
-                            bottomMargin=0.5 * cm,
-                            title=_('Workout'),
-                            author='wger Workout Manager',
-                            subject='Schedule for {0}'.format(request.user.username))
+    url = request.build_absolute_uri(reverse('manager:schedule:view',
+                                             kwargs={'pk': schedule.id}))
+    version = [get_content_version('schedule', schedule.pk)]
+    for workout_id in schedule.schedulestep_set.values_list('workout_id', flat=True):
+        version.append(get_content_version('workout', workout_id))
+    version = '-'.join(version)
 
-    # container for the 'Flowable' objects
-    elements = []
+    variants = []
+    for table in (only_table, not only_table):
+        key = get_pdf_cache_key('schedule', schedule.pk, version, images, comments, table, url)
+        variants.append((key, lambda table=table: render_schedule_pdf(schedule,
+                                                                      url,
+                                                                      images=images,
+                                                                      comments=comments,
+                                                                      only_table=table)))
 
-    # Set the title
-    p = Paragraph(u'<para align="center">{0}</para>'.format(schedule), styleSheet["HeaderBold"])
-    elements.append(p)
-    elements.append(Spacer(10 * cm, 0.5 * cm))
+    key, render = variants[0]
+    filename = 'Schedule-{0}-{1}.pdf'.format(pk, 'table' if only_table else 'log')
+    return cached_pdf_response(request, key, filename, render, variants=variants)
 
-    # Iterate through the Workout and render the training days
-    for step in schedule.schedulestep_set.all():
-        p = Paragraph(u'<para>{0} {1}</para>'.format(step.duration, _('Weeks')),
-                      styleSheet["HeaderBold"])
-        elements.append(p)
-        elements.append(Spacer(10 * cm, 0.5 * cm))
 
-        for day in step.workout.canonical_representation['day_list']:
-            elements.append(
-                render_workout_day(day, images=images, comments=comments, nr_of_weeks=7,
-                                   only_table=True))
-            elements.append(Spacer(10 * cm, 0.5 * cm))
+def export_pdf_log(request, pk, images=False, comments=False, uidb64=None, token=None):
+    '''
+    Show the workout schedule
+    '''
+    return schedule_pdf_response(request, pk, images, comments, uidb64, token, only_table=False)
 
-    # Footer, date and info
-    elements.append(Spacer(10 * cm, 0.5 * cm))
-    url = reverse('manager:schedule:view', kwargs={'pk': schedule.id})
-    elements.append(render_footer(request.build_absolute_uri(url)))
 
-    # write the document and send the response to the browser
-    doc.build(elements)
-    response['Content-Disposition'] = 'attachment; filename=Schedule-{0}-table.pdf'.format(pk)
-    response['Content-Length'] = len(response.content)
-    return response
+def export_pdf_table(request, pk, images=False, comments=False, uidb64=None, token=None):
+    '''
+    Show the workout schedule
+    '''
+    return schedule_pdf_response(request, pk, images, comments, uidb64, token, only_table=True)
 
 
 @login_required
@@ -49,6 +49,7 @@ from wger.core.models import (
     RepetitionUnit,
     WeightUnit
 )
+from wger.exercises.muscle_map import get_workout_map
 from wger.manager.forms import (
     WorkoutCopyForm,
     WorkoutForm,
@@ -65,7 +66,10 @@ from wger.utils.generic_views import (
     WgerDeleteMixin,
     WgerFormMixin
 )
-from wger.utils.helpers import make_token
+from wger.utils.helpers import (
+    make_feed_token,
+    make_token
+)
 
 
 logger = logging.getLogger(__name__)
@@ -102,36 +106,23 @@ def view(request, pk):
     if not is_owner and not user.userprofile.ro_access:
         return HttpResponseForbidden()
 
-    canonical = workout.canonical_representation
     uid, token = make_token(user)
 
-    # Create the backgrounds that show what muscles the workout will work on
-    muscles_front = []
-    muscles_back = []
-    for i in canonical['muscles']['front']:
-        if i not in muscles_front:
-            muscles_front.append('images/muscles/main/muscle-{0}.svg'.format(i))
-    for i in canonical['muscles']['back']:
-        if i not in muscles_back:
-            muscles_back.append('images/muscles/main/muscle-{0}.svg'.format(i))
-
-    for i in canonical['muscles']['frontsecondary']:
-        if i not in muscles_front and i not in canonical['muscles']['front']:
-            muscles_front.append('images/muscles/secondary/muscle-{0}.svg'.format(i))
-    for i in canonical['muscles']['backsecondary']:
-        if i not in muscles_back and i not in canonical['muscles']['back']:
-            muscles_back.append('images/muscles/secondary/muscle-{0}.svg'.format(i))
-
-    # Append the silhouette of the human body as the last entry so the browser
-    # renders it in the background
-    muscles_front.append('images/muscles/muscular_system_front.svg')
-    muscles_back.append('images/muscles/muscular_system_back.svg')
+    # The feed links don't expire, only show them to the owner
+    feed_uid, feed_token = None, None
+    if is_owner:
+        feed_uid, feed_token = make_feed_token(user, 'workout', workout.pk)
+
+    # The backgrounds that show what muscles the workout will work on
+    muscle_map = get_workout_map(workout)
 
     template_data['workout'] = workout
-    template_data['muscle_backgrounds_front'] = muscles_front
-    template_data['muscle_backgrounds_back'] = muscles_back
+    template_data['muscle_backgrounds_front'] = muscle_map.get_backgrounds('front')
+    template_data['muscle_backgrounds_back'] = muscle_map.get_backgrounds('back')
     template_data['uid'] = uid
     template_data['token'] = token
+    template_data['feed_uid'] = feed_uid
+    template_data['feed_token'] = feed_token
     template_data['is_owner'] = is_owner
     template_data['owner_user'] = user
     template_data['show_shariff'] = is_owner
@@ -158,54 +149,11 @@ def copy_workout(request, pk):
 
         if workout_form.is_valid():
 
-            # Copy workout
-            days = workout.day_set.all()
-
-            workout_copy = workout
-            workout_copy.pk = None
-            workout_copy.comment = workout_form.cleaned_data['comment']
-            workout_copy.user = request.user
-            workout_copy.save()
-
-            # Copy the days
-            for day in days:
-                sets = day.set_set.all()
-
-                day_copy = day
-                days_of_week = [i for i in day.day.all()]
-                day_copy.pk = None
-                day_copy.training = workout_copy
-                day_copy.save()
-                for i in days_of_week:
-                    day_copy.day.add(i)
-                day_copy.save()
-
-                # Copy the sets
-                for current_set in sets:
-                    current_set_id = current_set.id
-                    exercises = current_set.exercises.all()
-
-                    current_set_copy = current_set
-                    current_set_copy.pk = None
-                    current_set_copy.exerciseday = day_copy
-                    current_set_copy.save()
-
-                    # Exercises has Many2Many relationship
-                    current_set_copy.exercises = exercises
-
-                    # Go through the exercises
-                    for exercise in exercises:
-                        settings = exercise.setting_set.filter(set_id=current_set_id)
-
-                        # Copy the settings
-                        for setting in settings:
-                            setting_copy = setting
-                            setting_copy.pk = None
-                            setting_copy.set = current_set_copy
-                            setting_copy.save()
+            workout_copy = workout.copy_to([request.user],
+                                           comment=workout_form.cleaned_data['comment'])[0]
 
             return HttpResponseRedirect(reverse('manager:workout:view',
-                                                kwargs={'pk': workout.id}))
+                                                kwargs={'pk': workout_copy.id}))
     else:
         workout_form = WorkoutCopyForm({'comment': workout.comment})
 
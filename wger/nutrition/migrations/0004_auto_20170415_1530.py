@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0003_auto_20170118_2308'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='nutritionplan',
+            index_together=set([('user', 'creation_date')]),
+        ),
+    ]
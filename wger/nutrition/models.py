@@ -25,7 +25,6 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.sites.models import Site
 from django.core import mail
-from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
 from django.core.validators import (
@@ -41,7 +40,15 @@ from django.utils.translation import ugettext_lazy as _
 
 # wger
 from wger.core.models import Language
-from wger.utils.cache import cache_mapper
+from wger.utils.cache import (
+    cache_delete,
+    cache_get,
+    cache_mapper,
+    cache_set,
+    get_content_version,
+    reset_content_version
+)
+from wger.utils.clone import CloneTree
 from wger.utils.constants import TWOPLACES
 from wger.utils.fields import Html5TimeField
 from wger.utils.models import (
@@ -80,6 +87,7 @@ class NutritionPlan(models.Model):
 
         # Order by creation_date, descending (oldest first)
         ordering = ["-creation_date", ]
+        index_together = ("user", "creation_date")
 
     user = models.ForeignKey(User,
                              verbose_name=_('User'),
@@ -116,11 +124,70 @@ class NutritionPlan(models.Model):
         '''
         return reverse('nutrition:plan:view', kwargs={'id': self.id})
 
+    def save(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('nutrition-plan', self.pk)
+        super(NutritionPlan, self).save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('nutrition-plan', self.pk)
+        super(NutritionPlan, self).delete(*args, **kwargs)
+
+    def get_clone_tree(self):
+        '''
+        Returns the plan with all its meals and items loaded, ready to be copied
+
+        :return: a CloneTree, see wger.utils.clone
+        '''
+        tree = CloneTree(self)
+        tree.add_children(Meal, 'plan')
+        tree.add_children(MealItem, 'meal')
+        return tree
+
+    def copy_to(self, users, tree=None):
+        '''
+        Copies the plan with its meals and items to several users
+
+        :param users: list of users that get a copy
+        :param tree: an already loaded clone tree of this plan, to avoid
+                     loading it again when copying in several steps
+        :return: list with the copies, in the same order as the users
+        '''
+        tree = tree or self.get_clone_tree()
+        copies = tree.copy([{'user_id': user.pk} for user in users])
+
+        for plan in copies:
+            reset_content_version('nutrition-plan', plan.pk)
+        return copies
+
     def get_nutritional_values(self):
         '''
         Sums the nutritional info of all items in the plan
+
+        The result is cached, it depends on the plan's content as well as on
+        the user's weight entries and units.
         '''
         use_metric = self.user.userprofile.use_metric
+        key = cache_mapper.get_nutritional_values_key(
+            self.pk,
+            get_content_version('nutrition-plan', self.pk),
+            get_content_version('weight', self.user_id),
+            use_metric)
+        result = cache_get(key)
+        if result is None:
+            result = self.calculate_nutritional_values(use_metric)
+            cache_set(key, result)
+        return result
+
+    def calculate_nutritional_values(self, use_metric):
+        '''
+        Sums the nutritional info of all items in the plan, without using the cache
+        '''
         unit = 'kg' if use_metric else 'lb'
         result = {'total': {'energy': 0,
                             'protein': 0,
@@ -355,7 +422,12 @@ class Ingredient(AbstractSubmissionModel, AbstractLicenseModel, models.Model):
         '''
 
         super(Ingredient, self).save(*args, **kwargs)
-        cache.delete(cache_mapper.get_ingredient_key(self.id))
+        cache_delete(cache_mapper.get_ingredient_key(self.id))
+
+        # Plans using this ingredient
+        for plan_id in NutritionPlan.objects.filter(meal__mealitem__ingredient=self) \
+                .values_list('id', flat=True).distinct():
+            reset_content_version('nutrition-plan', plan_id)
 
     def __str__(self):
         '''
@@ -542,6 +614,20 @@ class Meal(models.Model):
         '''
         return self.plan
 
+    def save(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('nutrition-plan', self.plan_id)
+        super(Meal, self).save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('nutrition-plan', self.plan_id)
+        super(Meal, self).delete(*args, **kwargs)
+
     def get_nutritional_values(self, use_metric=True):
         '''
         Sums the nutrional info of all items in the meal
@@ -608,6 +694,20 @@ class MealItem(models.Model):
         '''
         return self.meal.plan
 
+    def save(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('nutrition-plan', self.meal.plan_id)
+        super(MealItem, self).save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('nutrition-plan', self.meal.plan_id)
+        super(MealItem, self).delete(*args, **kwargs)
+
     def get_unit_type(self):
         '''
         Returns the type of unit used:
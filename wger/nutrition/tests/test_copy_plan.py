@@ -17,7 +17,10 @@ from django.core.urlresolvers import reverse
 
 # wger
 from wger.core.tests.base_testcase import WorkoutManagerTestCase
-from wger.nutrition.models import NutritionPlan
+from wger.nutrition.models import (
+    MealItem,
+    NutritionPlan
+)
 
 
 class CopyPlanTestCase(WorkoutManagerTestCase):
@@ -79,3 +82,25 @@ class CopyPlanTestCase(WorkoutManagerTestCase):
 
         self.user_login('admin')
         self.copy_plan(fail=True)
+
+    def test_copy_meal_items(self):
+        '''
+        Test that the meals and their items are copied as well
+        '''
+        self.user_login('test')
+        self.client.get(reverse('nutrition:plan:copy', kwargs={'pk': 4}))
+
+        original = NutritionPlan.objects.get(pk=4)
+        copy = NutritionPlan.objects.order_by('-pk').first()
+        self.assertNotEqual(original.pk, copy.pk)
+        self.assertEqual(copy.user, original.user)
+        self.assertEqual(copy.meal_set.count(), original.meal_set.count())
+        for meal_original, meal_copy in zip(original.meal_set.order_by('pk'),
+                                            copy.meal_set.order_by('pk')):
+            self.assertEqual(meal_original.order, meal_copy.order)
+            self.assertEqual(meal_original.time, meal_copy.time)
+            self.assertEqual(
+                list(MealItem.objects.filter(meal=meal_original).order_by('pk')
+                     .values_list('ingredient_id', 'weight_unit_id', 'order', 'amount')),
+                list(MealItem.objects.filter(meal=meal_copy).order_by('pk')
+                     .values_list('ingredient_id', 'weight_unit_id', 'order', 'amount')))
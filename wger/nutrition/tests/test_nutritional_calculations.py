@@ -145,3 +145,19 @@ class NutritionalValuesCalculationsTestCase(WorkoutManagerTestCase):
         self.assertEqual(values['per_kg']['carbohydrates'], Decimal(4.96).quantize(TWOPLACES))
         self.assertEqual(values['per_kg']['fat'], Decimal(1.51).quantize(TWOPLACES))
         self.assertEqual(values['per_kg']['protein'], Decimal(4.33).quantize(TWOPLACES))
+
+    def test_calculations_cache(self):
+        '''
+        Tests that the values of a plan are cached and reset when the weight changes
+        '''
+        plan = models.NutritionPlan.objects.get(pk=4)
+        values = plan.get_nutritional_values()
+        with self.assertNumQueries(0):
+            self.assertEqual(plan.get_nutritional_values(), values)
+
+        entry = plan.get_closest_weight_entry()
+        entry.weight += 10
+        entry.save()
+        self.assertEqual(plan.get_nutritional_values()['total'], values['total'])
+        self.assertLess(plan.get_nutritional_values()['per_kg']['protein'],
+                        values['per_kg']['protein'])
@@ -24,7 +24,6 @@ from django.contrib.auth.mixins import (
     LoginRequiredMixin,
     PermissionRequiredMixin
 )
-from django.core.cache import cache
 from django.core.urlresolvers import (
     reverse,
     reverse_lazy
@@ -51,7 +50,11 @@ from django.views.generic import (
 # wger
 from wger.nutrition.forms import UnitChooserForm
 from wger.nutrition.models import Ingredient
-from wger.utils.cache import cache_mapper
+from wger.utils.cache import (
+    cache_get,
+    cache_mapper,
+    cache_set
+)
 from wger.utils.constants import PAGINATION_OBJECTS_PER_PAGE
 from wger.utils.generic_views import (
     WgerDeleteMixin,
@@ -102,10 +105,10 @@ class IngredientListView(ListView):
 def view(request, id, slug=None):
     template_data = {}
 
-    ingredient = cache.get(cache_mapper.get_ingredient_key(int(id)))
+    ingredient = cache_get(cache_mapper.get_ingredient_key(int(id)))
     if not ingredient:
         ingredient = get_object_or_404(Ingredient, pk=id)
-        cache.set(cache_mapper.get_ingredient_key(ingredient), ingredient)
+        cache_set(cache_mapper.get_ingredient_key(ingredient), ingredient)
     template_data['ingredient'] = ingredient
     template_data['form'] = UnitChooserForm(data={'ingredient_id': ingredient.id,
                                                   'amount': 100,
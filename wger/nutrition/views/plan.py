@@ -26,7 +26,6 @@ from django.core.urlresolvers import (
     reverse_lazy
 )
 from django.http import (
-    HttpResponse,
     HttpResponseForbidden,
     HttpResponseRedirect
 )
@@ -62,6 +61,7 @@ from wger.nutrition.models import (
     MEALITEM_WEIGHT_UNIT,
     NutritionPlan
 )
+from wger.utils.cache import get_content_version
 from wger.utils.generic_views import (
     WgerDeleteMixin,
     WgerFormMixin
@@ -71,7 +71,11 @@ from wger.utils.helpers import (
     make_token
 )
 from wger.utils.language import load_language
-from wger.utils.pdf import styleSheet
+from wger.utils.pdf import (
+    cached_pdf_response,
+    get_pdf_cache_key,
+    styleSheet
+)
 
 
 logger = logging.getLogger(__name__)
@@ -192,64 +196,34 @@ def copy(request, pk):
 
     plan = get_object_or_404(NutritionPlan, pk=pk, user=request.user)
 
-    # Copy plan
-    meals = plan.meal_set.all()
-
-    plan_copy = plan
-    plan_copy.pk = None
-    plan_copy.save()
-
-    # Copy the meals
-    for meal in meals:
-        meal_items = meal.mealitem_set.all()
-
-        meal_copy = meal
-        meal_copy.pk = None
-        meal_copy.plan = plan_copy
-        meal_copy.save()
-
-        # Copy the individual meal entries
-        for item in meal_items:
-            item_copy = item
-            item_copy.pk = None
-            item_copy.meal = meal_copy
-            item.save()
+    plan_copy = plan.copy_to([request.user])[0]
 
     # Redirect
-    return HttpResponseRedirect(reverse('nutrition:plan:view', kwargs={'id': plan.id}))
+    return HttpResponseRedirect(reverse('nutrition:plan:view', kwargs={'id': plan_copy.id}))
 
 
-def export_pdf(request, id, uidb64=None, token=None):
+def render_plan_pdf(plan, url):
     '''
-    Generates a PDF with the contents of a nutrition plan
+    Renders the PDF for a nutrition plan
 
     See also
     * http://www.blog.pythonlibrary.org/2010/09/21/reportlab
     * http://www.reportlab.com/apis/reportlab/dev/platypus.html
-    '''
 
-    # Load the plan
-    if uidb64 is not None and token is not None:
-        if check_token(uidb64, token):
-            plan = get_object_or_404(NutritionPlan, pk=id)
-        else:
-            return HttpResponseForbidden()
-    else:
-        if request.user.is_anonymous():
-            return HttpResponseForbidden()
-        plan = get_object_or_404(NutritionPlan, pk=id, user=request.user)
+    :param plan: the nutrition plan to render
+    :param url: the absolute URL of the plan, used in the footer
+    :return: the PDF's content as bytes
+    '''
 
     plan_data = plan.get_nutritional_values()
 
-    # Create the HttpResponse object with the appropriate PDF headers.
-    response = HttpResponse(content_type='application/pdf')
-
-    # Create the PDF object, using the response object as its "file."
-    doc = SimpleDocTemplate(response,
+    # Create the PDF object, using a buffer as its "file."
+    buffer = six.BytesIO()
+    doc = SimpleDocTemplate(buffer,
                             pagesize=A4,
                             title=_('Nutrition plan'),
                             author='wger Workout Manager',
-                            subject=_('Nutritional plan %s') % request.user.username)
+                            subject=_('Nutritional plan %s') % plan.user.username)
 
     # Background colour for header
     # Reportlab doesn't use the HTML hexadecimal format, but has a range of
@@ -388,7 +362,6 @@ def export_pdf(request, id, uidb64=None, token=None):
     # Footer, date and info
     elements.append(Spacer(10 * cm, 0.5 * cm))
     created = datetime.date.today().strftime("%d.%m.%Y")
-    url = reverse('nutrition:plan:view', kwargs={'id': plan.id})
     p = Paragraph('''<para align="left">
                         %(date)s -
                         <a href="%(url)s">%(url)s</a> -
@@ -398,11 +371,42 @@ def export_pdf(request, id, uidb64=None, token=None):
                   {'date': _("Created on the <b>%s</b>") % created,
                    'created': "wger Workout Manager",
                    'version': get_version(),
-                   'url': request.build_absolute_uri(url), },
+                   'url': url, },
                   styleSheet["Normal"])
     elements.append(p)
     doc.build(elements)
 
-    response['Content-Disposition'] = 'attachment; filename=nutritional-plan.pdf'
-    response['Content-Length'] = len(response.content)
-    return response
+    return buffer.getvalue()
+
+
+def export_pdf(request, id, uidb64=None, token=None):
+    '''
+    Generates a PDF with the contents of a nutrition plan
+    '''
+
+    # Load the plan
+    if uidb64 is not None and token is not None:
+        if check_token(uidb64, token):
+            plan = get_object_or_404(NutritionPlan, pk=id)
+        else:
+            return HttpResponseForbidden()
+    else:
+        if request.user.is_anonymous():
+            return HttpResponseForbidden()
+        plan = get_object_or_404(NutritionPlan, pk=id, user=request.user)
+
+    # Besides the plan itself, the output depends on the user's units and the
+    # body weight used for the "per kg" values
+    url = request.build_absolute_uri(reverse('nutrition:plan:view', kwargs={'id': plan.id}))
+    weight_entry = plan.get_closest_weight_entry()
+    key = get_pdf_cache_key('nutrition-plan',
+                            plan.pk,
+                            get_content_version('nutrition-plan', plan.pk),
+                            plan.user.userprofile.use_metric,
+                            weight_entry.weight if weight_entry else None,
+                            url)
+
+    return cached_pdf_response(request,
+                               key,
+                               'nutritional-plan.pdf',
+                               lambda: render_plan_pdf(plan, url))
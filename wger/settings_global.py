@@ -107,6 +107,13 @@ BOWER_INSTALLED_APPS = (
 
 
 MIDDLEWARE_CLASSES = (
+    # Request statistics (queries, timings, etc.), only active if enabled
+    # with WGER_SETTINGS['REQUEST_STATS']
+    'wger.utils.middleware.RequestStatsMiddleware',
+
+    # Sampling profiler, only active if enabled with WGER_SETTINGS['PROFILER']
+    'wger.utils.middleware.ProfilerMiddleware',
+
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -311,6 +318,9 @@ THUMBNAIL_ALIASES = {
 
         'large': {'size': (800, 800), 'quality': 90},
         'large_cropped': {'size': (800, 800), 'crop': 'smart', 'quality': 90},
+
+        # Used in the PDFs, where the images are at most 2cm wide
+        'pdf': {'size': (240, 240)},
     },
 }
 
@@ -394,5 +404,14 @@ WGER_SETTINGS = {
     'ALLOW_REGISTRATION': True,
     'ALLOW_GUEST_USERS': True,
     'EMAIL_FROM': 'wger Workout Manager <wger@example.com>',
-    'TWITTER': False
+    'TWITTER': False,
+    'BACKGROUND_JOBS': True,
+    'REQUEST_STATS': False,
+    'SLOW_REQUEST_TIME': 1000,
+    'SLOW_REQUEST_QUERIES': 100,
+    'PROFILER': False,
+    'PROFILER_SAMPLE_RATE': 100,
+    'PROFILER_DIR': '',
+    'PROFILER_MAX_FILES': 1000,
+    'CACHE_STATS': False,
 }
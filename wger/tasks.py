@@ -47,6 +47,38 @@ sys.path = sys.path[1:]
 
 logger = logging.getLogger(__name__)
 
+FIXTURE_STAGES = (
+    # Data without dependencies
+    ((('gym', 'gym.json'),),
+     (('core', 'languages.json'),
+      ('core', 'licenses.json'),
+      ('core', 'days_of_week.json'),
+      ('core', 'setting_repetition_units.json'),
+      ('core', 'setting_weight_units.json')),
+     (('core', 'groups.json'),),
+     (('exercises', 'equipment.json'),
+      ('exercises', 'muscles.json'),
+      ('exercises', 'categories.json'))),
+
+    # Data that only depends on the first stage
+    ((('core', 'users.json'),
+      ('gym', 'gym-config.json'),
+      ('gym', 'gym-adminconfig.json')),
+     (('config', 'language_config.json'),
+      ('config', 'gym_config.json')),
+     (('exercises', 'exercises.json'),),
+     (('nutrition', 'ingredients.json'),
+      ('nutrition', 'weight_units.json'),
+      ('nutrition', 'ingredient_units.json'))),
+)
+'''
+The fixtures loaded by load_fixtures, as (app, file name) tuples
+
+The stages are loaded one after the other. Each stage consists of groups of
+files that are loaded in order, the groups of a stage don't depend on each
+other and can be loaded at the same time.
+'''
+
 
 @task(help={'address': 'Address to bind to. Default: localhost',
             'port': 'Port to use. Default: 8000',
@@ -239,8 +271,13 @@ def migrate_db(context, settings_path=None):
 
 
 @task(help={'settings-path': 'Path to settings file (absolute path recommended). Leave empty for '
-                             'default'})
-def load_fixtures(context, settings_path=None):
+                             'default',
+            'fast': 'Insert the objects in bulk instead of saving them one by one. Existing '
+                    'entries are not updated, so this is meant for new databases. Default: '
+                    'false',
+            'processes': 'Number of fixture groups loaded at the same time with --fast (not '
+                         'on SQLite). Default: 1'})
+def load_fixtures(context, settings_path=None, fast=False, processes=1):
     '''
     Loads all fixtures
     '''
@@ -249,47 +286,33 @@ def load_fixtures(context, settings_path=None):
     setup_django_environment(settings_path)
 
     current_dir = os.path.dirname(os.path.abspath(__file__))
+    stages = [[[os.path.join(current_dir, app, 'fixtures', name) for app, name in group]
+               for group in stage]
+              for stage in FIXTURE_STAGES]
 
-    # Gym
-    path = os.path.join(current_dir, 'gym', 'fixtures/')
-    call_command("loaddata", path + "gym.json")
+    start = time.time()
+    if fast:
+        from wger.utils.fixtures import load_fixture_stages
+        report = load_fixture_stages(stages, processes=int(processes))
 
-    # Core
-    path = os.path.join(current_dir, 'core', 'fixtures/')
-    call_command("loaddata", path + "languages.json")
-    call_command("loaddata", path + "groups.json")
-    call_command("loaddata", path + "users.json")
-    call_command("loaddata", path + "licenses.json")
-    call_command("loaddata", path + "days_of_week.json")
-    call_command("loaddata", path + "setting_repetition_units.json")
-    call_command("loaddata", path + "setting_weight_units.json")
-
-    # Config
-    path = os.path.join(current_dir, 'config', 'fixtures/')
-    call_command("loaddata", path + "language_config.json")
-    call_command("loaddata", path + "gym_config.json")
-
-    # Manager
-    # path = os.path.join(current_dir, 'manager', 'fixtures/')
-
-    # Exercises
-    path = os.path.join(current_dir, 'exercises', 'fixtures/')
-    call_command("loaddata", path + "equipment.json")
-    call_command("loaddata", path + "muscles.json")
-    call_command("loaddata", path + "categories.json")
-    call_command("loaddata", path + "exercises.json")
-
-    # Nutrition
-    path = os.path.join(current_dir, 'nutrition', 'fixtures/')
-    call_command("loaddata", path + "ingredients.json")
-    call_command("loaddata", path + "weight_units.json")
-    call_command("loaddata", path + "ingredient_units.json")
-
-    # Gym
-    path = os.path.join(current_dir, 'gym', 'fixtures/')
-    call_command("loaddata", path + "gym.json")
-    call_command("loaddata", path + "gym-config.json")
-    call_command("loaddata", path + "gym-adminconfig.json")
+        # No cache was invalidated while inserting the objects
+        call_command("clear-cache", "--clear-template")
+    else:
+        report = []
+        for stage in stages:
+            for group in stage:
+                for path in group:
+                    path_start = time.time()
+                    call_command("loaddata", path)
+                    report.append((path, None, time.time() - path_start))
+
+    print('Loaded fixtures:')
+    for path, count, seconds in report:
+        count = count if count is not None else ''
+        print('* {0:<45} {1:>7} {2:>7.2f}s'.format(os.path.relpath(path, current_dir),
+                                                   count,
+                                                   seconds))
+    print('Total: {0:.2f}s'.format(time.time() - start))
 
 
 @task
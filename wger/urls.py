@@ -110,6 +110,8 @@ router.register(r'day', manager_api_views.DayViewSet, base_name='day')
 router.register(r'set', manager_api_views.SetViewSet, base_name='Set')
 router.register(r'setting', manager_api_views.SettingViewSet, base_name='Setting')
 router.register(r'workoutlog', manager_api_views.WorkoutLogViewSet, base_name='workoutlog')
+router.register(r'exerciseweekstats', manager_api_views.ExerciseWeekStatsViewSet, base_name='exerciseweekstats')
+router.register(r'personalrecord', manager_api_views.PersonalRecordViewSet, base_name='personalrecord')
 
 # Core app
 router.register(r'userprofile', core_api_views.UserProfileViewSet, base_name='userprofile')
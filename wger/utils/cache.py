@@ -13,16 +13,178 @@
 # You should have received a copy of the GNU Affero General Public License
 
 # Standard Library
+import collections
+import datetime
 import hashlib
 import logging
+import threading
+import time
+import uuid
+import zlib
 
 # Third Party
+from django.conf import settings
 from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.utils.encoding import force_bytes
+from six.moves import cPickle as pickle
 
 
 logger = logging.getLogger(__name__)
 
+CACHE_STATS_FIELDS = ('hits', 'misses', 'sets', 'invalidations', 'bytes')
+'''Counters kept for each key family'''
+
+CACHE_STATS_FLUSH_INTERVAL = 10
+'''Seconds after which the counters of a process are added to the cache'''
+
+COMPRESS_MIN_SIZE = 1024
+'''Packed values at least this big (in bytes) are compressed'''
+
+_cache_stats = collections.defaultdict(collections.Counter)
+_cache_stats_lock = threading.Lock()
+_cache_stats_flushed = [time.time()]
+
+
+def _record_cache_stats(key, field, amount=1):
+    '''
+    Counts a cache operation for the key's family
+
+    The counters are kept in memory and regularly added to the ones in the
+    cache, so that the numbers of all processes are collected.
+    '''
+    with _cache_stats_lock:
+        _cache_stats[cache_mapper.get_family(key)][field] += amount
+        flush = time.time() - _cache_stats_flushed[0] > CACHE_STATS_FLUSH_INTERVAL
+    if flush:
+        flush_cache_stats()
+
+
+def flush_cache_stats():
+    '''
+    Adds the counters of the current process to the ones in the cache
+    '''
+    with _cache_stats_lock:
+        stats = dict(_cache_stats)
+        _cache_stats.clear()
+        _cache_stats_flushed[0] = time.time()
+
+    for family, counter in stats.items():
+        for field, amount in counter.items():
+            key = cache_mapper.get_cache_stats_key(family, field)
+            if not cache.add(key, amount, None):
+                try:
+                    cache.incr(key, amount)
+                except ValueError:
+                    # The key was removed in the meantime
+                    cache.set(key, amount, None)
+
+
+def get_cache_stats():
+    '''
+    Returns the counters of all key families
+
+    :return: a dictionary with the family as key and a dictionary with the
+             counters (see CACHE_STATS_FIELDS) and the hit rate as value
+    '''
+    flush_cache_stats()
+    keys = {}
+    for family in cache_mapper.get_families():
+        for field in CACHE_STATS_FIELDS:
+            keys[cache_mapper.get_cache_stats_key(family, field)] = (family, field)
+    values = cache.get_many(list(keys.keys()))
+
+    stats = {}
+    for family in cache_mapper.get_families():
+        stats[family] = dict([(field, 0) for field in CACHE_STATS_FIELDS])
+    for key, value in values.items():
+        family, field = keys[key]
+        stats[family][field] = value
+
+    for family, counters in stats.items():
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = float(counters['hits']) / lookups if lookups else None
+    return stats
+
+
+def reset_cache_stats():
+    '''
+    Resets the counters of all key families
+    '''
+    with _cache_stats_lock:
+        _cache_stats.clear()
+    cache.delete_many([cache_mapper.get_cache_stats_key(family, field)
+                       for family in cache_mapper.get_families()
+                       for field in CACHE_STATS_FIELDS])
+
+
+def cache_get(key, default=None):
+    '''
+    Wrapper around cache.get that counts the hits and misses
+
+    Use this (and the other wrappers) for the keys of the CacheKeyMapper.
+    The counters are only kept if WGER_SETTINGS['CACHE_STATS'] is True.
+    '''
+    value = cache.get(key, default)
+    if settings.WGER_SETTINGS.get('CACHE_STATS', False):
+        _record_cache_stats(key, 'hits' if value is not default else 'misses')
+    return value
+
+
+def cache_set(key, value, timeout=DEFAULT_TIMEOUT):
+    '''
+    Wrapper around cache.set that counts the sets and the size of the values
+    '''
+    cache.set(key, value, timeout)
+    if settings.WGER_SETTINGS.get('CACHE_STATS', False):
+        _record_cache_stats(key, 'sets')
+        _record_cache_stats(key, 'bytes', len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+
+
+def cache_add(key, value, timeout=DEFAULT_TIMEOUT):
+    '''
+    Wrapper around cache.add, only counted if the value was actually set
+    '''
+    added = cache.add(key, value, timeout)
+    if added and settings.WGER_SETTINGS.get('CACHE_STATS', False):
+        _record_cache_stats(key, 'sets')
+        _record_cache_stats(key, 'bytes', len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+    return added
+
+
+def cache_delete(key):
+    '''
+    Wrapper around cache.delete that counts the invalidations
+    '''
+    cache.delete(key)
+    if settings.WGER_SETTINGS.get('CACHE_STATS', False):
+        _record_cache_stats(key, 'invalidations')
+
+
+def pack_cache_value(value):
+    '''
+    Pickles a value and, if it is big enough, compresses it
+
+    This is useful for big values made only of primitive types that are read
+    often, they need less memory in the cache and are faster to transfer.
+
+    :return: a tuple with a flag whether the data is compressed and the data
+    '''
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_MIN_SIZE:
+        return True, zlib.compress(data)
+    return False, data
+
+
+def unpack_cache_value(packed):
+    '''
+    Returns the value packed with pack_cache_value
+    '''
+    compressed, data = packed
+    if compressed:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
 
 def get_template_cache_name(fragment_name='', *args):
     '''
@@ -42,7 +204,34 @@ def delete_template_fragment_cache(fragment_name='', *args):
 
 
 def reset_workout_canonical_form(workout_id):
-    cache.delete(cache_mapper.get_workout_canonical(workout_id))
+    cache_delete(cache_mapper.get_workout_canonical(workout_id))
+    reset_content_version('workout', workout_id)
+
+
+def get_content_version(kind, pk):
+    '''
+    Returns the current content version of an object
+
+    The version is an opaque token that changes every time the object (or any
+    of its children) is changed. It can be used as part of other cache keys,
+    e.g. for rendered PDFs, so that these are automatically invalidated.
+
+    :param kind: the kind of object, e.g. 'workout' or 'schedule'
+    :param pk: the object's primary key
+    '''
+    key = cache_mapper.get_content_version_key(kind, pk)
+    version = cache_get(key)
+    if version is None:
+        cache_add(key, uuid.uuid4().hex)
+        version = cache.get(key)
+    return version
+
+
+def reset_content_version(kind, pk):
+    '''
+    Resets the content version of an object
+    '''
+    cache_delete(cache_mapper.get_content_version_key(kind, pk))
 
 
 def reset_workout_log(user_pk, year, month, day=None):
@@ -51,10 +240,17 @@ def reset_workout_log(user_pk, year, month, day=None):
     '''
 
     log_hash = hash((user_pk, year, month))
-    cache.delete(cache_mapper.get_workout_log_list(log_hash))
+    cache_delete(cache_mapper.get_workout_log_list(log_hash))
 
     log_hash = hash((user_pk, year, month, day))
-    cache.delete(cache_mapper.get_workout_log_list(log_hash))
+    cache_delete(cache_mapper.get_workout_log_list(log_hash))
+
+
+def reset_current_workout(user_pk):
+    '''
+    Resets the user's cached current workout and schedule
+    '''
+    cache_delete(cache_mapper.get_current_workout_key(user_pk, datetime.date.today()))
 
 
 class CacheKeyMapper(object):
@@ -65,10 +261,24 @@ class CacheKeyMapper(object):
     # Keys used by the cache
     LANGUAGE_CACHE_KEY = 'language-{0}'
     LANGUAGE_CONFIG_CACHE_KEY = 'language-config-{0}-{1}'
-    EXERCISE_CACHE_KEY_MUSCLE_BG = 'exercise-muscle-bg-{0}'
+    EXERCISE_MUSCLE_BITS = 'exercise-muscle-bits-{0}'
+    MUSCLE_SIDES = 'muscle-sides-{0}'
+    WORKOUT_MUSCLE_MAP = 'workout-muscle-bits-{0}'
+    MUSCLE_MAP_SVG = 'muscle-map-svg-{0}-{1:x}-{2:x}'
     INGREDIENT_CACHE_KEY = 'ingredient-{0}'
     WORKOUT_CANONICAL_REPRESENTATION = 'workout-canonical-representation-{0}'
     WORKOUT_LOG_LIST = 'workout-log-hash-{0}'
+    CONTENT_VERSION = 'content-version-{0}-{1}'
+    PDF_CACHE_KEY = 'pdf-{0}'
+    CURRENT_WORKOUT = 'current-workout-{0}-{1}'
+    ICAL_CACHE_KEY = 'ical-{0}'
+    NUTRITIONAL_VALUES = 'nutritional-values-{0}'
+    WEIGHT_CHART = 'weight-chart-{0}'
+    CACHE_STATS_KEY = 'cache-stats-{0}-{1}'
+
+    OTHER_FAMILY = 'other'
+
+    _families = None
 
     def get_pk(self, param):
         '''
@@ -81,11 +291,34 @@ class CacheKeyMapper(object):
 
         return pk
 
-    def get_exercise_muscle_bg_key(self, param):
+    def get_exercise_muscle_bits_key(self, param):
+        '''
+        Return the cache key of the muscle bitsets of an exercise
+        '''
+        return self.EXERCISE_MUSCLE_BITS.format(self.get_pk(param))
+
+    def get_muscle_sides_key(self):
         '''
-        Return the exercise muscle background cache key
+        Return the cache key of the side (front or back) of all muscles
         '''
-        return self.EXERCISE_CACHE_KEY_MUSCLE_BG.format(self.get_pk(param))
+        return self.MUSCLE_SIDES.format('all')
+
+    def get_workout_muscle_map_key(self, param, version):
+        '''
+        Return the cache key of the muscle bitsets of a workout
+
+        :param version: the content version of the workout
+        '''
+        return self.WORKOUT_MUSCLE_MAP.format(self.get_hash(self.get_pk(param), version))
+
+    def get_muscle_map_svg_key(self, side, main, secondary):
+        '''
+        Return the cache key of a rendered muscle map
+
+        :param main: the bitset of the main muscles
+        :param secondary: the bitset of the secondary muscles
+        '''
+        return self.MUSCLE_MAP_SVG.format(side, main, secondary)
 
     def get_language_key(self, param):
         '''
@@ -117,5 +350,83 @@ class CacheKeyMapper(object):
         '''
         return self.WORKOUT_LOG_LIST.format(hash_value)
 
+    def get_content_version_key(self, kind, param):
+        '''
+        Return the content version cache key
+        '''
+        return self.CONTENT_VERSION.format(kind, self.get_pk(param))
+
+    def get_pdf_key(self, hash_value):
+        '''
+        Return the rendered PDF cache key
+        '''
+        return self.PDF_CACHE_KEY.format(hash_value)
+
+    def get_current_workout_key(self, param, date):
+        '''
+        Return the cache key for the user's current workout on a date
+        '''
+        return self.CURRENT_WORKOUT.format(self.get_pk(param), date.isoformat())
+
+    def get_ical_key(self, hash_value):
+        '''
+        Return the generated iCal file cache key
+        '''
+        return self.ICAL_CACHE_KEY.format(hash_value)
+
+    def get_hash(self, *parts):
+        '''
+        Return a hash of all the parameters, for keys that depend on many values
+        '''
+        return hashlib.md5(force_bytes(u':'.join([str(i) for i in parts]))).hexdigest()
+
+    def get_nutritional_values_key(self, param, *versions):
+        '''
+        Return the nutritional values cache key of a nutrition plan
+
+        :param versions: everything else the values depend on, e.g. the
+                         content version of the plan
+        '''
+        return self.NUTRITIONAL_VALUES.format(self.get_hash(self.get_pk(param), *versions))
+
+    def get_weight_chart_key(self, param, *options):
+        '''
+        Return the cache key of the weight chart data of a user
+
+        :param options: everything else the data depends on, e.g. the date range
+        '''
+        return self.WEIGHT_CHART.format(self.get_hash(self.get_pk(param), *options))
+
+    def get_cache_stats_key(self, family, field):
+        '''
+        Return the cache key for a counter of the cache statistics
+        '''
+        return self.CACHE_STATS_KEY.format(family, field)
+
+    def get_families(self):
+        '''
+        Return the names of all the key families, e.g. 'language-config'
+
+        The name of a family is the constant part at the beginning of its key.
+        '''
+        if self._families is None:
+            families = [getattr(self, name).split('{')[0].rstrip('-')
+                        for name in dir(self)
+                        if name.isupper() and name != 'OTHER_FAMILY']
+            self._families = sorted(families) + [self.OTHER_FAMILY]
+        return self._families
+
+    def get_family(self, key):
+        '''
+        Return the family of a cache key
+
+        Since some families are prefixes of others (e.g. 'language' and
+        'language-config') the longest matching one is returned.
+        '''
+        for family in sorted(self.get_families(), key=len, reverse=True):
+            if key.startswith(family + '-'):
+                return family
+        return self.OTHER_FAMILY
+
 
 cache_mapper = CacheKeyMapper()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+'''
+Deep copies of model instances with all their children
+
+A CloneTree loads an object (e.g. a workout) and all the objects below it
+(days, sets, etc.) with one query per level. The loaded tree can then be copied
+any number of times, e.g. once for every member of a gym, with one insert per
+level and many-to-many relationship, independently of the number of copies.
+
+Since bulk_create doesn't call save() and doesn't send any signals, the caller
+is responsible for resetting any caches that depend on the new objects.
+'''
+
+# Third Party
+from django.db import (
+    connections,
+    router,
+    transaction
+)
+
+
+def copy_instance(instance, **values):
+    '''
+    Returns an unsaved copy of a model instance
+
+    Only the concrete fields are copied, the primary key is left empty.
+
+    :param instance: the model instance to copy
+    :param values: attributes to set on the copy, e.g. user_id=2
+    '''
+    model = type(instance)
+    data = {field.attname: getattr(instance, field.attname)
+            for field in model._meta.concrete_fields
+            if not field.primary_key}
+    data.update(values)
+    return model(**data)
+
+
+def bulk_create_children(model, objects, parent_attname):
+    '''
+    Inserts new objects and makes sure they have their primary key set
+
+    Databases that can't return the IDs of bulk inserted rows (sqlite, MySQL)
+    need one more query: all children of the (new) parents were just inserted,
+    in order, so their IDs are loaded again and assigned in ascending order.
+
+    :param model: the model class
+    :param objects: the unsaved instances
+    :param parent_attname: the attname of the foreign key to the parent, e.g.
+                           'training_id'. The parents must be new objects.
+    '''
+    model.objects.bulk_create(objects)
+
+    if objects and objects[0].pk is None:
+        parent_pks = set(getattr(obj, parent_attname) for obj in objects)
+        pks = model.objects.filter(**{parent_attname + '__in': parent_pks})\
+            .order_by('pk')\
+            .values_list('pk', flat=True)
+        for obj, pk in zip(objects, pks):
+            obj.pk = pk
+
+
+class CloneTree(object):
+    '''
+    An object with all its children, loaded to be copied
+
+    The children are added level by level, every level must point to the root
+    object or to an already added level, e.g.::
+
+        tree = CloneTree(workout)
+        tree.add_children(Day, 'training')
+        tree.add_m2m(Day, 'day')
+        tree.add_children(Set, 'exerciseday')
+        copies = tree.copy([{'user_id': 1}, {'user_id': 2}])
+    '''
+
+    def __init__(self, root):
+        self.root = root
+        self.objects = {type(root): [root]}
+        self.levels = []
+        self.m2m = []
+
+    def add_children(self, model, parent_field):
+        '''
+        Loads the children of an already loaded level (one query)
+
+        :param model: the model of the children
+        :param parent_field: the name of the foreign key to the parent level
+        :return: the list of loaded children
+        '''
+        field = model._meta.get_field(parent_field)
+        parents = self.objects[field.related_model]
+        children = list(model.objects.filter(**{field.attname + '__in': [i.pk for i in parents]})
+                        .order_by('pk'))
+
+        self.objects[model] = children
+        self.levels.append((model, field))
+        return children
+
+    def add_m2m(self, model, field_name):
+        '''
+        Loads the rows of a many-to-many relationship of a level (one query)
+
+        The rows of the intermediate table are copied as they are, so extra
+        columns such as the sort value of a sorted relationship are kept.
+
+        :param model: the model of an already loaded level
+        :param field_name: the name of the many-to-many field
+        '''
+        field = model._meta.get_field(field_name)
+        through = field.remote_field.through
+        source_field = through._meta.get_field(field.m2m_field_name())
+        pks = [i.pk for i in self.objects[model]]
+        rows = list(through.objects.filter(**{source_field.attname + '__in': pks}).order_by('pk'))
+
+        self.m2m.append((model, through, source_field, rows))
+
+    def copy(self, values_list):
+        '''
+        Copies the whole tree once for every entry in values_list
+
+        All copies are inserted in one transaction.
+
+        :param values_list: a list of dictionaries with the attributes to set
+                            on the copies of the root object, e.g.
+                            [{'user_id': 1}, {'user_id': 2}]
+        :return: a list with the copies of the root object, in the same order
+        '''
+        root_model = type(self.root)
+        connection = connections[router.db_for_write(root_model)]
+
+        with transaction.atomic(using=connection.alias):
+            roots = [copy_instance(self.root, **values) for values in values_list]
+            if connection.features.can_return_ids_from_bulk_insert:
+                root_model.objects.bulk_create(roots)
+            else:
+                for root in roots:
+                    root.save()
+
+            # Maps the primary key of every loaded object to the primary keys
+            # of its copies, in the same order as values_list
+            new_pks = {root_model: {self.root.pk: [i.pk for i in roots]}}
+
+            for model, field in self.levels:
+                children = self.objects[model]
+                parent_pks = new_pks[field.related_model]
+                copies = []
+                for index in range(len(roots)):
+                    for child in children:
+                        parent_pk = parent_pks[getattr(child, field.attname)][index]
+                        copies.append(copy_instance(child, **{field.attname: parent_pk}))
+                bulk_create_children(model, copies, field.attname)
+
+                new_pks[model] = {child.pk: [] for child in children}
+                for position, copy in enumerate(copies):
+                    new_pks[model][children[position % len(children)].pk].append(copy.pk)
+
+            for model, through, source_field, rows in self.m2m:
+                copies = []
+                for index in range(len(roots)):
+                    for row in rows:
+                        source_pk = new_pks[model][getattr(row, source_field.attname)][index]
+                        copies.append(copy_instance(row, **{source_field.attname: source_pk}))
+                through.objects.bulk_create(copies)
+
+        return roots
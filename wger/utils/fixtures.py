@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import io
+import json
+import logging
+import multiprocessing
+import time
+
+# Third Party
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import (
+    connection,
+    connections,
+    transaction
+)
+
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_BATCH_SIZE = 500
+'''
+Number of objects inserted with one query
+'''
+
+FIXTURE_CHUNK_SIZE = 64 * 1024
+'''
+Number of characters read from the fixture files at once
+'''
+
+
+def iter_fixture_objects(path, chunk_size=FIXTURE_CHUNK_SIZE):
+    '''
+    Reads the objects of a JSON fixture file one by one
+
+    Only the current object and one chunk of the file are kept in memory,
+    not the whole list.
+
+    :param path: path to a fixture as written by dumpdata (a JSON list)
+    :param chunk_size: number of characters read at once
+    '''
+    decoder = json.JSONDecoder()
+    with io.open(path, encoding='utf-8') as fixture:
+        buffer = ''
+        pos = 0
+        started = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+
+            try:
+                if pos == len(buffer):
+                    raise ValueError('End of buffer')
+                if not started:
+                    if buffer[pos] != '[':
+                        raise TypeError('{0} is not a list of objects'.format(path))
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == ']':
+                    return
+                obj, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # The object is incomplete, read the next part of the file
+                chunk = fixture.read(chunk_size)
+                if not chunk:
+                    raise ValueError('{0} is not a valid fixture'.format(path))
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield obj
+
+
+def _insert_batch(model, objects, batch_size):
+    '''
+    Inserts the deserialized objects of one model and their many to many data
+
+    Objects whose primary key already exists are skipped.
+
+    :return: the number of inserted objects
+    '''
+    with_pk = [i for i in objects if i.object.pk is not None]
+    existing = set()
+    if with_pk:
+        existing = set(model._default_manager.filter(pk__in=[i.object.pk for i in with_pk])
+                                             .values_list('pk', flat=True))
+    new = [i for i in with_pk if i.object.pk not in existing]
+    model._default_manager.bulk_create([i.object for i in new], batch_size=batch_size)
+
+    # Through rows of the many to many relationships, only possible because
+    # the primary keys are known
+    through_rows = {}
+    for deserialized in new:
+        for name, values in (deserialized.m2m_data or {}).items():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+            through_rows.setdefault(through, []).extend(
+                through(**{source: deserialized.object.pk, target: value}) for value in values)
+    for through, rows in through_rows.items():
+        through._default_manager.bulk_create(rows, batch_size=batch_size)
+
+    # Objects without primary key are saved like loaddata does
+    for deserialized in objects:
+        if deserialized.object.pk is None:
+            deserialized.save()
+
+    return len(new) + len([i for i in objects if i.object.pk is None])
+
+
+def load_fixture(path, batch_size=FIXTURE_BATCH_SIZE):
+    '''
+    Loads a JSON fixture file with bulk inserts
+
+    In contrast to loaddata, the objects are not saved one by one, so no
+    signals are sent and no caches are invalidated. Objects that already
+    exist are not updated. The objects are inserted in file order, one batch
+    per model.
+
+    :param path: path to the fixture file
+    :param batch_size: number of objects inserted with one query
+    :return: the number of inserted objects
+    '''
+    count = 0
+    models = set()
+    model = None
+    batch = []
+    with transaction.atomic(), connection.constraint_checks_disabled():
+        for deserialized in serializers.deserialize('python',
+                                                    iter_fixture_objects(path),
+                                                    ignorenonexistent=True):
+            if batch and (deserialized.object.__class__ != model or len(batch) >= batch_size):
+                count += _insert_batch(model, batch, batch_size)
+                batch = []
+            model = deserialized.object.__class__
+            models.add(model)
+            batch.append(deserialized)
+        if batch:
+            count += _insert_batch(model, batch, batch_size)
+
+        connection.check_constraints(table_names=[i._meta.db_table for i in models])
+
+        # The primary keys were set explicitly, update the sequences
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), models)
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for sql in sequence_sql:
+                    cursor.execute(sql)
+    return count
+
+
+def load_fixture_group(paths, batch_size=FIXTURE_BATCH_SIZE):
+    '''
+    Loads several fixture files in order, in one transaction
+
+    :return: a list of (path, number of objects, seconds) tuples
+    '''
+    report = []
+    with transaction.atomic():
+        for path in paths:
+            start = time.time()
+            count = load_fixture(path, batch_size)
+            report.append((path, count, time.time() - start))
+            logger.debug('Loaded {0} objects from {1}'.format(count, path))
+    return report
+
+
+def load_fixture_stages(stages, processes=1, batch_size=FIXTURE_BATCH_SIZE):
+    '''
+    Loads groups of fixture files, several groups of a stage at the same time
+
+    The stages are loaded one after the other, the groups within a stage
+    must not depend on each other. With one process everything is loaded in
+    one transaction, otherwise each group uses its own. SQLite doesn't
+    support concurrent writes, there only one process is used.
+
+    :param stages: list of stages, each one a list of groups of file paths
+    :param processes: maximum number of groups loaded at the same time
+    :param batch_size: number of objects inserted with one query
+    :return: a list of (path, number of objects, seconds) tuples
+    '''
+    if connection.vendor == 'sqlite':
+        processes = 1
+
+    report = []
+    if processes <= 1:
+        with transaction.atomic():
+            for stage in stages:
+                for group in stage:
+                    report.extend(load_fixture_group(group, batch_size))
+        return report
+
+    for stage in stages:
+        # The child processes can't share the database connections
+        connections.close_all()
+        pool = multiprocessing.Pool(min(processes, len(stage)))
+        try:
+            for group_report in pool.imap(_load_fixture_group_worker,
+                                          [(group, batch_size) for group in stage]):
+                report.extend(group_report)
+        finally:
+            pool.close()
+            pool.join()
+    return report
+
+
+def _load_fixture_group_worker(args):
+    '''
+    Loads a fixture group in a child process
+    '''
+    paths, batch_size = args
+    try:
+        return load_fixture_group(paths, batch_size)
+    finally:
+        connections.close_all()
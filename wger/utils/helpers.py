@@ -22,14 +22,19 @@ import logging
 import os
 import random
 import string
+import uuid
+from collections import defaultdict
 from functools import wraps
 
 # Third Party
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
+from django.core import signing
 from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.crypto import constant_time_compare
 from django.utils.encoding import force_bytes
+from django.utils.functional import SimpleLazyObject
 from django.utils.http import (
     urlsafe_base64_decode,
     urlsafe_base64_encode
@@ -129,26 +134,95 @@ def make_token(user):
     return uid, token
 
 
-def check_token(uidb64, token):
+def get_token_user(uidb64, token):
     '''
-    Checks that the user token is correct.
+    Returns the user of a UID and token generated with make_token
 
-    :param uidb:
-    :param token:
-    :return: True on success, False in all other situations
+    :return: the user or None if the token is not correct
     '''
     if uidb64 is not None and token is not None:
         try:
             uid = int(urlsafe_base64_decode(uidb64))
         except ValueError as e:
             logger.info("Could not decode UID: {0}".format(e))
-            return False
-        user = User.objects.get(pk=uid)
+            return None
+        user = User.objects.filter(pk=uid).first()
 
         if user is not None and default_token_generator.check_token(user, token):
-            return True
+            return user
+
+    return None
+
+
+def check_token(uidb64, token):
+    '''
+    Checks that the user token is correct.
+
+    :param uidb:
+    :param token:
+    :return: True on success, False in all other situations
+    '''
+    return get_token_user(uidb64, token) is not None
+
+
+FEED_TOKEN_SALT = 'wger.utils.helpers.feed_token'
+
+
+def _get_feed_signature(user, kind, pk):
+    '''
+    Returns the signature of a calendar feed, see make_feed_token
+    '''
+    profile = user.userprofile
+    if not profile.feed_secret:
+        profile.feed_secret = uuid.uuid4().hex
+        profile.save(update_fields=['feed_secret'])
+
+    signer = signing.Signer(salt='{0}:{1}'.format(FEED_TOKEN_SALT, profile.feed_secret))
+    return signer.signature('{0}:{1}:{2}'.format(user.pk, kind, pk))
 
-    return False
+
+def make_feed_token(user, kind, pk):
+    '''
+    Generates the UID and token for the calendar feed of an object
+
+    In contrast to make_token, the token doesn't expire, since the URL is
+    polled by calendar applications. It is only valid for this object and
+    can be revoked by resetting the user's feed secret, see reset_feed_secret.
+
+    :param user: the owner of the object
+    :param kind: the kind of object, e.g. 'workout' or 'schedule'
+    :param pk: the primary key of the object
+    :return: the uid and the token
+    '''
+    return make_uid(user.pk), _get_feed_signature(user, kind, pk)
+
+
+def check_feed_token(uidb64, token, kind, pk):
+    '''
+    Checks a token generated with make_feed_token
+
+    :return: the user or None if the token is not correct
+    '''
+    try:
+        uid = int(urlsafe_base64_decode(uidb64))
+    except ValueError as e:
+        logger.info("Could not decode UID: {0}".format(e))
+        return None
+    user = User.objects.filter(pk=uid).first()
+
+    if user is not None and constant_time_compare(_get_feed_signature(user, kind, pk), token):
+        return user
+    return None
+
+
+def reset_feed_secret(user):
+    '''
+    Generates a new feed secret for the user, so that all existing calendar
+    feed links stop working
+    '''
+    profile = user.userprofile
+    profile.feed_secret = uuid.uuid4().hex
+    profile.save(update_fields=['feed_secret'])
 
 
 def password_generator(length=15):
@@ -235,3 +309,53 @@ def smart_capitalize(input):
         else:
             out.append(word)
     return ' '.join(out)
+
+
+class LazyInstanceLoader(object):
+    '''
+    Returns placeholders for model instances that are only loaded when used
+
+    The first time one of the placeholders of a model is used, all the pending
+    instances of that model are loaded with one query. This is e.g. used to
+    rebuild the canonical form of a workout from the IDs saved in the cache.
+    '''
+
+    def __init__(self):
+        self.pending = defaultdict(set)
+        self.loaded = defaultdict(dict)
+        self.placeholders = {}
+        self.callbacks = {}
+
+    def get(self, model, pk, callback=None):
+        '''
+        Returns a placeholder for the instance of the model with the given PK
+
+        :param model: the model class
+        :param pk: the primary key
+        :param callback: optional callable that is called with every instance
+                         of the model after it was loaded
+        '''
+        if callback is not None:
+            self.callbacks[model] = callback
+        if (model, pk) not in self.placeholders:
+            self.pending[model].add(pk)
+            self.placeholders[(model, pk)] = SimpleLazyObject(lambda: self.load(model, pk))
+        return self.placeholders[(model, pk)]
+
+    def load(self, model, pk):
+        '''
+        Loads the instance, together with all other pending ones of the model
+        '''
+        if pk not in self.loaded[model]:
+            instances = model.objects.in_bulk(self.pending[model])
+            self.pending[model].clear()
+            callback = self.callbacks.get(model)
+            for instance in instances.values():
+                if callback is not None:
+                    callback(instance)
+            self.loaded[model].update(instances)
+
+        try:
+            return self.loaded[model][pk]
+        except KeyError:
+            raise model.DoesNotExist('{0} with ID {1} does not exist'.format(model.__name__, pk))
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+'''
+Simple background job queue
+
+Jobs are regular python callables that are executed by a small pool of daemon
+worker threads in the current process. This is not meant to replace a "real"
+task queue, it only moves expensive work (rendering PDFs, etc.) out of the
+request/response cycle.
+
+If WGER_SETTINGS['BACKGROUND_JOBS'] is False the jobs are executed right
+away, in the calling thread. This is e.g. done in the tests. In both cases
+errors in a job are logged and not propagated to the caller.
+'''
+
+# Standard Library
+import logging
+import threading
+
+# Third Party
+from django.conf import settings
+from django.db import close_old_connections
+from six.moves import queue
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_COUNT = 2
+'''Number of worker threads'''
+
+_job_queue = queue.Queue()
+_workers = []
+_pending_keys = set()
+_lock = threading.Lock()
+
+
+def _run(func, args, kwargs):
+    '''
+    Runs a single job
+    '''
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Error while processing background job {0}'.format(func))
+
+
+def _work():
+    '''
+    Worker loop, processes the jobs in the queue
+    '''
+    while True:
+        key, func, args, kwargs = _job_queue.get()
+        try:
+            _run(func, args, kwargs)
+        finally:
+            with _lock:
+                _pending_keys.discard(key)
+            close_old_connections()
+            _job_queue.task_done()
+
+
+def _start_workers():
+    '''
+    Starts the worker threads, if they are not already running
+    '''
+    with _lock:
+        if _workers:
+            return
+        for i in range(WORKER_COUNT):
+            worker = threading.Thread(target=_work, name='wger-job-{0}'.format(i))
+            worker.daemon = True
+            worker.start()
+            _workers.append(worker)
+
+
+def enqueue(func, args=(), kwargs=None, key=None):
+    '''
+    Schedules a job to be run in the background
+
+    :param func: the callable to run
+    :param args: positional arguments for the callable
+    :param kwargs: keyword arguments for the callable
+    :param key: optional unique key for the job. If a job with the same key
+                is already waiting in the queue, the new one is discarded.
+    :return: True if the job was scheduled (or run), False if it was discarded
+    '''
+    kwargs = kwargs or {}
+
+    if not settings.WGER_SETTINGS.get('BACKGROUND_JOBS', False):
+        _run(func, args, kwargs)
+        return True
+
+    if key is not None:
+        with _lock:
+            if key in _pending_keys:
+                return False
+            _pending_keys.add(key)
+
+    _start_workers()
+    _job_queue.put((key, func, args, kwargs))
+    return True
+
+
+def wait_for_jobs():
+    '''
+    Blocks until all the jobs currently in the queue are processed
+    '''
+    _job_queue.join()
@@ -16,14 +16,17 @@
 import logging
 
 # Third Party
-from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import translation
 
 # wger
 from wger.config.models import LanguageConfig
 from wger.core.models import Language
-from wger.utils.cache import cache_mapper
+from wger.utils.cache import (
+    cache_get,
+    cache_mapper,
+    cache_set
+)
 
 
 logger = logging.getLogger(__name__)
@@ -47,7 +50,7 @@ def load_language(language_code=None):
     else:
         used_language = language_code
 
-    language = cache.get(cache_mapper.get_language_key(used_language))
+    language = cache_get(cache_mapper.get_language_key(used_language))
     if language:
         return language
 
@@ -57,7 +60,7 @@ def load_language(language_code=None):
         # No luck, load english as our fall-back language
         language = Language.objects.get(short_name="en")
 
-    cache.set(cache_mapper.get_language_key(language), language)
+    cache_set(cache_mapper.get_language_key(language), language)
     return language
 
 
@@ -67,7 +70,7 @@ def load_item_languages(item, language_code=None):
     '''
 
     language = load_language(language_code)
-    languages = cache.get(cache_mapper.get_language_config_key(language, item))
+    languages = cache_get(cache_mapper.get_language_config_key(language, item))
 
     # Load the configurations we are interested in and return the languages
     if not languages:
@@ -81,7 +84,7 @@ def load_item_languages(item, language_code=None):
         for i in config:
             languages.append(i.language_target)
 
-        cache.set(cache_mapper.get_language_config_key(language, item), languages)
+        cache_set(cache_mapper.get_language_config_key(language, item), languages)
 
     return languages
 
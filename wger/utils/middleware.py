@@ -17,16 +17,31 @@ Custom middleware
 '''
 
 # Standard Library
+import collections
+import cProfile
+import json
 import logging
+import random
+import re
+import threading
+import time
 
 # Third Party
 from django.conf import settings
 from django.contrib import auth
 from django.contrib.auth import login as django_login
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.utils.functional import SimpleLazyObject
 
 # wger
 from wger.core.demo import create_temporary_user
+from wger.utils.profiler import (
+    PROFILE_HEADER,
+    check_profile_token,
+    save_profile
+)
 
 
 logger = logging.getLogger(__name__)
@@ -122,3 +137,181 @@ class JavascriptAJAXRedirectionMiddleware(object):
             response['X-wger-redirect'] = request.path
             response.content = request.path
         return response
+
+
+_cache_stats = threading.local()
+
+SQL_FINGERPRINT_PATTERNS = ((re.compile(r"'(?:[^']|'')*'"), '?'),
+                            (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+                            (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'))
+'''Regular expressions used to remove the values from SQL queries'''
+
+
+def get_sql_fingerprint(sql):
+    '''
+    Returns an SQL query with all its values removed
+
+    Queries that only differ in their values (e.g. the IDs) have the same
+    fingerprint, so that repeated queries (N+1 patterns) can be found.
+    '''
+    for pattern, replacement in SQL_FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def _count_cache_get(get):
+    '''
+    Wraps a cache backend's get method to count the hits and misses
+    '''
+    def wrapper(key, default=None, version=None):
+        value = get(key, default=default, version=version)
+        stats = getattr(_cache_stats, 'current', None)
+        if stats is not None:
+            stats['hits' if value is not default else 'misses'] += 1
+        return value
+    return wrapper
+
+
+class RequestStatsMiddleware(object):
+    '''
+    Middleware that records some statistics for each request
+
+    The number of database queries, the time spent in them, the cache hits and
+    misses as well as the time spent in the view are sent in the Server-Timing
+    header. Slow requests are also logged, together with the queries that were
+    repeated the most.
+
+    This is only active if WGER_SETTINGS['REQUEST_STATS'] is True, otherwise
+    the middleware removes itself and has no overhead at all.
+    '''
+
+    def __init__(self):
+        if not settings.WGER_SETTINGS.get('REQUEST_STATS', False):
+            raise MiddlewareNotUsed
+
+    def process_request(self, request):
+
+        # Django only records the queries in debug mode, force it for now
+        request._stats_queries = []
+        for connection in connections.all():
+            request._stats_queries.append((connection,
+                                           connection.force_debug_cursor,
+                                           len(connection.queries_log)))
+            connection.force_debug_cursor = True
+
+        # The cache backends are created per thread, so are their get methods
+        backend = caches['default']
+        if not getattr(backend, '_wger_stats', False):
+            backend.get = _count_cache_get(backend.get)
+            backend._wger_stats = True
+
+        _cache_stats.current = collections.Counter()
+        request._stats_start = time.time()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._stats_view_start = time.time()
+
+    def process_response(self, request, response):
+        if not hasattr(request, '_stats_start'):
+            return response
+
+        end = time.time()
+        stats = self.get_stats(request, end)
+
+        response['Server-Timing'] = ', '.join([
+            'db;dur={0:.1f};desc="{1} queries"'.format(stats['sql_ms'], stats['queries']),
+            'cache;desc="{0} hits, {1} misses"'.format(stats['cache_hits'],
+                                                       stats['cache_misses']),
+            'view;dur={0:.1f}'.format(stats['view_ms']),
+            'total;dur={0:.1f}'.format(stats['total_ms'])])
+
+        if stats['total_ms'] >= settings.WGER_SETTINGS['SLOW_REQUEST_TIME'] \
+                or stats['queries'] >= settings.WGER_SETTINGS['SLOW_REQUEST_QUERIES']:
+            stats.update({'method': request.method,
+                          'path': request.path,
+                          'status': response.status_code})
+            logger.warning('Slow request: {0}'.format(json.dumps(stats, sort_keys=True)))
+
+        return response
+
+    @staticmethod
+    def get_stats(request, end):
+        '''
+        Collects the statistics of a request and resets the query logging
+
+        :return: dictionary with the statistics
+        '''
+        queries = []
+        for connection, force_debug_cursor, start in request._stats_queries:
+            queries += list(connection.queries_log)[start:]
+            connection.force_debug_cursor = force_debug_cursor
+
+        fingerprints = collections.defaultdict(lambda: [0, 0.0])
+        for query in queries:
+            fingerprint = fingerprints[get_sql_fingerprint(query['sql'])]
+            fingerprint[0] += 1
+            fingerprint[1] += float(query['time']) * 1000
+        repeated = sorted([(count, duration, sql)
+                           for sql, (count, duration) in fingerprints.items() if count > 1],
+                          reverse=True)
+
+        cache_stats = getattr(_cache_stats, 'current', None) or collections.Counter()
+        _cache_stats.current = None
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_start = getattr(request, '_stats_view_start', end)
+        return {'url_name': resolver_match.view_name if resolver_match else None,
+                'total_ms': (end - request._stats_start) * 1000,
+                'view_ms': (end - view_start) * 1000,
+                'queries': len(queries),
+                'sql_ms': sum([duration for count, duration in fingerprints.values()]),
+                'cache_hits': cache_stats['hits'],
+                'cache_misses': cache_stats['misses'],
+                'repeated_queries': [{'sql': sql, 'count': count, 'time_ms': duration}
+                                     for count, duration, sql in repeated[:5]]}
+
+
+class ProfilerMiddleware(object):
+    '''
+    Middleware that profiles a sample of the requests
+
+    One in WGER_SETTINGS['PROFILER_SAMPLE_RATE'] requests is profiled, as well
+    as the requests that send the X-Wger-Profile header with a token of a staff
+    user (see the profile-report command). The profiles are saved to the
+    directory in WGER_SETTINGS['PROFILER_DIR'].
+
+    This is only active if WGER_SETTINGS['PROFILER'] is True.
+    '''
+
+    def __init__(self):
+        if not settings.WGER_SETTINGS.get('PROFILER', False):
+            raise MiddlewareNotUsed
+
+    def should_profile(self, request):
+        '''
+        Decides whether the request is profiled
+        '''
+        rate = settings.WGER_SETTINGS['PROFILER_SAMPLE_RATE']
+        if rate and random.random() * rate < 1:
+            return True
+
+        token = request.META.get(PROFILE_HEADER)
+        return bool(token) and check_profile_token(token)
+
+    def process_request(self, request):
+        if self.should_profile(request):
+            request._profiler = cProfile.Profile()
+            request._profiler.enable()
+
+    def process_response(self, request, response):
+        profiler = getattr(request, '_profiler', None)
+        if profiler is None:
+            return response
+
+        profiler.disable()
+        resolver_match = getattr(request, 'resolver_match', None)
+        try:
+            save_profile(profiler, resolver_match.view_name if resolver_match else None)
+        except (IOError, OSError) as e:
+            logger.warning('Could not save the profile: {0}'.format(e))
+        return response
@@ -13,24 +13,49 @@
 # You should have received a copy of the GNU Affero General Public License
 
 # Standard Library
+import collections
 import datetime
+import hashlib
+import logging
+import threading
 from os.path import join as path_join
 
 # Third Party
+import six
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.http import (
+    HttpResponse,
+    HttpResponseNotModified
+)
 from django.utils import translation
+from django.utils.encoding import force_bytes
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import get_thumbnailer
 from reportlab.lib.styles import (
     ParagraphStyle,
     StyleSheet1
 )
+from reportlab.lib.utils import ImageReader
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import Paragraph
+from reportlab.platypus import (
+    Flowable,
+    Paragraph
+)
 
 # wger
 from wger import get_version
 from wger.core.models import Language
+from wger.utils.cache import (
+    cache_get,
+    cache_mapper,
+    cache_set
+)
+from wger.utils.jobs import enqueue
+
+
+logger = logging.getLogger(__name__)
 
 
 # ************************
@@ -103,6 +128,154 @@ def render_footer(url, date=None):
     return p
 
 
+# ************************
+# Rendered PDF cache
+# ************************
+
+
+def get_pdf_cache_key(*args):
+    '''
+    Returns the cache key for a rendered PDF
+
+    The arguments should identify the PDF completely: the object, the rendering
+    options and the object's content version (see get_content_version). The
+    current language and date are added automatically, since they also change
+    the output.
+    '''
+    parts = [str(arg) for arg in args]
+    parts.append(translation.get_language())
+    parts.append(datetime.date.today().isoformat())
+    key_hash = hashlib.md5(force_bytes(u':'.join(parts))).hexdigest()
+    return cache_mapper.get_pdf_key(key_hash)
+
+
+def render_cached_pdf(key, render):
+    '''
+    Renders a PDF and saves it to the cache, unless it's already there
+
+    :param key: the cache key, see get_pdf_cache_key
+    :param render: callable that returns the PDF's content as bytes
+    :return: the PDF's content
+    '''
+    content = cache_get(key)
+    if content is None:
+        content = render()
+        cache_set(key, content)
+    return content
+
+
+def _render_cached_pdf_in_language(key, render, language):
+    '''
+    Helper for the background jobs, which don't have an active language
+    '''
+    with translation.override(language):
+        render_cached_pdf(key, render)
+
+
+def cached_pdf_response(request, key, filename, render, variants=()):
+    '''
+    Returns a response with a rendered PDF, using the cache if possible
+
+    If the PDF had to be rendered, the other variants of the document (e.g. with
+    or without images) are very probably stale as well and are rendered in the
+    background, so that they are ready when they are downloaded.
+
+    :param request: the current request
+    :param key: the cache key, see get_pdf_cache_key
+    :param filename: the filename to use in the Content-Disposition header
+    :param render: callable that returns the PDF's content as bytes
+    :param variants: list of (key, render) tuples of the document's variants
+    '''
+    etag = '"{0}"'.format(key)
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    content = cache_get(key)
+    if content is None:
+        content = render()
+        cache_set(key, content)
+
+        language = translation.get_language()
+        for variant_key, variant_render in variants:
+            if variant_key != key:
+                enqueue(_render_cached_pdf_in_language,
+                        args=(variant_key, variant_render, language),
+                        key=variant_key)
+
+    response = HttpResponse(content, content_type='application/pdf')
+    response['Content-Disposition'] = 'attachment; filename={0}'.format(filename)
+    response['Content-Length'] = len(content)
+    response['ETag'] = etag
+    return response
+
+
+# ************************
+# Images
+# ************************
+
+PDF_IMAGE_CACHE_SIZE = 200
+'''Maximum number of decoded images kept in memory by each process'''
+
+_pdf_image_cache = collections.OrderedDict()
+_pdf_image_cache_lock = threading.Lock()
+
+
+def get_pdf_image(image):
+    '''
+    Returns the decoded 'pdf' thumbnail for an image
+
+    The images are kept in a (per process) LRU cache, so that they are
+    decoded only once and not for every document. Since the name of an image
+    changes when a new file is uploaded, it can be used as the key.
+
+    :param image: an image field, e.g. ExerciseImage.image
+    :return: a reportlab ImageReader or None if the thumbnail is not available
+    '''
+    with _pdf_image_cache_lock:
+        reader = _pdf_image_cache.pop(image.name, None)
+        if reader is not None:
+            _pdf_image_cache[image.name] = reader
+            return reader
+
+    try:
+        thumbnail = get_thumbnailer(image).get_thumbnail(aliases.get('pdf'))
+        reader = ImageReader(six.BytesIO(thumbnail.read()))
+    except Exception as e:
+        logger.warning('Could not load the PDF thumbnail for {0}: {1}'.format(image.name, e))
+        return None
+
+    with _pdf_image_cache_lock:
+        _pdf_image_cache[image.name] = reader
+        while len(_pdf_image_cache) > PDF_IMAGE_CACHE_SIZE:
+            _pdf_image_cache.popitem(last=False)
+    return reader
+
+
+class PdfImage(Flowable):
+    '''
+    Flowable that draws an already decoded image with a fixed width
+
+    Unlike reportlab's own Image flowable, this one does not load the image
+    again for every document.
+    '''
+
+    def __init__(self, reader, width):
+        Flowable.__init__(self)
+        self.hAlign = 'CENTER'
+        self.reader = reader
+        image_width, image_height = reader.getSize()
+        self.drawWidth = width
+        self.drawHeight = width * image_height / image_width
+
+    def wrap(self, available_width, available_height):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.drawWidth, self.drawHeight, mask='auto')
+
+
 # register new truetype fonts for reportlab
 pdfmetrics.registerFont(TTFont(
     'OpenSans', path_join(settings.SITE_ROOT, 'core/static/fonts/OpenSans-Light.ttf')))
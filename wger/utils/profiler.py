@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+'''
+Helpers for the sampling profiler, see ProfilerMiddleware
+
+The profiles are saved with python's own cProfile module, one file per
+request, in a directory that only keeps the newest files. The name of the
+files contains the URL name of the request, so they can be grouped later.
+'''
+
+# Standard Library
+import logging
+import os
+import tempfile
+import time
+
+# Third Party
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_WGER_PROFILE'
+'''Header with a signed token to request a profile, X-Wger-Profile'''
+
+PROFILE_TOKEN_SALT = 'wger.utils.profiler'
+PROFILE_TOKEN_MAX_AGE = 7 * 24 * 60 * 60
+
+
+def get_profile_dir():
+    '''
+    Returns the directory where the profiles are saved
+    '''
+    directory = settings.WGER_SETTINGS['PROFILER_DIR']
+    return directory or os.path.join(tempfile.gettempdir(), 'wger-profiles')
+
+
+def make_profile_token(user):
+    '''
+    Returns a token that can be sent in the X-Wger-Profile header
+
+    :param user: a staff user
+    '''
+    return signing.dumps(user.username, salt=PROFILE_TOKEN_SALT)
+
+
+def check_profile_token(token):
+    '''
+    Checks whether the token is valid and belongs to a staff user
+    '''
+    try:
+        username = signing.loads(token, salt=PROFILE_TOKEN_SALT, max_age=PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return User.objects.filter(username=username, is_staff=True).exists()
+
+
+def save_profile(profiler, url_name):
+    '''
+    Saves a profile and removes the oldest ones over the configured limit
+
+    :param profiler: a (disabled) cProfile.Profile
+    :param url_name: the URL name of the request, e.g. manager:workout:view
+    '''
+    directory = get_profile_dir()
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    filename = '{0:.6f}-{1}-{2}.prof'.format(time.time(),
+                                             os.getpid(),
+                                             (url_name or 'unknown').replace(':', '.'))
+    profiler.dump_stats(os.path.join(directory, filename))
+
+    files = sorted([f for f in os.listdir(directory) if f.endswith('.prof')])
+    for old_file in files[:-settings.WGER_SETTINGS['PROFILER_MAX_FILES']]:
+        try:
+            os.remove(os.path.join(directory, old_file))
+        except OSError:
+            # Probably already removed by another process
+            pass
+
+
+def get_profiles():
+    '''
+    Returns the saved profiles grouped by URL name
+
+    :return: a dictionary with the URL name as key and the list of files
+    '''
+    directory = get_profile_dir()
+    if not os.path.exists(directory):
+        return {}
+
+    profiles = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.prof'):
+            continue
+        url_name = filename[:-len('.prof')].split('-', 2)[-1].replace('.', ':')
+        profiles.setdefault(url_name, []).append(os.path.join(directory, filename))
+    return profiles
@@ -0,0 +1,123 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import json
+
+# Third Party
+from django.conf import settings
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from six import StringIO
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.utils.cache import (
+    cache_delete,
+    cache_get,
+    cache_mapper,
+    cache_set,
+    get_cache_stats,
+    reset_cache_stats
+)
+
+
+class CacheStatsTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the cache statistics
+    '''
+
+    def setUp(self):
+        super(CacheStatsTestCase, self).setUp()
+        self.old_settings = settings.WGER_SETTINGS.copy()
+        settings.WGER_SETTINGS['CACHE_STATS'] = True
+        reset_cache_stats()
+
+    def tearDown(self):
+        settings.WGER_SETTINGS.update(self.old_settings)
+        reset_cache_stats()
+        super(CacheStatsTestCase, self).tearDown()
+
+    def test_family(self):
+        '''
+        Test that the keys are mapped to the correct family
+        '''
+        self.assertEqual(cache_mapper.get_family(cache_mapper.get_language_key(1)),
+                         'language')
+        self.assertEqual(cache_mapper.get_family(cache_mapper.get_language_config_key(1, 2)),
+                         'language-config')
+        self.assertEqual(cache_mapper.get_family(cache_mapper.get_workout_canonical(3)),
+                         'workout-canonical-representation')
+        self.assertEqual(cache_mapper.get_family('template.cache.foo'), 'other')
+
+    def test_counters(self):
+        '''
+        Test that hits, misses, sets and invalidations are counted
+        '''
+        key = cache_mapper.get_ingredient_key(1)
+        cache_get(key)
+        cache_set(key, 'a' * 1000)
+        cache_get(key)
+        cache_get(key)
+        cache_delete(key)
+
+        stats = get_cache_stats()['ingredient']
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['sets'], 1)
+        self.assertEqual(stats['invalidations'], 1)
+        self.assertGreater(stats['bytes'], 1000)
+        self.assertAlmostEqual(stats['hit_rate'], 2.0 / 3)
+        self.assertEqual(get_cache_stats()['language']['hits'], 0)
+
+    def test_disabled(self):
+        '''
+        Test that nothing is counted if the statistics are disabled
+        '''
+        settings.WGER_SETTINGS['CACHE_STATS'] = False
+        key = cache_mapper.get_ingredient_key(1)
+        cache_set(key, 'a')
+        cache_get(key)
+
+        stats = get_cache_stats()['ingredient']
+        self.assertEqual(stats['hits'], 0)
+        self.assertEqual(stats['sets'], 0)
+        self.assertIsNone(stats['hit_rate'])
+
+    def test_view(self):
+        '''
+        Test the JSON endpoint, only available to staff members
+        '''
+        self.user_login('test')
+        response = self.client.get(reverse('core:cache-stats'))
+        self.assertEqual(response.status_code, 403)
+
+        self.user_login('admin')
+        cache_get(cache_mapper.get_ingredient_key(1))
+        response = self.client.get(reverse('core:cache-stats'))
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf8'))
+        self.assertTrue(data['enabled'])
+        self.assertEqual(data['families']['ingredient']['misses'], 1)
+
+    def test_command(self):
+        '''
+        Test the cache-stats command
+        '''
+        cache_get(cache_mapper.get_ingredient_key(1))
+        out = StringIO()
+        call_command('cache-stats', '--reset', stdout=out)
+        self.assertIn('ingredient', out.getvalue())
+        self.assertIn('Counters were reset', out.getvalue())
+        self.assertEqual(get_cache_stats()['ingredient']['misses'], 0)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 *-*
+
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import json
+import os
+import shutil
+import tempfile
+
+# Third Party
+from django.contrib.auth.models import Group
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.exercises.models import Equipment
+from wger.utils.fixtures import (
+    iter_fixture_objects,
+    load_fixture,
+    load_fixture_stages
+)
+
+
+class FixtureLoaderTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the fast fixture loader
+    '''
+
+    def setUp(self):
+        super(FixtureLoaderTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(FixtureLoaderTestCase, self).tearDown()
+
+    def write_fixture(self, name, data):
+        '''
+        Helper function that writes a fixture file
+        '''
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as fixture:
+            json.dump(data, fixture, indent=4)
+        return path
+
+    def test_iter_objects(self):
+        '''
+        Test that the streamed objects are the same as the ones in the file
+        '''
+        path = os.path.join(os.path.dirname(__file__), '..', '..', 'exercises',
+                            'fixtures', 'test-exercises.json')
+        with open(path) as fixture:
+            data = json.load(fixture)
+        self.assertEqual(list(iter_fixture_objects(path, chunk_size=10)), data)
+
+        path = self.write_fixture('empty.json', [])
+        self.assertEqual(list(iter_fixture_objects(path)), [])
+
+    def test_iter_objects_invalid(self):
+        '''
+        Test that incomplete files raise an error
+        '''
+        path = os.path.join(self.directory, 'invalid.json')
+        with open(path, 'w') as fixture:
+            fixture.write('[{"pk": 1, "model": "exercises.equipment"}, {"pk": 2')
+        self.assertRaises(ValueError, list, iter_fixture_objects(path))
+
+    def test_load(self):
+        '''
+        Test loading new objects, with many to many data
+        '''
+        path = self.write_fixture('data.json', [
+            {'model': 'exercises.equipment', 'pk': 100, 'fields': {'name': 'Rope'}},
+            {'model': 'exercises.equipment', 'pk': 101, 'fields': {'name': 'Sled'}},
+            {'model': 'auth.group', 'pk': 100,
+             'fields': {'name': 'fixture_group',
+                        'permissions': [['add_gym', 'gym', 'gym'],
+                                        ['change_gym', 'gym', 'gym']]}}])
+
+        self.assertEqual(load_fixture(path, batch_size=1), 3)
+        self.assertEqual(Equipment.objects.get(pk=101).name, 'Sled')
+        self.assertEqual(sorted(Group.objects.get(pk=100)
+                                .permissions.values_list('codename', flat=True)),
+                         ['add_gym', 'change_gym'])
+
+        # Existing objects are skipped
+        Equipment.objects.filter(pk=100).update(name='Changed')
+        self.assertEqual(load_fixture(path), 0)
+        self.assertEqual(Equipment.objects.get(pk=100).name, 'Changed')
+
+    def test_load_stages(self):
+        '''
+        Test loading several stages and the timing report
+        '''
+        first = self.write_fixture('first.json', [
+            {'model': 'exercises.equipment', 'pk': 100, 'fields': {'name': 'Rope'}}])
+        second = self.write_fixture('second.json', [
+            {'model': 'exercises.equipment', 'pk': 101, 'fields': {'name': 'Sled'}}])
+
+        report = load_fixture_stages([[[first]], [[second, first]]])
+        self.assertEqual([(i[0], i[1]) for i in report], [(first, 1), (second, 1), (first, 0)])
+        self.assertEqual(Equipment.objects.filter(pk__in=(100, 101)).count(), 2)
@@ -12,11 +12,16 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 
+# Standard Library
+import logging
+
 # Third Party
+from django.conf import settings
 from django.core.urlresolvers import reverse
 
 # wger
 from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.utils.middleware import get_sql_fingerprint
 
 
 class RobotsExclusionMiddlewareTestCase(WorkoutManagerTestCase):
@@ -83,3 +88,76 @@ class RobotsExclusionMiddlewareTestCase(WorkoutManagerTestCase):
 
         response = self.client.get(reverse('exercise:muscle:overview'))
         self.assertFalse(response.get('X-Robots-Tag'))
+
+
+class RecordingHandler(logging.Handler):
+    '''
+    Logging handler that simply keeps the records
+    '''
+
+    def __init__(self):
+        super(RecordingHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class RequestStatsMiddlewareTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the request statistics middleware
+    '''
+
+    def setUp(self):
+        super(RequestStatsMiddlewareTestCase, self).setUp()
+        self.old_settings = settings.WGER_SETTINGS.copy()
+        settings.WGER_SETTINGS['REQUEST_STATS'] = True
+
+    def tearDown(self):
+        settings.WGER_SETTINGS.update(self.old_settings)
+        super(RequestStatsMiddlewareTestCase, self).tearDown()
+
+    def test_server_timing(self):
+        '''
+        Test that the statistics are sent in the Server-Timing header
+        '''
+        self.user_login('admin')
+        response = self.client.get(reverse('manager:workout:view', kwargs={'pk': 1}))
+        self.assertIn('queries"', response['Server-Timing'])
+        self.assertIn('cache;desc=', response['Server-Timing'])
+        self.assertIn('view;dur=', response['Server-Timing'])
+
+    def test_disabled(self):
+        '''
+        Test that nothing is done if the middleware is disabled
+        '''
+        settings.WGER_SETTINGS['REQUEST_STATS'] = False
+        response = self.client.get(reverse('core:about'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_slow_request_log(self):
+        '''
+        Test that slow requests are logged
+        '''
+        settings.WGER_SETTINGS['SLOW_REQUEST_QUERIES'] = 1
+        handler = RecordingHandler()
+        logger = logging.getLogger('wger.utils.middleware')
+        logger.addHandler(handler)
+        try:
+            self.user_login('admin')
+            self.client.get(reverse('manager:workout:view', kwargs={'pk': 1}))
+        finally:
+            logger.removeHandler(handler)
+
+        messages = [record.getMessage() for record in handler.records]
+        self.assertTrue([m for m in messages if m.startswith('Slow request: ')])
+        self.assertTrue([m for m in messages if '"manager:workout:view"' in m])
+
+    def test_sql_fingerprint(self):
+        '''
+        Test that the values are removed from the queries
+        '''
+        self.assertEqual(get_sql_fingerprint("SELECT * FROM t1 WHERE id = 5 AND name = 'a''b'"),
+                         'SELECT * FROM t1 WHERE id = ? AND name = ?')
+        self.assertEqual(get_sql_fingerprint('SELECT * FROM t WHERE id IN (1, 2, 3)'),
+                         'SELECT * FROM t WHERE id IN (...)')
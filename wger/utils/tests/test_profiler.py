@@ -0,0 +1,97 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import os
+import shutil
+import tempfile
+
+# Third Party
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from six import StringIO
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.utils.profiler import (
+    get_profiles,
+    make_profile_token
+)
+
+
+class ProfilerTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the sampling profiler and the profile-report command
+    '''
+
+    def setUp(self):
+        super(ProfilerTestCase, self).setUp()
+        self.old_settings = settings.WGER_SETTINGS.copy()
+        self.profile_dir = tempfile.mkdtemp()
+        settings.WGER_SETTINGS['PROFILER'] = True
+        settings.WGER_SETTINGS['PROFILER_DIR'] = self.profile_dir
+        settings.WGER_SETTINGS['PROFILER_SAMPLE_RATE'] = 0
+
+    def tearDown(self):
+        settings.WGER_SETTINGS.update(self.old_settings)
+        shutil.rmtree(self.profile_dir)
+        super(ProfilerTestCase, self).tearDown()
+
+    def test_sample_rate(self):
+        '''
+        Test profiling all requests
+        '''
+        settings.WGER_SETTINGS['PROFILER_SAMPLE_RATE'] = 1
+        self.client.get(reverse('core:about'))
+        self.assertEqual(list(get_profiles().keys()), ['core:about'])
+
+    def test_max_files(self):
+        '''
+        Test that only the newest profiles are kept
+        '''
+        settings.WGER_SETTINGS['PROFILER_SAMPLE_RATE'] = 1
+        settings.WGER_SETTINGS['PROFILER_MAX_FILES'] = 2
+        for i in range(4):
+            self.client.get(reverse('core:about'))
+        self.assertEqual(len(os.listdir(self.profile_dir)), 2)
+
+    def test_header(self):
+        '''
+        Test profiling a request with the header of a staff user
+        '''
+        self.client.get(reverse('core:about'))
+        self.assertFalse(get_profiles())
+
+        token = make_profile_token(User.objects.get(username='test'))
+        self.client.get(reverse('core:about'), HTTP_X_WGER_PROFILE=token)
+        self.assertFalse(get_profiles())
+
+        token = make_profile_token(User.objects.get(username='admin'))
+        self.client.get(reverse('core:about'), HTTP_X_WGER_PROFILE=token)
+        self.assertEqual(len(get_profiles()['core:about']), 1)
+
+    def test_report(self):
+        '''
+        Test the report command
+        '''
+        settings.WGER_SETTINGS['PROFILER_SAMPLE_RATE'] = 1
+        self.client.get(reverse('core:about'))
+        self.client.get(reverse('core:about'))
+
+        out = StringIO()
+        call_command('profile-report', clear=True, stdout=out)
+        self.assertIn('*** core:about (2 profiles)', out.getvalue())
+        self.assertFalse(get_profiles())
@@ -19,6 +19,7 @@ from django import forms
 from django.forms import (
     CharField,
     DateField,
+    FileField,
     Form,
     ModelForm,
     Textarea,
@@ -48,6 +49,14 @@ class WeightCsvImportForm(Form):
     date_format = forms.ChoiceField(choices=CSV_DATE_FORMAT, label=_('Date format'))
 
 
+class WeightCsvUploadForm(Form):
+    '''
+    Form to upload a CSV file with weight entries
+    '''
+    csv_file = FileField(label=_('File'))
+    date_format = forms.ChoiceField(choices=CSV_DATE_FORMAT, label=_('Date format'))
+
+
 class WeightForm(ModelForm):
     date = DateField(input_formats=DATE_FORMATS, widget=Html5DateInput())
 
@@ -18,76 +18,171 @@
 import csv
 import datetime
 import decimal
+import itertools
 import json
 import logging
+import math
 from collections import OrderedDict
 
 # Third Party
 import six
-from django.core.cache import cache
+from django.db import transaction
 
 # wger
 from wger.manager.models import (
     WorkoutLog,
     WorkoutSession
 )
-from wger.utils.cache import cache_mapper
+from wger.utils.cache import (
+    cache_get,
+    cache_mapper,
+    cache_set,
+    get_content_version,
+    reset_content_version
+)
 from wger.utils.helpers import DecimalJsonEncoder
 from wger.weight.models import WeightEntry
 
 
 logger = logging.getLogger(__name__)
 
+MAX_ROW_COUNT = 1000
+'''Maximum number of rows of the pasted CSV input'''
 
-def parse_weight_csv(request, cleaned_data):
+MAX_IMPORT_ERRORS = 100
+'''Maximum number of rows with errors returned by the CSV import'''
+
+IMPORT_CHUNK_SIZE = 1000
+'''Number of weight entries saved at once by the CSV import'''
+
+CSV_SNIFF_LINES = 10
+'''Number of lines used to guess the CSV dialect'''
+
+WEIGHT_CHART_POINTS = 500
+'''Default number of points in the weight chart'''
+
+WEIGHT_CHART_MAX_POINTS = 5000
+'''Maximum number of points in the weight chart that can be requested'''
+
+
+def parse_weight_rows(rows, date_format, existing_dates):
+    '''
+    Parses rows with a date in the first and a weight in the second column
+
+    :param rows: iterable with the rows, e.g. a csv.reader
+    :param date_format: format of the dates, see CSV_DATE_FORMAT
+    :param existing_dates: set with the dates that already have an entry, the
+                           successfully parsed dates are added to it
+    :return: generator of (date, weight, row) tuples, date and weight are None
+             if the row could not be converted or the date is a duplicate
+    '''
+    for row in rows:
+        try:
+            parsed_date = datetime.datetime.strptime(row[0], date_format).date()
+            parsed_weight = decimal.Decimal(row[1].replace(',', '.'))
+        except (ValueError, IndexError, decimal.InvalidOperation):
+            yield None, None, row
+            continue
+
+        # Only one entry per date, in the file and in the database
+        if parsed_date in existing_dates or not parsed_weight:
+            yield None, None, row
+            continue
 
+        existing_dates.add(parsed_date)
+        yield parsed_date, parsed_weight, row
+
+
+def get_csv_reader(lines):
+    '''
+    Returns a CSV reader for the lines, with the dialect guessed from the first ones
+
+    :param lines: iterable with the lines, e.g. a file
+    '''
+    lines = iter(lines)
+    sample = list(itertools.islice(lines, CSV_SNIFF_LINES))
+
+    # Files keep the line terminators, other iterables (e.g. a split string)
+    # not. Without them the sniffer sees only one line.
     try:
-        dialect = csv.Sniffer().sniff(cleaned_data['csv_input'])
+        dialect = csv.Sniffer().sniff(''.join(line.rstrip('\r\n') + '\n' for line in sample))
     except csv.Error:
         dialect = 'excel'
+    return csv.reader(itertools.chain(sample, lines), dialect)
+
+
+def get_existing_dates(user):
+    '''
+    Returns a set with the dates of all weight entries of the user
+    '''
+    return set(WeightEntry.objects.filter(user=user).values_list('date', flat=True))
+
+
+def parse_weight_csv(request, cleaned_data):
+    '''
+    Parses the pasted CSV input of the import form
 
-    # csv.reader expects a file-like object, so use StringIO
-    parsed_csv = csv.reader(six.StringIO(cleaned_data['csv_input']),
-                            dialect)
-    distinct_weight_entries = []
-    entry_dates = set()
+    Since all entries are shown in a preview, this is limited to
+    MAX_ROW_COUNT rows, bigger files can be uploaded with import_weight_csv.
+
+    :return: a tuple with the list of (unsaved) weight entries and the rows
+             that could not be converted
+    '''
+    rows = get_csv_reader(six.StringIO(cleaned_data['csv_input']))
     weight_list = []
     error_list = []
-    MAX_ROW_COUNT = 1000
-    row_count = 0
+    parsed = parse_weight_rows(itertools.islice(rows, MAX_ROW_COUNT),
+                               cleaned_data['date_format'],
+                               get_existing_dates(request.user))
+    for date, weight, row in parsed:
+        if date is None:
+            error_list.append(row)
+        else:
+            weight_list.append(WeightEntry(date=date, weight=weight, user=request.user))
 
-    # Process the CSV items first
-    for row in parsed_csv:
-        try:
-            parsed_date = datetime.datetime.strptime(row[0], cleaned_data['date_format'])
-            parsed_weight = decimal.Decimal(row[1].replace(',', '.'))
-            duplicate_date_in_db = WeightEntry.objects.filter(date=parsed_date,
-                                                              user=request.user).exists()
-            # within the list there are no duplicate dates
-            unique_among_csv = parsed_date not in entry_dates
+    return (weight_list, error_list)
 
-            # there is no existing weight entry in the database for that date
-            unique_in_db = not duplicate_date_in_db
 
-            if unique_among_csv and unique_in_db and parsed_weight:
-                distinct_weight_entries.append((parsed_date, parsed_weight))
-                entry_dates.add(parsed_date)
-            else:
-                error_list.append(row)
+def import_weight_csv(user, lines, date_format, chunk_size=IMPORT_CHUNK_SIZE):
+    '''
+    Imports the weight entries from a CSV file of any size
+
+    The lines are processed as they are read and the entries saved in chunks,
+    so the file is never completely loaded into memory. The duplicates are
+    checked against the dates of the user's entries, loaded with one query.
+
+    :param user: the user the entries belong to
+    :param lines: iterable with the lines of the file, as text
+    :param date_format: format of the dates, see CSV_DATE_FORMAT
+    :param chunk_size: number of entries saved at once
+    :return: a tuple with the number of imported entries, the number of rows
+             with errors and the first MAX_IMPORT_ERRORS of these rows
+    '''
+    imported = 0
+    error_count = 0
+    error_list = []
+    chunk = []
 
-        except (ValueError, IndexError, decimal.InvalidOperation):
-            error_list.append(row)
-        row_count += 1
-        if row_count > MAX_ROW_COUNT:
-            break
+    with transaction.atomic():
+        parsed = parse_weight_rows(get_csv_reader(lines), date_format, get_existing_dates(user))
+        for date, weight, row in parsed:
+            if date is None:
+                error_count += 1
+                if len(error_list) < MAX_IMPORT_ERRORS:
+                    error_list.append(row)
+                continue
 
-    # Create the valid weight entries
-    for date, weight in distinct_weight_entries:
-        weight_list.append(WeightEntry(date=date,
-                                       weight=weight,
-                                       user=request.user))
+            chunk.append(WeightEntry(date=date, weight=weight, user=user))
+            if len(chunk) >= chunk_size:
+                WeightEntry.objects.bulk_create(chunk)
+                imported += len(chunk)
+                chunk = []
 
-    return (weight_list, error_list)
+        WeightEntry.objects.bulk_create(chunk)
+        imported += len(chunk)
+
+    reset_content_version('weight', user.pk)
+    return imported, error_count, error_list
 
 
 def group_log_entries(user, year, month, day=None):
@@ -124,7 +219,7 @@ def group_log_entries(user, year, month, day=None):
                                                  date__month=month)
 
     logs = logs.order_by('date', 'id')
-    out = cache.get(cache_mapper.get_workout_log_list(log_hash))
+    out = cache_get(cache_mapper.get_workout_log_list(log_hash))
     # out = OrderedDict()
 
     if not out:
@@ -151,7 +246,7 @@ def group_log_entries(user, year, month, day=None):
                                    'session': entry,
                                    'logs': {}}
 
-        cache.set(cache_mapper.get_workout_log_list(log_hash), out)
+        cache_set(cache_mapper.get_workout_log_list(log_hash), out)
     return out
 
 
@@ -234,3 +329,148 @@ def get_last_entries(user, amount=5):
             last_entries_details.append((curr_entry, weight_diff, day_diff))
 
         return last_entries_details
+
+
+def downsample_lttb(x, y, threshold):
+    '''
+    Selects the points of a series that best preserve its shape
+
+    This is the "Largest-Triangle-Three-Buckets" algorithm: the points are
+    divided in buckets and from each the one is kept that forms the biggest
+    triangle with the point kept from the previous bucket and the average of
+    the next one. The first and the last points are always kept.
+
+    :param x: list with the x values (as numbers), in ascending order
+    :param y: list with the y values
+    :param threshold: number of points to keep
+    :return: a list with the indexes of the points to keep
+    '''
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return list(range(length))
+
+    bucket_size = float(length - 2) / (threshold - 2)
+    selected = 0
+    indexes = [0]
+    for i in range(threshold - 2):
+
+        # Average of the next bucket
+        next_start = int(math.floor((i + 1) * bucket_size)) + 1
+        next_end = min(int(math.floor((i + 2) * bucket_size)) + 1, length)
+        average_x = sum(x[next_start:next_end]) / float(next_end - next_start)
+        average_y = sum(y[next_start:next_end]) / float(next_end - next_start)
+
+        # Point of the current bucket with the biggest triangle
+        max_area = -1
+        for j in range(int(math.floor(i * bucket_size)) + 1, next_start):
+            area = abs((x[selected] - average_x) * (y[j] - y[selected])
+                       - (x[selected] - x[j]) * (average_y - y[selected]))
+            if area > max_area:
+                max_area = area
+                candidate = j
+
+        indexes.append(candidate)
+        selected = candidate
+
+    indexes.append(length - 1)
+    return indexes
+
+
+def rolling_average(x, y, window):
+    '''
+    Calculates the average of the values in a moving window
+
+    :param x: list with the x values (as numbers), in ascending order
+    :param y: list with the y values
+    :param window: size of the window, in units of x. The average for each
+                   point contains all points with x in (x - window, x]
+    :return: a list with the averages
+    '''
+    result = []
+    start = 0
+    total = 0
+    for i in range(len(x)):
+        total += y[i]
+        while x[start] <= x[i] - window:
+            total -= y[start]
+            start += 1
+        result.append(total / (i - start + 1))
+    return result
+
+
+def linear_trend(x, y):
+    '''
+    Calculates the least-squares linear regression of a series
+
+    :return: a list with the values of the regression line for each x
+    '''
+    length = len(x)
+    if not length:
+        return []
+
+    mean_x = sum(x) / float(length)
+    mean_y = sum(y) / float(length)
+    variance = sum((i - mean_x) ** 2 for i in x)
+    if not variance:
+        return [mean_y] * length
+
+    slope = sum((i - mean_x) * (j - mean_y) for i, j in zip(x, y)) / variance
+    return [mean_y + slope * (i - mean_x) for i in x]
+
+
+def get_weight_chart_data(user, date_min=None, date_max=None, points=WEIGHT_CHART_POINTS,
+                          average=None, trend=False):
+    '''
+    Returns the weight entries of a user, prepared for the chart
+
+    If there are more entries than the chart can show, they are reduced to
+    the given number of points, keeping the shape of the curve (see
+    downsample_lttb). The rolling average and the trend are calculated with
+    all entries and added to the selected points.
+
+    The result is cached until the user's weight entries change.
+
+    :param user: the user
+    :param date_min: optional, first date to include
+    :param date_max: optional, last date to include
+    :param points: number of points to return, 0 returns all entries
+    :param average: optional, window in days for the rolling average
+    :param trend: whether to add the linear trend
+    :return: a list of dictionaries with the date, the weight and, if
+             requested, the 'average' and 'trend' values
+    '''
+    key = cache_mapper.get_weight_chart_key(user,
+                                            get_content_version('weight', user.pk),
+                                            date_min,
+                                            date_max,
+                                            points,
+                                            average,
+                                            trend)
+    chart_data = cache_get(key)
+    if chart_data is not None:
+        return chart_data
+
+    entries = WeightEntry.objects.filter(user=user)
+    if date_min:
+        entries = entries.filter(date__gte=date_min)
+    if date_max:
+        entries = entries.filter(date__lte=date_max)
+    entries = list(entries.order_by('date').values_list('date', 'weight'))
+
+    x = [date.toordinal() for date, weight in entries]
+    y = [float(weight) for date, weight in entries]
+    averages = rolling_average(x, y, average) if average else None
+    trend_values = linear_trend(x, y) if trend else None
+
+    chart_data = []
+    for i in downsample_lttb(x, y, points) if points else range(len(entries)):
+        point = {'date': entries[i][0],
+                 'weight': entries[i][1]}
+        if averages is not None:
+            point['average'] = round(averages[i], 2)
+        if trend_values is not None:
+            point['trend'] = round(trend_values[i], 2)
+        chart_data.append(point)
+
+    cache_set(key, chart_data)
+    return chart_data
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weight', '0003_auto_20160416_1030'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='weightentry',
+            index_together=set([('user', 'date')]),
+        ),
+    ]
@@ -25,6 +25,9 @@ from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
+# wger
+from wger.utils.cache import reset_content_version
+
 
 @python_2_unicode_compatible
 class WeightEntry(models.Model):
@@ -56,6 +59,7 @@ class WeightEntry(models.Model):
         ordering = ["date", ]
         get_latest_by = "date"
         unique_together = ("date", "user")
+        index_together = ("user", "date")
 
     def __str__(self):
         '''
@@ -63,6 +67,20 @@ class WeightEntry(models.Model):
         '''
         return u"{0}: {1:.2f} kg".format(self.date, self.weight)
 
+    def save(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('weight', self.user_id)
+        super(WeightEntry, self).save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        '''
+        Reset all cached infos
+        '''
+        reset_content_version('weight', self.user_id)
+        super(WeightEntry, self).delete(*args, **kwargs)
+
     def get_owner_object(self):
         '''
         Returns the object that has owner information
@@ -0,0 +1,134 @@
+# This file is part of wger Workout Manager.
+#
+# wger Workout Manager is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# wger Workout Manager is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+
+# Standard Library
+import datetime
+import json
+
+# Third Party
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+
+# wger
+from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.weight.helpers import (
+    downsample_lttb,
+    linear_trend,
+    rolling_average
+)
+from wger.weight.models import WeightEntry
+
+
+class WeightChartHelpersTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the helpers used to prepare the weight chart
+    '''
+
+    def test_downsample(self):
+        '''
+        Test that the first and last points and the outliers are kept
+        '''
+        x = list(range(100))
+        y = [80] * 100
+        y[42] = 90
+        indexes = downsample_lttb(x, y, 10)
+        self.assertEqual(len(indexes), 10)
+        self.assertEqual(indexes[0], 0)
+        self.assertEqual(indexes[-1], 99)
+        self.assertIn(42, indexes)
+        self.assertEqual(indexes, sorted(indexes))
+
+    def test_downsample_few_points(self):
+        '''
+        Test that nothing is removed if there are less points than requested
+        '''
+        self.assertEqual(downsample_lttb([1, 2, 3], [1, 2, 3], 10), [0, 1, 2])
+        self.assertEqual(downsample_lttb([], [], 10), [])
+
+    def test_rolling_average(self):
+        '''
+        Test the rolling average, the window is measured on the x axis
+        '''
+        self.assertEqual(rolling_average([1, 2, 3, 10], [1.0, 2.0, 3.0, 4.0], 2),
+                         [1.0, 1.5, 2.5, 4.0])
+
+    def test_linear_trend(self):
+        '''
+        Test the linear trend
+        '''
+        self.assertEqual(linear_trend([0, 1, 2], [1.0, 2.0, 3.0]), [1.0, 2.0, 3.0])
+        self.assertEqual(linear_trend([5, 5], [1.0, 3.0]), [2.0, 2.0])
+        self.assertEqual(linear_trend([], []), [])
+
+
+class WeightChartDataTestCase(WorkoutManagerTestCase):
+    '''
+    Tests the weight chart data
+    '''
+
+    def setUp(self):
+        super(WeightChartDataTestCase, self).setUp()
+        user = User.objects.get(username='test')
+        WeightEntry.objects.filter(user=user).delete()
+        start = datetime.date(2015, 1, 1)
+        WeightEntry.objects.bulk_create([WeightEntry(user=user,
+                                                     date=start + datetime.timedelta(days=i),
+                                                     weight=80 + i % 7)
+                                         for i in range(200)])
+        self.user_login('test')
+
+    def get_data(self, **params):
+        '''
+        Helper that returns the chart data
+        '''
+        response = self.client.get(reverse('weight:weight-data',
+                                           kwargs={'username': 'test'}), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode('utf8'))
+
+    def test_downsampling(self):
+        '''
+        Test that the data is downsampled to the requested number of points
+        '''
+        self.assertEqual(len(self.get_data()), 200)
+        self.assertEqual(len(self.get_data(points=0)), 200)
+
+        data = self.get_data(points=20)
+        self.assertEqual(len(data), 20)
+        self.assertEqual(data[0]['date'], '2015-01-01')
+        self.assertNotIn('average', data[0])
+        self.assertNotIn('trend', data[0])
+
+    def test_range(self):
+        '''
+        Test filtering the entries by date
+        '''
+        data = self.get_data(date_min='2015-02-01', date_max='2015-02-10')
+        self.assertEqual(len(data), 10)
+
+    def test_average_trend(self):
+        '''
+        Test the rolling average and the trend
+        '''
+        data = self.get_data(points=20, average=7, trend=1)
+        self.assertEqual(data[-1]['average'], 83)
+        self.assertIn('trend', data[-1])
+
+    def test_cache(self):
+        '''
+        Test that the cached data is reset when an entry changes
+        '''
+        self.assertEqual(len(self.get_data()), 200)
+        WeightEntry.objects.filter(user__username='test').first().delete()
+        self.assertEqual(len(self.get_data()), 199)
@@ -13,13 +13,19 @@
 # You should have received a copy of the GNU Affero General Public License
 
 # Standard Library
+import datetime
 import logging
 
 # Third Party
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 # wger
 from wger.core.tests.base_testcase import WorkoutManagerTestCase
+from wger.weight.helpers import import_weight_csv
 from wger.weight.models import WeightEntry
 
 
@@ -80,3 +86,52 @@ class WeightCsvImportTestCase(WorkoutManagerTestCase):
 
         self.user_login('test')
         self.import_csv()
+
+
+class WeightCsvUploadTestCase(WorkoutManagerTestCase):
+    '''
+    Test case for the import of uploaded CSV files
+    '''
+
+    def get_csv(self, days):
+        '''
+        Helper that returns a CSV file with one entry per day, ending today
+        '''
+        lines = ['Date;Weight;Fat']
+        today = datetime.date.today()
+        for i in range(days):
+            date = today - datetime.timedelta(days=i)
+            lines.append('{0};{1},{2};20'.format(date.strftime('%Y-%m-%d'), 70 + i % 10, i % 10))
+        return '\n'.join(lines)
+
+    def test_import(self):
+        '''
+        Test importing a big file, with duplicates and errors
+        '''
+        user = User.objects.get(username='test')
+        WeightEntry.objects.create(user=user, date=datetime.date.today(), weight=80)
+        count_before = WeightEntry.objects.filter(user=user).count()
+        lines = self.get_csv(3650).split('\n') + ['2010-01-01;error', '2010-01-01;70']
+
+        with CaptureQueriesContext(connection) as queries:
+            imported, error_count, error_list = import_weight_csv(user, lines, '%Y-%m-%d')
+        self.assertLess(len(queries), 30)
+
+        # The header, today's date, and the wrong weight are errors
+        self.assertEqual(imported, 3650 - 1 + 1)
+        self.assertEqual(error_count, 3)
+        self.assertEqual(error_list[0], ['Date', 'Weight', 'Fat'])
+        self.assertEqual(WeightEntry.objects.filter(user=user).count(), count_before + imported)
+
+    def test_upload(self):
+        '''
+        Test uploading a file
+        '''
+        self.user_login('test')
+        count_before = WeightEntry.objects.count()
+        csv_file = SimpleUploadedFile('weight.csv', self.get_csv(20).encode('utf-8'))
+        response = self.client.post(reverse('weight:import-csv-file'),
+                                    {'csv_file': csv_file,
+                                     'date_format': '%Y-%m-%d'})
+        self.assertEqual(response.status_code, 302)
+        self.assertGreaterEqual(WeightEntry.objects.count(), count_before + 18)
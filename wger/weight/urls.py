@@ -39,6 +39,9 @@ urlpatterns = [
     url(r'^import-csv/$',
         login_required(views.WeightCsvImportFormPreview(WeightCsvImportForm)),
         name='import-csv'),
+    url(r'^import-csv/file/$',
+        login_required(views.WeightCsvUploadView.as_view()),
+        name='import-csv-file'),
 
     url(r'^overview/(?P<username>[\w.@+-]+)$',
         views.overview,
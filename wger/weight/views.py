@@ -15,11 +15,14 @@
 # You should have received a copy of the GNU Affero General Public License
 
 # Standard Library
+import codecs
 import csv
 import datetime
 import logging
 
 # Third Party
+import six
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.urlresolvers import (
     reverse,
@@ -40,6 +43,7 @@ from django.utils.translation import (
 )
 from django.views.generic import (
     CreateView,
+    FormView,
     UpdateView
 )
 from formtools.preview import FormPreview
@@ -47,10 +51,14 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 # wger
+from wger.utils.cache import reset_content_version
 from wger.utils.generic_views import WgerFormMixin
 from wger.utils.helpers import check_access
 from wger.weight import helpers
-from wger.weight.forms import WeightForm
+from wger.weight.forms import (
+    WeightCsvUploadForm,
+    WeightForm
+)
 from wger.weight.models import WeightEntry
 
 
@@ -175,24 +183,35 @@ def overview(request, username=None):
 def get_weight_data(request, username=None):
     '''
     Process the data to pass it to the JS libraries to generate an SVG image
+
+    Optional GET parameters:
+
+    * date_min, date_max: only return the entries in this range
+    * points: number of points to return, if there are more entries the
+      series is downsampled (default 500, 0 returns all entries)
+    * average: add the rolling average over this number of days
+    * trend: if set to 1, add the linear trend
     '''
 
     is_owner, user = check_access(request.user, username)
 
-    date_min = request.GET.get('date_min', False)
-    date_max = request.GET.get('date_max', True)
+    try:
+        points = min(int(request.GET.get('points', helpers.WEIGHT_CHART_POINTS)),
+                     helpers.WEIGHT_CHART_MAX_POINTS)
+    except ValueError:
+        points = helpers.WEIGHT_CHART_POINTS
 
-    if date_min and date_max:
-        weights = WeightEntry.objects.filter(user=user,
-                                             date__range=(date_min, date_max))
-    else:
-        weights = WeightEntry.objects.filter(user=user)
+    try:
+        average = max(int(request.GET.get('average', 0)), 0)
+    except ValueError:
+        average = 0
 
-    chart_data = []
-
-    for i in weights:
-        chart_data.append({'date': i.date,
-                           'weight': i.weight})
+    chart_data = helpers.get_weight_chart_data(user,
+                                               date_min=request.GET.get('date_min'),
+                                               date_max=request.GET.get('date_max'),
+                                               points=max(points, 0),
+                                               average=average,
+                                               trend=request.GET.get('trend') == '1')
 
     # Return the results to the client
     return Response(chart_data)
@@ -220,5 +239,55 @@ class WeightCsvImportFormPreview(FormPreview):
     def done(self, request, cleaned_data):
         weight_list, error_list = helpers.parse_weight_csv(request, cleaned_data)
         WeightEntry.objects.bulk_create(weight_list)
+        reset_content_version('weight', request.user.pk)
         return HttpResponseRedirect(reverse('weight:overview',
                                             kwargs={'username': request.user.username}))
+
+
+class WeightCsvUploadView(FormView):
+    '''
+    Imports the weight entries from an uploaded CSV file
+
+    Unlike the import of the pasted entries there is no preview, the file is
+    imported directly and can be of any size.
+    '''
+    template_name = 'form.html'
+    form_class = WeightCsvUploadForm
+
+    def get_context_data(self, **kwargs):
+        '''
+        Set necessary template data to correctly render the form
+        '''
+        context = super(WeightCsvUploadView, self).get_context_data(**kwargs)
+        context['title'] = _('Import weight logs')
+        # TODO: change template so it iterates through form and not formfields
+        context['form_fields'] = context['form']
+        context['form_action'] = reverse('weight:import-csv-file')
+        context['submit_text'] = _('Import')
+        context['enctype'] = 'multipart/form-data'
+        context['sidebar'] = 'import_csv_file_sidebar.html'
+        context['extend_template'] = 'base_empty.html' if self.request.is_ajax() else 'base.html'
+        return context
+
+    def form_valid(self, form):
+        '''
+        Import the entries and show a summary
+        '''
+        lines = form.cleaned_data['csv_file']
+        if six.PY3:
+            lines = codecs.iterdecode(lines, 'utf-8-sig', errors='replace')
+
+        imported, error_count, error_list = helpers.import_weight_csv(
+            self.request.user,
+            lines,
+            form.cleaned_data['date_format'])
+
+        messages.success(self.request, _('Imported {0} weight entries.').format(imported))
+        if error_count:
+            messages.warning(self.request,
+                             _('{0} rows could not be imported, e.g.: {1}').format(
+                                 error_count,
+                                 u'; '.join([u', '.join(row) for row in error_list[:5]])))
+
+        return HttpResponseRedirect(reverse('weight:overview',
+                                            kwargs={'username': self.request.user.username}))